@@ -1,10 +1,16 @@
 
 # IMPORTS
+import time
+
+STARTED = time.perf_counter()  # ⏱ cold start is measured from the first import
+
+import json
 import os
 from datetime import datetime
 
 from flask import (
     Flask,
+    g,
     request,
     session,
     redirect,
@@ -14,11 +20,19 @@ from flask import (
 from config import (
     DATABASE_PATH,
     LOGO_UPLOAD_FOLDER,
+    ONEDRIVE_PATH,
     UPLOAD_FOLDER,
+    ensure_directories,
 )
+from assets import init_assets
+from audit import init_audit
 from extensions import db
+from file_counter import init_file_counter
+from instrumentation import init_instrumentation
 from utils import (
-    daily_backup_if_needed
+    daily_backup_if_needed,
+    init_logging,
+    logger,
 )
 
 app = Flask(__name__)
@@ -26,15 +40,41 @@ app.secret_key = os.getenv("SECRET_KEY", "fallback_dev_secret")
 
 
 # === Initialize Flask App ===
+# Importing this module only builds the bare `app`. create_app() does the
+# work with side effects (folders, log shipping, background threads) and
+# registers the routes, so it runs once per process, when serving starts.
+
+
+def create_app():
+    """
+    Finish setting up `app` and return it. Safe to call more than once.
+    """
+    if "STARTUP_SECONDS" in app.config:
+        return app
+
+    ensure_directories()
+    init_logging()
+
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{DATABASE_PATH}"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
+    app.config["LOGO_UPLOAD_FOLDER"] = LOGO_UPLOAD_FOLDER
 
-app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{DATABASE_PATH}"
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
-app.config["LOGO_UPLOAD_FOLDER"] = LOGO_UPLOAD_FOLDER
+    db.init_app(app)
+    init_instrumentation(app)  # ⏱ registered first so every request is profiled
+    init_audit(app)  # 📜 background writer for audit_event rows
+    init_file_counter(app)  # 📂 polls OneDrive mtimes for the "new today" badge
+    init_assets(app)  # 🎨 fingerprinted static bundles, if assets.py built them
 
-db.init_app(app)
+    import routes  # registers every view on `app`
+
+    app.config["STARTUP_SECONDS"] = time.perf_counter() - STARTED
+    logger.info(
+        f"🚀 Started in {app.config['STARTUP_SECONDS'] * 1000:.0f} ms "
+        f"(OneDrive: {ONEDRIVE_PATH}, database: {DATABASE_PATH})"
+    )
+    return app
 
-from flask import g
 
 @app.before_request
 def maybe_run_daily_backup():
@@ -44,12 +84,12 @@ def maybe_run_daily_backup():
 
 @app.before_request
 def require_login():
+    # Local Prometheus scrapers and calendar apps can't log in; these stay open on loopback only
+    if request.endpoint in ("metrics", "recurring_meetings_feed") and request.remote_addr in ("127.0.0.1", "::1"):
+        return None
     if request.endpoint not in ("login", "static") and "username" not in session:
         return redirect(url_for("login"))
 
-from routes import *
-
-
 
 @app.template_filter("datetimeformat")
 def datetimeformat(value, format="%Y-%m-%d %H:%M"):
@@ -58,12 +98,42 @@ def datetimeformat(value, format="%Y-%m-%d %H:%M"):
     return value.strftime(format)
 
 
+@app.template_filter("fromjson")
+def fromjson(value):
+    return json.loads(value) if value else {}
+
 
-# --------------------- MAIN ---------------------
-if __name__ == "__main__":
-    ENABLE_FAKE_DATA = False  # ← Set to True if you ever want to load dummy data again
 
+# --------------------- STARTUP ---------------------
+def prepare_database(fake_data=False):
+    """
+    Create tables and run migrations; `fake_data` seeds an empty database.
+    """
+    create_app()
     with app.app_context():
         db.create_all()
 
-    app.run(debug=True)
+        from migrations import run_migrations
+
+        run_migrations()
+
+        from models import Customer
+
+        if fake_data and not Customer.query.first():
+            from benchmarks.fake_data import generate_dataset
+
+            generate_dataset(customers=5, contacts_per_customer=25, chain_depth=6)
+
+
+# --------------------- MAIN ---------------------
+# Dev server only; for several worker processes see wsgi.py
+if __name__ == "__main__":
+    ENABLE_FAKE_DATA = os.getenv("ENABLE_FAKE_DATA") == "1"  # ← loads a small synthetic CRM into an empty DB
+
+    # routes.py registers on the importable `app` module's instance, not on
+    # this __main__ copy, so start that one
+    import app as crm
+
+    crm.prepare_database(fake_data=ENABLE_FAKE_DATA)
+
+    crm.app.run(debug=True)
@@ -0,0 +1,462 @@
+"""
+Static asset build:
+
+    python assets.py vendor   # once, online: download Bootstrap into static/vendor/
+    python assets.py build    # bundle, minify, purge and fingerprint into static/dist/
+
+wsgi.py runs the build on startup when anything is newer than the last one;
+the dev server (`python app.py`) serves the source files as they are.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import urllib.request
+
+from config import BOOTSTRAP_CDN, STATIC_ASSETS_BUILD
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+TEMPLATES_DIR = os.path.join(os.path.dirname(STATIC_DIR), "templates")
+DIST_DIR = os.path.join(STATIC_DIR, "dist")
+MANIFEST_PATH = os.path.join(DIST_DIR, "manifest.json")
+
+ONE_YEAR = 365 * 24 * 3600
+
+
+# --------------------- BUNDLES ---------------------
+# Logical name → static files, in order. Files under vendor/ are optional:
+# until `python assets.py vendor` has fetched them, pages load them from
+# the CDN instead (BOOTSTRAP_CDN).
+
+BUNDLES = {
+    "app.css": ("vendor/bootstrap.min.css", "style.css"),
+    "app.js": ("typeahead.js", "ndjson.js"),
+    "bootstrap.js": ("vendor/bootstrap.bundle.min.js",),
+}
+
+# Copied with a content hash but otherwise untouched
+FINGERPRINTED = ("images/favicon.ico",)
+
+
+def _read(name):
+    with open(os.path.join(STATIC_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def _sources(bundle):
+    """
+    (present static files, CDN urls for vendored files that aren't there).
+    """
+    present, external = [], []
+    for name in BUNDLES[bundle]:
+        if os.path.isfile(os.path.join(STATIC_DIR, name)):
+            present.append(name)
+        elif name in BOOTSTRAP_CDN:
+            external.append(BOOTSTRAP_CDN[name])
+    return present, external
+
+
+# ---- CSS minifier ----
+# Enough of a parser for hand-written CSS and Bootstrap: comments, strings,
+# rule blocks, and @media/@supports nesting. "/*!" license comments stay.
+
+_GROUPING_AT_RULES = ("@media", "@supports", "@layer", "@container", "@document")
+
+
+def _skip_string(css, i):
+    quote = css[i]
+    i += 1
+    while i < len(css) and css[i] != quote:
+        i += 2 if css[i] == "\\" else 1
+    return i + 1
+
+
+def _find(css, i, stops):
+    """
+    Index of the first char in `stops` outside strings, comments and parens.
+    """
+    depth = 0
+    while i < len(css):
+        c = css[i]
+        if c in "\"'":
+            i = _skip_string(css, i)
+            continue
+        if css.startswith("/*", i):
+            end = css.find("*/", i + 2)
+            i = len(css) if end == -1 else end + 2
+            continue
+        if c in "([":
+            depth += 1
+        elif c in ")]":
+            depth -= 1
+        elif depth == 0 and c in stops:
+            return i
+        i += 1
+    return len(css)
+
+
+def _block_end(css, i):
+    """
+    Index of the "}" closing the block whose "{" is at `i`.
+    """
+    depth = 0
+    while i < len(css):
+        c = css[i]
+        if c in "\"'":
+            i = _skip_string(css, i)
+            continue
+        if css.startswith("/*", i):
+            end = css.find("*/", i + 2)
+            i = len(css) if end == -1 else end + 2
+            continue
+        if c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    return len(css)
+
+
+def _strip_comments(text):
+    out, i = [], 0
+    while i < len(text):
+        c = text[i]
+        if c in "\"'":
+            end = _skip_string(text, i)
+            out.append(text[i:end])
+            i = end
+        elif text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = len(text) if end == -1 else end + 2
+        else:
+            out.append(c)
+            i += 1
+    return "".join(out)
+
+
+def _squeeze(text, around):
+    """
+    Collapse whitespace, then drop it next to the characters in `around`
+    (outside strings).
+    """
+    parts = re.split(r"(\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*')", text)
+    for n in range(0, len(parts), 2):
+        part = re.sub(r"\s+", " ", parts[n])
+        parts[n] = re.sub(rf"\s*([{re.escape(around)}])\s*", r"\1", part)
+    return "".join(parts).strip()
+
+
+def _declarations(body):
+    body = _strip_comments(body)
+    declarations = []
+    i = 0
+    while i < len(body):
+        end = _find(body, i, ";")
+        declaration = body[i:end].strip()
+        if declaration:
+            name, _, value = declaration.partition(":")
+            value = _squeeze(value, ",")
+            value = re.sub(r"\s*!\s*important", "!important", value)
+            declarations.append(f"{name.strip()}:{value}")
+        i = end + 1
+    return ";".join(declarations)
+
+
+def parse_css(css, i=0, end=None):
+    """
+    [("comment", text) | ("statement", text) | ("rule", selectors, body)
+     | ("group", prelude, children) | ("at", prelude, raw body)]
+    """
+    end = len(css) if end is None else end
+    nodes = []
+    while i < end:
+        if css[i].isspace():
+            i += 1
+            continue
+        if css.startswith("/*", i):
+            close = css.find("*/", i + 2)
+            close = end if close == -1 else close + 2
+            if css.startswith("/*!", i):
+                nodes.append(("comment", css[i:close]))
+            i = close
+            continue
+        stop = _find(css, i, "{;}")
+        if stop >= end or css[stop] == "}":
+            i = stop + 1  # stray text or a stray "}": skip it
+            continue
+        prelude = _squeeze(_strip_comments(css[i:stop]), ",>+~")
+        if css[stop] == ";":
+            nodes.append(("statement", prelude))  # @charset, @import
+            i = stop + 1
+            continue
+        close = _block_end(css, stop)
+        if prelude.startswith(_GROUPING_AT_RULES):
+            nodes.append(("group", _squeeze(prelude, ":,"), parse_css(css, stop + 1, close)))
+        elif prelude.startswith("@"):
+            nodes.append(("at", prelude, _squeeze(_strip_comments(css[stop + 1:close]), "{};:,")))
+        else:
+            nodes.append(("rule", _split_selectors(prelude), _declarations(css[stop + 1:close])))
+        i = close + 1
+    return nodes
+
+
+def _split_selectors(prelude):
+    selectors, i = [], 0
+    while i <= len(prelude):
+        end = _find(prelude, i, ",")
+        selectors.append(prelude[i:end].strip())
+        i = end + 1
+    return [s for s in selectors if s]
+
+
+def render_css(nodes):
+    out = []
+    for node in nodes:
+        kind = node[0]
+        if kind == "comment":
+            out.append(node[1] + "\n")
+        elif kind == "statement":
+            out.append(node[1] + ";")
+        elif kind == "rule":
+            out.append(",".join(node[1]) + "{" + node[2] + "}")
+        elif kind == "group":
+            out.append(node[1] + "{" + render_css(node[2]) + "}")
+        else:
+            out.append(node[1] + "{" + node[2] + "}")
+    return "".join(out)
+
+
+def minify_css(css):
+    return render_css(parse_css(css))
+
+
+# ---- Unused-rule stripping ----
+# A selector is kept unless it needs a class or id that appears nowhere in
+# the templates, our JS, vendored JS or Python code (flash categories).
+# Classes built at runtime ("alert-{{ category }}", `btn-${kind}`) count as
+# used when their prefix is built that way and the rest appears somewhere.
+
+_WORD = re.compile(r"[A-Za-z_][\w-]*")
+_DYNAMIC_PREFIX = re.compile(r"([A-Za-z_][\w-]*-)(?:\{\{|\{%|\$\{|[\"']\s*\+)")
+_NEGATED = re.compile(r":(?:not|is|where|has)\((?:[^()]|\([^()]*\))*\)|\[[^\]]*\]")
+_NAMES = re.compile(r"[.#](-?[A-Za-z_][\w-]*)")
+
+
+def _texts():
+    for root, dirs, files in os.walk(TEMPLATES_DIR):
+        yield from (os.path.join(root, f) for f in files if f.endswith(".html"))
+    for root, dirs, files in os.walk(STATIC_DIR):
+        dirs[:] = [d for d in dirs if d != "dist"]
+        yield from (os.path.join(root, f) for f in files if f.endswith(".js"))
+    project = os.path.dirname(STATIC_DIR)
+    yield from (os.path.join(project, f) for f in os.listdir(project) if f.endswith(".py"))
+
+
+def used_names():
+    """
+    (every word in the templates, JS and Python, dynamic class prefixes).
+    """
+    text = []
+    for path in _texts():
+        with open(path, encoding="utf-8", errors="ignore") as f:
+            text.append(f.read())
+    text = "\n".join(text)
+    return set(_WORD.findall(text)), set(_DYNAMIC_PREFIX.findall(text))
+
+
+def _is_used(name, words, prefixes):
+    if name in words:
+        return True
+    return any(name.startswith(p) and name[len(p):] in words for p in prefixes)
+
+
+def _selector_used(selector, words, prefixes):
+    # Classes inside :not()/:is()/... don't have to be present for a match,
+    # and ".pdf" in [href$=".pdf"] isn't a class
+    return all(_is_used(n, words, prefixes) for n in _NAMES.findall(_NEGATED.sub("", selector)))
+
+
+def purge(nodes, words, prefixes):
+    kept = []
+    for node in nodes:
+        if node[0] == "rule":
+            selectors = [s for s in node[1] if _selector_used(s, words, prefixes)]
+            if selectors:
+                kept.append(("rule", selectors, node[2]))
+        elif node[0] == "group" and node[1].startswith(("@media", "@supports", "@container")):
+            children = purge(node[2], words, prefixes)
+            if children:
+                kept.append(("group", node[1], children))
+        else:
+            kept.append(node)
+    return kept
+
+
+# --------------------- BUILD ---------------------
+
+_SOURCE_MAP = re.compile(r"^//# sourceMappingURL=.*$", re.M)  # the .map isn't copied
+
+
+def _fingerprint(name, content):
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    stem, ext = os.path.splitext(name)
+    hashed = f"dist/{stem}.{digest}{ext}"
+    path = os.path.join(STATIC_DIR, hashed)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if not os.path.exists(path):
+        with open(path, "wb") as f:
+            f.write(content)
+    return hashed
+
+
+def _inputs():
+    yield from (os.path.join(STATIC_DIR, n) for names in BUNDLES.values() for n in names)
+    yield from (os.path.join(STATIC_DIR, n) for n in FINGERPRINTED)
+    yield os.path.abspath(__file__)
+    for root, _, files in os.walk(TEMPLATES_DIR):
+        yield from (os.path.join(root, f) for f in files)
+
+
+def is_stale():
+    if not os.path.exists(MANIFEST_PATH):
+        return True
+    built = os.path.getmtime(MANIFEST_PATH)
+    return any(os.path.exists(p) and os.path.getmtime(p) > built for p in _inputs())
+
+
+def build():
+    """
+    Write static/dist/ and its manifest; returns the manifest.
+    """
+    words, prefixes = used_names()
+    manifest = {"files": {}, "external": {}}
+
+    for bundle in BUNDLES:
+        present, external = _sources(bundle)
+        if not present:
+            continue
+        if bundle.endswith(".css"):
+            nodes = [n for name in present for n in parse_css(_read(name))]
+            # @charset/@import must come first, and only once
+            statements = list(dict.fromkeys(n for n in nodes if n[0] == "statement"))
+            nodes = statements + [n for n in nodes if n[0] != "statement"]
+            content = render_css(purge(nodes, words, prefixes))
+        else:
+            scripts = (_SOURCE_MAP.sub("", _read(name)).rstrip().rstrip(";") for name in present)
+            content = ";\n".join(scripts) + ";\n"
+        manifest["files"][bundle] = _fingerprint(bundle, content.encode("utf-8"))
+        if external:
+            manifest["external"][bundle] = external
+
+    for name in FINGERPRINTED:
+        path = os.path.join(STATIC_DIR, name)
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                manifest["files"][name] = _fingerprint(name, f.read())
+
+    previous = load_manifest()
+    tmp = MANIFEST_PATH + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, MANIFEST_PATH)
+    _remove_unreferenced(manifest, previous)
+    return manifest
+
+
+def _remove_unreferenced(manifest, previous):
+    # Keep the previous build's files too: pages rendered a moment ago
+    # (or by a worker that hasn't restarted yet) still point at them
+    keep = {os.path.join(STATIC_DIR, p) for m in (manifest, previous) for p in m["files"].values()}
+    keep.add(MANIFEST_PATH)
+    for root, _, files in os.walk(DIST_DIR):
+        for file in files:
+            path = os.path.join(root, file)
+            if path not in keep:
+                os.remove(path)
+
+
+def build_if_stale():
+    if is_stale():
+        build()
+
+
+def vendor():
+    """
+    Download the Bootstrap files that BUNDLES expect under static/vendor/.
+    """
+    for name, url in BOOTSTRAP_CDN.items():
+        path = os.path.join(STATIC_DIR, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with urllib.request.urlopen(url, timeout=30) as response, open(path + ".tmp", "wb") as f:
+            shutil.copyfileobj(response, f)
+        os.replace(path + ".tmp", path)
+        print(f"📦 {url} → static/{name}")
+
+
+# --------------------- SERVING ---------------------
+
+
+def load_manifest():
+    try:
+        with open(MANIFEST_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"files": {}, "external": {}}
+
+
+def init_assets(app):
+    """
+    url_for('static', filename=...) points at fingerprinted copies when a
+    build exists; those are served with a one-year immutable Cache-Control.
+    Templates list a bundle's URLs with asset_urls("app.css").
+    """
+    from flask import request, url_for
+
+    manifest = load_manifest() if STATIC_ASSETS_BUILD else {"files": {}, "external": {}}
+    files, external = manifest["files"], manifest["external"]
+
+    @app.url_defaults
+    def fingerprinted_static(endpoint, values):
+        if endpoint == "static" and values.get("filename") in files:
+            values["filename"] = files[values["filename"]]
+
+    @app.after_request
+    def cache_fingerprinted(response):
+        if (
+            request.endpoint == "static"
+            and response.status_code in (200, 304)
+            and (request.view_args or {}).get("filename", "").startswith("dist/")
+        ):
+            response.cache_control.public = True
+            response.cache_control.max_age = ONE_YEAR
+            response.cache_control.immutable = True
+            response.cache_control.no_cache = None
+        return response
+
+    def asset_urls(bundle):
+        if bundle in files:
+            return [*external.get(bundle, ()), url_for("static", filename=bundle)]
+        present, cdn = _sources(bundle)  # not built: the source files as they are
+        return [*cdn, *(url_for("static", filename=name) for name in present)]
+
+    app.jinja_env.globals["asset_urls"] = asset_urls
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "build"
+    if command == "vendor":
+        vendor()
+    elif command == "build":
+        result = build()
+        for name, path in sorted(result["files"].items()):
+            size = os.path.getsize(os.path.join(STATIC_DIR, path))
+            print(f"✅ {name} → static/{path} ({size / 1024:.1f} KB)")
+        for name, urls in sorted(result["external"].items()):
+            print(f"🌐 {name} still loads {', '.join(urls)} (run `python assets.py vendor`)")
+    else:
+        sys.exit(__doc__)
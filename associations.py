@@ -0,0 +1,87 @@
+from sqlalchemy import delete, insert, select, update
+
+from extensions import db
+
+
+# --------------------- ASSOCIATION UPDATES ---------------------
+# Assigning a whole collection (partner.customers = [...]) makes SQLAlchemy
+# load it, then delete and re-insert link rows. These helpers diff id sets
+# instead and write only what changed, as one bulk DELETE and one INSERT.
+#
+# Statements go through db.session (same transaction as the rest of the
+# request) and tell cache.py which customer scopes they touched, so only
+# those fragments are invalidated.
+
+
+def _ids(values):
+    return {int(v) for v in values if str(v).strip()}
+
+
+def _referenced(column):
+    fk = next(iter(column.foreign_keys))
+    return fk.column
+
+
+def _scopes(column, ids):
+    # Customer ids are cache scopes in their own right
+    return set(ids) if _referenced(column).table.name == "customer" else set()
+
+
+def sync_links(owner_column, owner_id, target_column, target_ids, scopes=()):
+    """
+    Make the targets linked to `owner_id` in an association table exactly
+    `target_ids` (ids that don't exist are ignored). Returns (added, removed).
+
+    sync_links(partner_customer.c.partner_id, partner.id,
+               partner_customer.c.customer_id, form.getlist("customer_ids"))
+    """
+    table = owner_column.table
+    session = db.session
+    current = set(
+        session.execute(select(target_column).where(owner_column == owner_id)).scalars()
+    )
+    wanted = _ids(target_ids)
+    to_add, to_remove = wanted - current, current - wanted
+
+    if to_add:
+        target_pk = _referenced(target_column)
+        to_add = set(session.execute(select(target_pk).where(target_pk.in_(to_add))).scalars())
+
+    touched = set(scopes) | _scopes(target_column, to_add | to_remove) | _scopes(owner_column, [owner_id])
+    options = {"cache_scopes": touched}
+    if to_remove:
+        session.execute(
+            delete(table).where(owner_column == owner_id, target_column.in_(to_remove)),
+            execution_options=options,
+        )
+    if to_add:
+        session.execute(
+            insert(table),
+            [{owner_column.key: owner_id, target_column.key: target_id} for target_id in to_add],
+            execution_options=options,
+        )
+    if to_add or to_remove:
+        # Loaded collections would otherwise show (and re-flush) the old links
+        for obj in list(session.identity_map.values()):
+            for rel in type(obj).__mapper__.relationships:
+                if rel.secondary is table:
+                    session.expire(obj, [rel.key])
+    return to_add, to_remove
+
+
+def assign_rows(model, ids, **values):
+    """
+    One UPDATE setting `values` on every `model` row in `ids` (e.g. pointing
+    contacts at a new customer), bumping the row version like an ORM save.
+    """
+    ids = _ids(ids)
+    if not ids:
+        return 0
+    table = model.__table__
+    if "version" in table.c:
+        values["version"] = table.c.version + 1
+    return db.session.execute(
+        update(table).where(table.c.id.in_(ids)).values(**values),
+        # row_ids lets the read model refresh just these rows
+        execution_options={"synchronize_session": False, "row_ids": ids},
+    ).rowcount
@@ -0,0 +1,186 @@
+import atexit
+import json
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import event, inspect
+
+from extensions import db
+from models import AuditEvent
+
+logger = logging.getLogger("crm_logger")
+
+
+# --------------------- AUDIT EVENTS ---------------------
+# log_change() enqueues a row here and returns straight away; one background
+# thread drains the queue and inserts in batches on its own connection, so
+# requests never wait on the audit write.
+
+BATCH_SIZE = 100
+FLUSH_INTERVAL = 1.0  # seconds the writer waits for more events before writing
+
+_queue = queue.Queue()
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def _jsonable(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+# ---- Per-entity diffs ----
+# Column history is gone once a flush completes, so it is collected on every
+# flush and kept on the session until log_change() asks for it.
+
+
+def _same(old, new):
+    return ("" if old is None else str(old)) == ("" if new is None else str(new))
+
+
+def _column_changes(obj):
+    state = inspect(obj)
+    changes = {}
+    touched = db.session.info.get("touched_values", {})
+    for attr in state.mapper.column_attrs:
+        if attr.key == "version":
+            continue
+        history = state.attrs[attr.key].history
+        old = history.deleted
+        if not old and (obj.__tablename__, state.identity, attr.key) in touched:
+            # flag_modified() by concurrency._touch(), which noted the value first
+            old = [touched[(obj.__tablename__, state.identity, attr.key)]]
+        # Otherwise no "deleted" side means the old value was never known (new
+        # row, or flag_modified() without a real change): nothing to diff
+        if old and history.added and not _same(old[0], history.added[0]):
+            changes[attr.key] = [_jsonable(old[0]), _jsonable(history.added[0])]
+    return changes
+
+
+def _merge_changes(into, changes):
+    for key, (old, new) in changes.items():
+        if key in into:
+            into[key][1] = new  # keep the oldest "before", latest "after"
+        else:
+            into[key] = [old, new]
+
+
+@event.listens_for(db.session, "after_flush")
+def _collect_diffs(session, flush_context):
+    diffs = session.info.setdefault("audit_diffs", {})
+    for obj in session.dirty:
+        changes = _column_changes(obj)
+        if changes:
+            key = (obj.__tablename__, inspect(obj).identity)
+            _merge_changes(diffs.setdefault(key, {}), changes)
+    session.info.pop("touched_values", None)  # flushed: history knows the old values again
+
+
+@event.listens_for(db.session, "after_rollback")
+def _discard_diffs(session):
+    session.info.pop("audit_diffs", None)
+    session.info.pop("touched_values", None)
+
+
+def entity_diff(obj):
+    """
+    Everything changed on `obj` in this session so far, flushed or not.
+    """
+    state = inspect(obj)
+    changes = {}
+    flushed = db.session.info.get("audit_diffs", {})
+    if state.identity is not None:
+        _merge_changes(changes, flushed.pop((obj.__tablename__, state.identity), {}))
+    if not state.expired and not state.deleted:
+        _merge_changes(changes, _column_changes(obj))
+    return changes
+
+
+# ---- Queue + writer ----
+
+
+def record_event(actor, action, target, entity=None):
+    """
+    Queue one audit row. `entity` is the ORM object the action was about.
+    """
+    entity_type = entity_id = diff = None
+    if entity is not None:
+        entity_type = entity.__tablename__
+        identity = inspect(entity).identity
+        entity_id = identity[0] if identity else None
+        changes = entity_diff(entity)
+        diff = json.dumps(changes, ensure_ascii=False) if changes else None
+
+    _queue.put(
+        {
+            "timestamp": datetime.now(),
+            "actor": actor,
+            "action": action,
+            "entity_type": entity_type,
+            "entity_id": entity_id,
+            "target": target,
+            "diff": diff,
+        }
+    )
+
+
+def _write_batch(engine, rows):
+    for attempt in range(3):
+        try:
+            with engine.begin() as conn:
+                conn.execute(AuditEvent.__table__.insert(), rows)
+            return
+        except Exception as e:  # e.g. "database is locked" while a request commits
+            if attempt == 2:
+                logger.warning(f"⚠️ Dropped {len(rows)} audit event(s): {e}")
+            else:
+                time.sleep(0.2 * (attempt + 1))
+
+
+def _drain(engine):
+    while True:
+        rows = [_queue.get()]
+        deadline = time.monotonic() + FLUSH_INTERVAL
+        while len(rows) < BATCH_SIZE:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                rows.append(_queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        _write_batch(engine, rows)
+        for _ in rows:
+            _queue.task_done()
+
+
+def flush(timeout=None):
+    """
+    Block until every queued event is written (used at exit and by scripts).
+    """
+    if _writer is None:
+        return
+    if timeout is None:
+        _queue.join()
+        return
+    deadline = time.monotonic() + timeout
+    while _queue.unfinished_tasks and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+
+def init_audit(app):
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            return
+        with app.app_context():
+            engine = db.engine
+        _writer = threading.Thread(
+            target=_drain, args=(engine,), name="audit-writer", daemon=True
+        )
+        _writer.start()
+    atexit.register(flush, timeout=5)
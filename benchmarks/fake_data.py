@@ -0,0 +1,198 @@
+import os
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from config import COLUMNS
+from extensions import db
+from models import (
+    ActionItem,
+    ActionItemUpdate,
+    Contact,
+    Customer,
+    CustomerOpportunity,
+    Division,
+    HeatmapCell,
+    Meeting,
+    Partner,
+    RecurringMeeting,
+)
+
+# --------------------- SYNTHETIC CRM DATA ---------------------
+# Seeded, so two runs with the same arguments produce the same dataset.
+
+FIRST_NAMES = ["Alex", "Sam", "Jordan", "Taylor", "Morgan", "Casey", "Riley", "Jamie", "Avery", "Quinn"]
+LAST_NAMES = ["Lee", "Patel", "Garcia", "Kim", "Nguyen", "Smith", "Chen", "Lopez", "Brown", "Singh"]
+ROLES = ["Engineer", "Architect", "Manager", "Director", "VP", "Analyst", "Buyer"]
+TECHNOLOGIES = ["Security", "Wireless", "DC Networking", "Collab", "Compute", "Meraki"]
+PATTERNS = ["daily", "weekly", "biweekly", "monthly"]
+COLORS = ["red", "yellow", "green", ""]
+
+
+def _person(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {rng.randint(100, 999)}"
+
+
+def generate_dataset(
+    seed=42,
+    customers=40,
+    contacts_per_customer=150,
+    chain_depth=30,
+    divisions_per_customer=8,
+    meetings_per_customer=40,
+    recurring_per_customer=4,
+    action_items_per_customer=30,
+    updates_per_item=3,
+    partners=15,
+):
+    """
+    Fill the current database with a synthetic CRM. Needs an app context.
+
+    Every customer gets one `reports_to` chain `chain_depth` deep; the rest
+    of its contacts report to a random earlier contact, so org charts are
+    both deep and bushy.
+    """
+    rng = random.Random(seed)
+    today = date.today()
+
+    partner_rows = [Partner(name=f"Partner {i:03d}", notes="Synthetic partner") for i in range(partners)]
+    db.session.add_all(partner_rows)
+
+    for c in range(customers):
+        customer = Customer(
+            name=f"Customer {c:04d}",
+            cx_services="Synthetic CX services",
+            notes=f"Synthetic account #{c}",
+        )
+        customer.partners = rng.sample(partner_rows, k=min(3, len(partner_rows)))
+        db.session.add(customer)
+
+        # 👥 Contacts: one deep chain, then random managers
+        contacts = []
+        for i in range(contacts_per_customer):
+            contact = Contact(
+                name=_person(rng),
+                email=f"c{c}.{i}@example.com",
+                role=rng.choice(ROLES),
+                technology=rng.choice(TECHNOLOGIES),
+                contact_type="Customer",
+                customer=customer,
+            )
+            if 0 < i < chain_depth:
+                contact.manager = contacts[i - 1]
+            elif i >= chain_depth:
+                contact.manager = rng.choice(contacts)
+            contacts.append(contact)
+        db.session.add_all(contacts)
+
+        # 🏢 Divisions: a root plus children, each with a few contacts
+        root = Division(name=customer.name, customer=customer)
+        db.session.add(root)
+        for d in range(divisions_per_customer):
+            division = Division(name=f"Division {d}", customer=customer, parent=root)
+            division.contacts = rng.sample(contacts, k=min(5, len(contacts)))
+            db.session.add(division)
+
+        for o in range(5):
+            db.session.add(
+                CustomerOpportunity(
+                    customer=customer,
+                    title=f"Opportunity {o}",
+                    stage=rng.choice(["Identified", "POC", "Proposal"]),
+                    value=str(rng.randint(10, 900) * 1000),
+                )
+            )
+
+        # 🗓 Meetings and recurring meetings
+        for m in range(meetings_per_customer):
+            meeting = Meeting(
+                customer=customer,
+                date=(today - timedelta(days=rng.randint(0, 720))).isoformat(),
+                title=f"Sync {m}",
+                host=_person(rng),
+                notes="Synthetic meeting notes",
+            )
+            meeting.participants = rng.sample(contacts, k=min(4, len(contacts)))
+            db.session.add(meeting)
+
+        for r in range(recurring_per_customer):
+            start = datetime.combine(
+                today - timedelta(days=rng.randint(0, 365)),
+                datetime.min.time(),
+            ) + timedelta(hours=rng.randint(8, 17))
+            db.session.add(
+                RecurringMeeting(
+                    customer=customer,
+                    title=f"Cadence {r}",
+                    host=_person(rng),
+                    start_datetime=start,
+                    recurrence_pattern=rng.choice(PATTERNS),
+                    repeat_until=today + timedelta(days=365),
+                    duration_minutes=rng.choice([30, 60]),
+                )
+            )
+
+        # ✅ Action items with updates
+        for a in range(action_items_per_customer):
+            item = ActionItem(
+                customer=customer,
+                date=(today - timedelta(days=rng.randint(0, 365))).isoformat(),
+                detail=f"Follow up on item {a}",
+                customer_contact=rng.choice(contacts).name,
+                cisco_contact=_person(rng),
+                completed=rng.random() < 0.6,
+                category=rng.choice(["daily", "strategic"]),
+            )
+            item.updates = [
+                ActionItemUpdate(
+                    update_text=f"Update {u}",
+                    timestamp=datetime.now() - timedelta(days=rng.randint(0, 90)),
+                )
+                for u in range(updates_per_item)
+            ]
+            db.session.add(item)
+
+        db.session.flush()
+
+        # 🔥 Heatmap (HeatmapCell has no relationship, so it needs the flushed id)
+        for column in COLUMNS:
+            color = rng.choice(COLORS)
+            if color:
+                db.session.add(
+                    HeatmapCell(
+                        customer_id=customer.id,
+                        column_name=column,
+                        color=color,
+                        text=f"{column[:3]} {rng.randint(1, 9)}",
+                    )
+                )
+
+    db.session.commit()
+
+
+# --------------------- SYNTHETIC ONEDRIVE TREE ---------------------
+
+
+def generate_onedrive_tree(root, files=100_000, seed=42, customers=40, today_ratio=0.02):
+    """
+    Create `files` empty files under `root`, spread over customer folders
+    three levels deep. About `today_ratio` of them get today's mtime, the
+    rest are backdated.
+    """
+    rng = random.Random(seed)
+    now = time.time()
+    folders = []
+    for c in range(customers):
+        for sub in ("Proposals", "Designs", "QBR", "Contracts"):
+            for year in ("2023", "2024", "2025"):
+                folders.append(os.path.join(root, f"Customer_{c:04d}", sub, year))
+    for folder in folders:
+        os.makedirs(folder, exist_ok=True)
+
+    for i in range(files):
+        path = os.path.join(rng.choice(folders), f"doc_{i:06d}.pdf")
+        with open(path, "w"):
+            pass
+        if rng.random() >= today_ratio:
+            old = now - rng.randint(2, 700) * 86400
+            os.utime(path, (old, old))
@@ -0,0 +1,158 @@
+"""
+Time the main endpoints against a synthetic CRM through the Flask test client.
+
+    python benchmarks/run_benchmarks.py --customers 40 --files 100000 --repeat 20
+
+Everything (database, OneDrive tree, uploads) is created in a scratch
+directory, so the real .env paths are never touched.
+"""
+
+import argparse
+import io
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--customers", type=int, default=40)
+    parser.add_argument("--contacts-per-customer", type=int, default=150)
+    parser.add_argument("--chain-depth", type=int, default=30)
+    parser.add_argument("--files", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workdir", help="Reuse a scratch dir (skips regenerating the file tree)")
+    return parser.parse_args()
+
+
+def prepare_environment(workdir):
+    onedrive = os.path.join(workdir, "onedrive")
+    os.makedirs(os.path.join(onedrive, "APP"), exist_ok=True)
+    os.environ["ONEDRIVE_PATH"] = onedrive
+    os.environ["DATABASE_PATH"] = os.path.join(workdir, "bench.db")
+    # config.py derives uploads/, instance/ and static/logos from the cwd
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_ROOT)
+    return onedrive
+
+
+def import_csv_payload(rows=200):
+    lines = ["name,email,role,contact_type,customer_name"]
+    for i in range(rows):
+        lines.append(f"Imported {i},imp{i}@example.com,Engineer,Customer,Customer 0000")
+    return "\n".join(lines).encode("utf-8")
+
+
+def measure_cold_start(runs=5):
+    """
+    Median ms for a fresh interpreter to import and set up the app, i.e.
+    what a worker restart or a test run pays before the first request.
+    """
+    script = (
+        "import sys, time; started = time.perf_counter(); "
+        f"sys.path.insert(0, {REPO_ROOT!r}); "
+        "from app import create_app; create_app(); "
+        "print((time.perf_counter() - started) * 1000)"
+    )
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", script], capture_output=True, text=True, check=True
+        )
+        samples.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def main():
+    args = parse_args()
+    workdir = args.workdir or tempfile.mkdtemp(prefix="crm_bench_")
+    onedrive = prepare_environment(workdir)
+    fresh = not os.path.exists(os.environ["DATABASE_PATH"])
+
+    from app import create_app
+    from benchmarks.fake_data import generate_dataset, generate_onedrive_tree
+    from extensions import db
+    from loader_plans import count_queries
+    from models import Customer
+
+    app = create_app()
+    app.config["TESTING"] = True
+
+    if fresh:
+        started = time.perf_counter()
+        generate_onedrive_tree(
+            onedrive, files=args.files, seed=args.seed, customers=args.customers
+        )
+        with app.app_context():
+            db.create_all()
+            generate_dataset(
+                seed=args.seed,
+                customers=args.customers,
+                contacts_per_customer=args.contacts_per_customer,
+                chain_depth=args.chain_depth,
+            )
+        print(f"🧪 Generated dataset in {time.perf_counter() - started:.1f}s → {workdir}")
+
+    with app.app_context():
+        customer_id = Customer.query.order_by(Customer.id).first().id
+
+    print(f"🧊 Cold start (import + create_app): {measure_cold_start():.0f} ms")
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["username"] = "Bench"
+
+    endpoints = [
+        ("dashboard", "GET", "/dashboard", None),
+        ("search", "GET", "/search?q=customer 0001", None),
+        ("search_files", "GET", "/search/files?q=customer 0001", None),
+        ("files", "GET", "/files", None),
+        ("files_scan", "GET", "/files/scan", None),
+        ("heatmap", "GET", "/heatmap", None),
+        ("customer_detail", "GET", f"/customer/{customer_id}", None),
+        ("export_contacts", "GET", "/contacts/export_csv", None),
+        ("export_action_items", "GET", "/action_items/export_csv", None),
+        ("import_contacts", "POST", "/contacts/import_csv", "csv"),
+    ]
+
+    print(f"{'endpoint':<22}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}{'queries':>10}")
+    for name, method, url, body in endpoints:
+        timings, queries = [], []
+        for _ in range(args.repeat):
+            kwargs = {}
+            if body == "csv":
+                kwargs = {
+                    "data": {"csv_file": (io.BytesIO(import_csv_payload()), "bench.csv")},
+                    "content_type": "multipart/form-data",
+                }
+            with app.app_context(), count_queries() as counter:
+                started = time.perf_counter()
+                response = client.open(url, method=method, **kwargs)
+                response.get_data()  # streamed responses finish here
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(counter.count)
+            if response.status_code >= 400:
+                print(f"⚠️ {name}: HTTP {response.status_code}")
+                break
+
+        print(
+            f"{name:<22}{percentile(timings, 50):>10.1f}{percentile(timings, 90):>10.1f}"
+            f"{percentile(timings, 99):>10.1f}{max(timings):>10.1f}"
+            f"{statistics.median(queries):>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
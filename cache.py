@@ -0,0 +1,158 @@
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect, select
+
+from extensions import db
+from shared_cache import shared_store
+
+
+# --------------------- FRAGMENT CACHE ---------------------
+
+
+class MemoryCache:
+    """
+    Small thread-safe LRU cache for rendered fragments and derived views.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+fragment_cache = MemoryCache()
+
+# Version counters, keyed by scope: a customer id for that customer's graph,
+# or CONTACTS_SCOPE for anything derived from the full contact list.
+# Bumping a scope orphans every entry cached under the old version; the
+# epoch does the same for all scopes at once (bulk UPDATE/DELETE statements
+# we can't attribute). Counters live in the shared store, so a commit in one
+# worker process orphans the entries cached by all of them.
+CONTACTS_SCOPE = "contacts"
+
+
+def get_version(scope):
+    epoch, version = shared_store.get_many(["cache_epoch", f"cache_version:{scope}"], 0)
+    return epoch, version
+
+
+def bump_versions(*scopes):
+    for scope in scopes:
+        shared_store.incr(f"cache_version:{scope}")
+
+
+def bump_all_versions():
+    shared_store.incr("cache_epoch")
+
+
+def versioned_key(name, scope):
+    epoch, version = get_version(scope)
+    return f"{name}:{scope}:{epoch}:{version}"
+
+
+# --------------------- INVALIDATION ---------------------
+
+
+def _attr_values(obj, attr):
+    """
+    Current value of `attr` plus whatever it held before this flush.
+    """
+    history = inspect(obj).attrs[attr].history
+    return [v for v in (*history.added, *history.unchanged, *history.deleted) if v]
+
+
+def _scopes_for(session, obj):
+    from models import Contact, Customer, Division, Partner, partner_customer
+
+    if isinstance(obj, Customer):
+        return {obj.id}
+    if isinstance(obj, Partner):
+        if "customers" in inspect(obj).unloaded:
+            # Edits that only sync link rows (associations.py) never load the
+            # collection, but a renamed partner still shows on every customer page
+            return set(
+                session.execute(
+                    select(partner_customer.c.customer_id).where(partner_customer.c.partner_id == obj.id)
+                ).scalars()
+            )
+        return {c.id for c in _attr_values(obj, "customers")}
+
+    scopes = {CONTACTS_SCOPE} if isinstance(obj, Contact) else set()
+    if hasattr(obj, "customer_id"):
+        scopes.update(_attr_values(obj, "customer_id"))
+    if hasattr(obj, "reports_to"):
+        # A contact moving under a new manager changes that manager's tree too
+        for manager_id in _attr_values(obj, "reports_to"):
+            manager = session.get(type(obj), manager_id)
+            if manager and manager.customer_id:
+                scopes.add(manager.customer_id)
+    if hasattr(obj, "division_id"):
+        for division_id in _attr_values(obj, "division_id"):
+            division = session.get(Division, division_id)
+            if division and division.customer_id:
+                scopes.add(division.customer_id)
+    return scopes
+
+
+@event.listens_for(db.session, "after_flush")
+def _collect_touched_scopes(session, flush_context):
+    touched = session.info.setdefault("touched_scopes", set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        touched.update(_scopes_for(session, obj))
+
+
+# Bookkeeping tables nothing is cached from; writes to them never invalidate
+UNTRACKED_TABLES = {"audit_event", "file_index"}
+
+
+@event.listens_for(db.session, "do_orm_execute")
+def _collect_bulk_statements(orm_execute_state):
+    if not (
+        orm_execute_state.is_update
+        or orm_execute_state.is_delete
+        or orm_execute_state.is_insert
+    ):
+        return
+    # Statements that know exactly which scopes they change (associations.py)
+    scopes = orm_execute_state.execution_options.get("cache_scopes")
+    if scopes is not None:
+        orm_execute_state.session.info.setdefault("touched_scopes", set()).update(scopes)
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    if table is not None and table.name in UNTRACKED_TABLES:
+        return
+    orm_execute_state.session.info["touched_all_scopes"] = True
+
+
+@event.listens_for(db.session, "after_commit")
+def _bump_touched_scopes(session):
+    touched = session.info.pop("touched_scopes", set())
+    if session.info.pop("touched_all_scopes", False):
+        bump_all_versions()
+    if touched:
+        bump_versions(*touched)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _discard_touched_scopes(session):
+    session.info.pop("touched_scopes", None)
+    session.info.pop("touched_all_scopes", None)
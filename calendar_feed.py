@@ -0,0 +1,128 @@
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from cache import MemoryCache
+from extensions import db
+from models import Customer, RecurringMeeting
+
+logger = logging.getLogger("crm_logger")
+
+# --------------------- RECURRING MEETINGS ICS FEED ---------------------
+# Each VEVENT is rendered once and cached under the meeting's row version, so
+# a feed rebuild only re-renders meetings that changed since the last one.
+# Whole feeds are cached per customer filter with an ETag derived from the
+# (id, version) list; an unchanged feed is answered from memory, or with a
+# 304 when the calendar client sends the ETag back.
+#
+# icalendar is imported on first use: it's the slowest import in the app and
+# most worker processes never serve a calendar.
+
+FREQ_MAP = {
+    "daily": "DAILY",
+    "weekly": "WEEKLY",
+    "biweekly": "WEEKLY",
+    "monthly": "MONTHLY",
+}
+
+_events = {}  # meeting id → (cache key, VEVENT bytes)
+# customer id or None → (etag, last_modified, body); an LRU, since any
+# ?customer_id= (even one that doesn't exist) gets an entry
+_feeds = MemoryCache(max_entries=64)
+_lock = threading.Lock()
+
+
+def recurring_event(meeting, location=None):
+    """
+    VEVENT with an RRULE for one recurring meeting.
+    """
+    from icalendar import Event
+
+    event = Event()
+    event.add("uid", f"recurring-{meeting.id}@customer-crm")
+    event.add("dtstamp", datetime.utcnow())
+    event.add("summary", meeting.title)
+    event.add("dtstart", meeting.start_datetime)
+    event.add(
+        "dtend",
+        meeting.start_datetime + timedelta(minutes=meeting.duration_minutes or 60),
+    )
+    event.add("description", meeting.description or "")
+    event.add("location", location if location is not None else meeting.customer.name)
+    rrule = {
+        "FREQ": FREQ_MAP.get(meeting.recurrence_pattern, "WEEKLY"),
+        "INTERVAL": 2 if meeting.recurrence_pattern == "biweekly" else 1,
+    }
+    if meeting.repeat_until:  # no end date → repeats indefinitely
+        rrule["UNTIL"] = meeting.repeat_until
+    event.add("rrule", rrule)
+    return event
+
+
+def single_event_calendar(meeting, location=None):
+    from icalendar import Calendar
+
+    cal = Calendar()
+    cal.add("prodid", "-//Customer CRM//Recurring Meetings//EN")
+    cal.add("version", "2.0")
+    cal.add_component(recurring_event(meeting, location))
+    return cal.to_ical()
+
+
+def _feed_shell(name):
+    from icalendar import Calendar
+
+    cal = Calendar()
+    cal.add("prodid", "-//Customer CRM//Recurring Meetings//EN")
+    cal.add("version", "2.0")
+    cal.add("x-wr-calname", name)
+    head, _, tail = cal.to_ical().partition(b"END:VCALENDAR")
+    return head, b"END:VCALENDAR" + tail
+
+
+def build_feed(customer_id=None):
+    """
+    (etag, last_modified, ics bytes) for all recurring meetings, or one
+    customer's. Only the (id, version) index is read when nothing changed.
+    """
+    query = select(
+        RecurringMeeting.id, RecurringMeeting.version, Customer.name
+    ).join(Customer, RecurringMeeting.customer_id == Customer.id)
+    if customer_id:
+        query = query.where(RecurringMeeting.customer_id == customer_id)
+    rows = db.session.execute(query.order_by(RecurringMeeting.id)).all()
+
+    # Customer name is the LOCATION, so renaming a customer changes the event
+    keys = {meeting_id: (version, name) for meeting_id, version, name in rows}
+    etag = hashlib.sha1(repr(sorted(keys.items())).encode("utf-8")).hexdigest()
+
+    with _lock:
+        cached = _feeds.get(customer_id)
+        if cached and cached[0] == etag:
+            return cached
+        stale = [i for i, key in keys.items() if _events.get(i, (None,))[0] != key]
+
+    rendered = {}
+    if stale:
+        for m in RecurringMeeting.query.filter(RecurringMeeting.id.in_(stale)).all():
+            try:
+                rendered[m.id] = (keys[m.id], recurring_event(m, keys[m.id][1]).to_ical())
+            except Exception as e:  # one bad meeting shouldn't take down the feed
+                logger.warning(f"⚠️ Skipped recurring meeting {m.id} in ICS feed: {e}")
+
+    with _lock:
+        _events.update(rendered)
+        head, tail = _feed_shell(
+            "Recurring meetings" if not customer_id or not rows else f"{rows[0][2]} meetings"
+        )
+        body = head + b"".join(_events[i][1] for i in keys if i in _events) + tail
+        feed = (etag, datetime.utcnow().replace(microsecond=0), body)
+        _feeds.set(customer_id, feed)
+        if customer_id is None:
+            # The unfiltered feed lists every meeting, so anything not in it is gone
+            for meeting_id in set(_events) - set(keys):
+                del _events[meeting_id]
+    return feed
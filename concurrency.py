@@ -0,0 +1,274 @@
+from flask import flash, request
+from sqlalchemy import inspect
+from sqlalchemy.orm.attributes import flag_modified
+from sqlalchemy.orm.exc import StaleDataError
+from werkzeug.datastructures import MultiDict
+
+from extensions import db
+from models import Customer, Division
+from shared_cache import shared_store
+
+
+# --------------------- OPTIMISTIC CONCURRENCY ---------------------
+# Every editable model has a `version` column (SQLAlchemy version_id_col).
+# Edit forms post the version they were rendered from; if the row has moved
+# on since, the two sets of changes are merged field by field, and only
+# fields both people changed are put back to the user as a conflict.
+
+
+def _text(value):
+    return "" if value is None else str(value).replace("\r\n", "\n")
+
+
+def _ids(items):
+    return sorted(str(i.id) for i in items)
+
+
+def _customer_name(value):
+    customer = db.session.get(Customer, int(value)) if value else None
+    return customer.name if customer else "—"
+
+
+def _division_names(values):
+    if not values:
+        return "—"
+    divisions = Division.query.filter(Division.id.in_(values)).all()
+    return ", ".join(sorted(d.name for d in divisions))
+
+
+def _customer_names(values):
+    if not values:
+        return "—"
+    customers = Customer.query.filter(Customer.id.in_(values)).all()
+    return ", ".join(sorted(c.name for c in customers))
+
+
+# Form field → (label, current value(s) from the row, optional display)
+EDIT_FIELDS = {
+    "contact": {
+        "name": ("Name", lambda c: c.name),
+        "email": ("Email", lambda c: c.email),
+        "phone": ("Phone", lambda c: c.phone),
+        "role": ("Role", lambda c: c.role),
+        "location": ("Location", lambda c: c.location),
+        "reports_to": ("Reports To", lambda c: c.reports_to),
+        "notes": ("Notes", lambda c: c.notes),
+        "contact_type": ("Type", lambda c: c.contact_type),
+        "customer_id": ("Customer", lambda c: c.customer_id, _customer_name),
+        "partner_id": ("Partner", lambda c: c.partner_id),
+        "division_ids": ("Divisions", lambda c: _ids(c.divisions), _division_names),
+    },
+    "partner": {
+        "name": ("Name", lambda p: p.name),
+        "notes": ("Notes", lambda p: p.notes),
+        "customer_ids": ("Customers", lambda p: _ids(p.customers), _customer_names),
+    },
+    "customer": {
+        "name": ("Name", lambda c: c.name),
+        "cx_services": ("CX Services", lambda c: c.cx_services),
+        "notes": ("Notes", lambda c: c.notes),
+    },
+    "action_item": {
+        "date": ("Date", lambda i: i.date),
+        "detail": ("Detail", lambda i: i.detail),
+        "customer_id": ("Customer", lambda i: i.customer_id, _customer_name),
+        "customer_contact": ("Customer Contact", lambda i: i.customer_contact),
+        "cisco_contact": ("Cisco Contact", lambda i: i.cisco_contact),
+        "completed": ("Completed", lambda i: "on" if i.completed else None),
+        "category": ("Category", lambda i: i.category),
+    },
+    "meeting": {
+        "date": ("Date", lambda m: m.date),
+        "title": ("Title", lambda m: m.title),
+        "host": ("Host", lambda m: m.host),
+        "notes": ("Notes", lambda m: m.notes),
+        "customer_id": ("Customer", lambda m: m.customer_id, _customer_name),
+    },
+    "recurring_meeting": {
+        "start_datetime": (
+            "Start",
+            lambda m: m.start_datetime.strftime("%Y-%m-%dT%H:%M") if m.start_datetime else None,
+        ),
+        "duration_minutes": ("Duration (min)", lambda m: m.duration_minutes),
+        "title": ("Title", lambda m: m.title),
+        "customer_id": ("Customer", lambda m: m.customer_id, _customer_name),
+        "host": ("Host", lambda m: m.host),
+        "recurrence_pattern": ("Recurrence", lambda m: m.recurrence_pattern),
+        "repeat_until": ("Repeat Until", lambda m: m.repeat_until),
+        "description": ("Description", lambda m: m.description),
+    },
+}
+
+# What each form looked like when it was rendered, so a later save can tell
+# "they changed it" apart from "I changed it". Shared, because the form may
+# be rendered by one worker process and posted to another.
+FORM_SNAPSHOT_TTL = 12 * 3600
+
+
+def _values(raw):
+    if isinstance(raw, list):
+        return raw
+    text = _text(raw)
+    return [text] if text else []
+
+
+def _form_values(form, name):
+    return [v for v in (_text(v) for v in form.getlist(name)) if v]
+
+
+def _describe(name, values, display):
+    if display is None:
+        return "\n".join(values) or "—"
+    if name.endswith("_ids"):
+        return display(values)
+    return display(values[0] if values else None)
+
+
+def _set_values(form, name, values):
+    # Checkboxes and multi-selects are simply absent when empty; text inputs post ""
+    if values or name == "completed" or name.endswith("_ids"):
+        form.setlist(name, values)
+    else:
+        form.setlist(name, [""])
+
+
+def _same(a, b):
+    return sorted(a) == sorted(b)
+
+
+def _snapshot_key(entity_type, obj, version):
+    return f"form:{entity_type}:{obj.id}:{version}"
+
+
+def snapshot(entity_type, obj):
+    return {
+        name: _values(spec[1](obj)) for name, spec in EDIT_FIELDS[entity_type].items()
+    }
+
+
+def remember_version(entity_type, obj):
+    """
+    Call when rendering an edit form for `obj`.
+    """
+    shared_store.set(
+        _snapshot_key(entity_type, obj, obj.version), snapshot(entity_type, obj), ttl=FORM_SNAPSHOT_TTL
+    )
+
+
+class EditConflict(Exception):
+    """
+    Raised when a save would overwrite someone else's change to the same field.
+    Rendered by the EditConflict error handler as a merge/retry prompt.
+    """
+
+    def __init__(self, entity_type, obj, form, conflicts):
+        super().__init__(f"{entity_type} {obj.id} changed while being edited")
+        self.entity_type = entity_type
+        self.entity_id = obj.id
+        self.version = obj.version
+        self.form = form
+        self.conflicts = conflicts  # [{name, label, mine, saved}]
+        self.retry_url = request.url
+
+    def hidden_fields(self):
+        """
+        (name, value) pairs that re-post everything the user typed.
+        """
+        for name, values in self.form.lists():
+            if name == "version":
+                continue
+            for value in values:
+                yield name, value
+        for conflict in self.conflicts:
+            for value in conflict["saved_values"]:
+                yield f"__saved__{conflict['name']}", value
+
+
+def merged_form():
+    """
+    request.form with the choices from a conflict prompt applied:
+    `__keep__<field>=saved` swaps in the saved value(s) for that field.
+    """
+    form = MultiDict(request.form)
+    for key in list(form.keys()):
+        if key.startswith("__keep__") and form.get(key) == "saved":
+            name = key[len("__keep__"):]
+            _set_values(form, name, form.getlist(f"__saved__{name}"))
+    for key in list(form.keys()):
+        if key.startswith("__"):
+            form.poplist(key)
+    return form
+
+
+def _reconcile(entity_type, obj, form, submitted):
+    fields = EDIT_FIELDS[entity_type]
+    base = shared_store.get(_snapshot_key(entity_type, obj, submitted))
+    conflicts = []
+    for name, spec in fields.items():
+        label, getter = spec[0], spec[1]
+        display = spec[2] if len(spec) > 2 else None
+        mine = _form_values(form, name)
+        saved = _values(getter(obj))
+        if _same(mine, saved):
+            continue
+        if base is not None:
+            original = base[name]
+            if _same(original, saved):
+                continue  # only this user changed it
+            if _same(original, mine):
+                _set_values(form, name, saved)  # only the other user changed it
+                continue
+        conflicts.append(
+            {
+                "name": name,
+                "label": label,
+                "mine": _describe(name, mine, display),
+                "saved": _describe(name, saved, display),
+                "saved_values": saved,
+            }
+        )
+    return conflicts
+
+
+def _touch(obj):
+    # Relationship-only edits don't UPDATE the row, so force one to bump `version`.
+    # Done before the route assigns anything, so an autoflush can't bump it twice.
+    state = inspect(obj)
+    for column in state.mapper.column_attrs:
+        if column.key != "version" and not column.columns[0].primary_key:
+            # flag_modified() forgets the old value; audit.py needs it for the diff
+            touched = db.session.info.setdefault("touched_values", {})
+            touched[(obj.__tablename__, state.identity, column.key)] = getattr(obj, column.key)
+            flag_modified(obj, column.key)
+            return
+
+
+def versioned_form(entity_type, obj):
+    """
+    The submitted form, merged with anything saved since it was rendered.
+    Raises EditConflict if both sides changed the same field.
+    """
+    form = merged_form()
+    submitted = form.get("version", type=int)
+    if submitted is not None and submitted != obj.version:
+        with db.session.no_autoflush:
+            conflicts = _reconcile(entity_type, obj, form, submitted)
+        if conflicts:
+            raise EditConflict(entity_type, obj, form, conflicts)
+        flash("🔀 Someone saved this record while you were editing — their changes were kept.", "info")
+
+    _touch(obj)
+    return form
+
+
+def commit_versioned(entity_type, obj, form):
+    """
+    Commit, turning a lost race (row updated between load and flush) into
+    an EditConflict instead of a 500.
+    """
+    try:
+        db.session.commit()
+    except StaleDataError:
+        db.session.rollback()
+        conflicts = _reconcile(entity_type, obj, form, form.get("version", type=int))
+        raise EditConflict(entity_type, obj, form, conflicts)
@@ -12,8 +12,6 @@ DATABASE_PATH = os.environ.get("DATABASE_PATH")
 
 if not ONEDRIVE_PATH or not DATABASE_PATH:
     raise RuntimeError("❌ Missing ONEDRIVE_PATH or DATABASE_PATH in .env.")
-print(f"📁 ONEDRIVE path: {ONEDRIVE_PATH}")
-print(f"🗃️ DATABASE path: {DATABASE_PATH}")
 
 # === Derived paths and config constants ===
 SKIP_FOLDERS = {"APP", "APP backup"}
@@ -25,9 +23,53 @@ LOGO_UPLOAD_FOLDER = os.path.join(
     os.getcwd(), "static", "logos"
 )  # avoid app reference here
 
+# === New-files counter ===
+# How often the background poller diffs the OneDrive tree against its mtime index
+# (stats folders only), and how often it re-stats every file for in-place edits
+FILE_POLL_SECONDS = float(os.environ.get("FILE_POLL_SECONDS", "300"))
+FILE_FULL_SCAN_SECONDS = float(os.environ.get("FILE_FULL_SCAN_SECONDS", str(4 * 3600)))
+
+# === Directory scans ===
+# Threads that walk the share/upload folders for /files, /search and syncs (file_scan.py)
+FILE_SCAN_WORKERS = int(os.environ.get("FILE_SCAN_WORKERS", "2"))
+
+# === Search ===
+# Hits per /search section before a "Show more" button (search.py)
+SEARCH_SECTION_LIMIT = int(os.environ.get("SEARCH_SECTION_LIMIT", "25"))
+
+# === Static assets ===
+# Serve the bundled, fingerprinted files from static/dist/ when `python assets.py build` made them
+STATIC_ASSETS_BUILD = os.environ.get("STATIC_ASSETS_BUILD", "1") == "1"
+# Loaded from here until `python assets.py vendor` has saved local copies under static/vendor/
+BOOTSTRAP_CDN = {
+    "vendor/bootstrap.min.css": "https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css",
+    "vendor/bootstrap.bundle.min.js": "https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js",
+}
+
+# === Logging ===
+# Log lines are buffered here and shipped to the OneDrive change log in batches
+LOG_BUFFER_DIR = os.path.join(os.getcwd(), "instance", "log_buffer")
+LOG_FLUSH_SECONDS = float(os.environ.get("LOG_FLUSH_SECONDS", "5"))
+
 SQLALCHEMY_DATABASE_URI = f"sqlite:///{DATABASE_PATH}"
 SQLALCHEMY_TRACK_MODIFICATIONS = False
-LOCK_FILE = os.path.join(ONEDRIVE_PATH, "APP", "db.lock")
+
+# === Read model ===
+# Serve dashboard/heatmap/customers/contacts/settings from the in-memory
+# snapshot in read_model.py; 0 re-reads the database on every request
+READ_MODEL = os.environ.get("READ_MODEL", "1") == "1"
+
+# === Shared cache ===
+# "memory" for the dev server; wsgi.py switches to "sqlite" so every worker
+# process shares cache versions, the read-model change feed and counters
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "memory")
+SHARED_CACHE_PATH = os.environ.get(
+    "SHARED_CACHE_PATH", os.path.join(os.getcwd(), "instance", "shared_cache.sqlite")
+)
+
+# === Profiling ===
+# Force the per-request profiling panel on for everyone (otherwise ?profile=1 per session)
+PROFILE_PANEL = os.environ.get("PROFILE_PANEL") == "1"
 
 # === Heatmap columns ===
 COLUMNS = [
@@ -44,9 +86,15 @@ COLUMNS = [
     "Meraki",
 ]
 
-os.makedirs(LOGO_UPLOAD_FOLDER, exist_ok=True)
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-os.makedirs(BACKUP_LOCAL_DIR, exist_ok=True)
+
+def ensure_directories():
+    """
+    Create the local folders uploads and backups are saved into. Called by
+    create_app(), not on import.
+    """
+    for folder in (LOGO_UPLOAD_FOLDER, UPLOAD_FOLDER, BACKUP_LOCAL_DIR):
+        os.makedirs(folder, exist_ok=True)
+
 
 USERS = {
     "nik": "cisco123",
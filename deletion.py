@@ -0,0 +1,141 @@
+from collections import OrderedDict
+
+from sqlalchemy import delete, func, select, update
+
+from extensions import db
+from models import (
+    ActionItem,
+    Contact,
+    Customer,
+    CustomerOpportunity,
+    CustomerProject,
+    CustomerTechnology,
+    Division,
+    DivisionDocument,
+    DivisionOpportunity,
+    DivisionProject,
+    DivisionTechnology,
+    HeatmapCell,
+    Meeting,
+    MeetingOccurrence,
+    Partner,
+    RecurringMeeting,
+    division_contact,
+    meeting_participants,
+    opportunity_contacts,
+    partner_customer,
+)
+
+
+# --------------------- DELETION SERVICE ---------------------
+# Cascades as a fixed list of set-based UPDATE/DELETE statements, so removing
+# a customer with 10 or 10,000 related rows costs the same number of queries.
+# Statements run on db.session and are committed together by the caller;
+# the bulk-statement hooks (fragment cache, typeahead, occurrences) see them.
+#
+# Each step is (label, table, where clause, values); values=None deletes the
+# matching rows, otherwise they are updated. dry_run=True only counts.
+
+
+def _run(steps, dry_run):
+    counts = OrderedDict()
+    for label, table, where, values in steps:
+        if dry_run:
+            counts[label] = db.session.execute(
+                select(func.count()).select_from(table).where(where)
+            ).scalar()
+            continue
+        if values is None:
+            statement = delete(table).where(where)
+        else:
+            if "version" in table.c:
+                # Like an ORM save, so open edit forms see the row changed
+                values = {**values, "version": table.c.version + 1}
+            statement = update(table).where(where).values(**values)
+        counts[label] = db.session.execute(
+            statement, execution_options={"synchronize_session": False}
+        ).rowcount
+    return counts
+
+
+def _t(model):
+    return model.__table__
+
+
+def contact_steps(contact_ids):
+    """
+    `contact_ids`: a list or a SELECT of ids.
+    """
+    contact = _t(Contact)
+    return [
+        ("Division links", division_contact, division_contact.c.contact_id.in_(contact_ids), None),
+        ("Meeting participations", meeting_participants, meeting_participants.c.contact_id.in_(contact_ids), None),
+        ("Opportunity links", opportunity_contacts, opportunity_contacts.c.contact_id.in_(contact_ids), None),
+        ("Direct reports unlinked", contact, contact.c.reports_to.in_(contact_ids), {"reports_to": None}),
+        ("Contacts", contact, contact.c.id.in_(contact_ids), None),
+    ]
+
+
+def customer_steps(customer_id):
+    division_ids = select(_t(Division).c.id).where(_t(Division).c.customer_id == customer_id)
+    opportunity_ids = select(_t(CustomerOpportunity).c.id).where(
+        _t(CustomerOpportunity).c.customer_id == customer_id
+    )
+    return [
+        # Kept, but no longer tied to the customer
+        ("Action items unlinked", _t(ActionItem), _t(ActionItem).c.customer_id == customer_id, {"customer_id": None}),
+        ("Meetings unlinked", _t(Meeting), _t(Meeting).c.customer_id == customer_id, {"customer_id": None}),
+        (
+            "Contacts unassigned",
+            _t(Contact),
+            _t(Contact).c.customer_id == customer_id,
+            {"customer_id": None, "contact_type": "Unassigned"},
+        ),
+        # Can't exist without the customer (customer_id is NOT NULL)
+        ("Meeting occurrences", _t(MeetingOccurrence), _t(MeetingOccurrence).c.customer_id == customer_id, None),
+        ("Recurring meetings", _t(RecurringMeeting), _t(RecurringMeeting).c.customer_id == customer_id, None),
+        ("Division links", division_contact, division_contact.c.division_id.in_(division_ids), None),
+        ("Division documents", _t(DivisionDocument), _t(DivisionDocument).c.division_id.in_(division_ids), None),
+        ("Division opportunities", _t(DivisionOpportunity), _t(DivisionOpportunity).c.division_id.in_(division_ids), None),
+        ("Division technologies", _t(DivisionTechnology), _t(DivisionTechnology).c.division_id.in_(division_ids), None),
+        ("Division projects", _t(DivisionProject), _t(DivisionProject).c.division_id.in_(division_ids), None),
+        ("Divisions", _t(Division), _t(Division).c.customer_id == customer_id, None),
+        ("Opportunity contacts", opportunity_contacts, opportunity_contacts.c.opportunity_id.in_(opportunity_ids), None),
+        ("Opportunities", _t(CustomerOpportunity), _t(CustomerOpportunity).c.customer_id == customer_id, None),
+        ("Technologies", _t(CustomerTechnology), _t(CustomerTechnology).c.customer_id == customer_id, None),
+        ("Projects", _t(CustomerProject), _t(CustomerProject).c.customer_id == customer_id, None),
+        ("Heatmap cells", _t(HeatmapCell), _t(HeatmapCell).c.customer_id == customer_id, None),
+        ("Partner links", partner_customer, partner_customer.c.customer_id == customer_id, None),
+        ("Customer", _t(Customer), _t(Customer).c.id == customer_id, None),
+    ]
+
+
+def partner_steps(partner_id):
+    return [
+        ("Customer links", partner_customer, partner_customer.c.partner_id == partner_id, None),
+        ("Contacts unlinked", _t(Contact), _t(Contact).c.partner_id == partner_id, {"partner_id": None}),
+        ("Partner", _t(Partner), _t(Partner).c.id == partner_id, None),
+    ]
+
+
+def delete_contact(contact_id, dry_run=False):
+    return _run(contact_steps([contact_id]), dry_run)
+
+
+def delete_all_contacts(dry_run=False):
+    return _run(contact_steps(select(_t(Contact).c.id)), dry_run)
+
+
+def delete_customer(customer_id, dry_run=False):
+    return _run(customer_steps(customer_id), dry_run)
+
+
+def delete_partner(partner_id, dry_run=False):
+    return _run(partner_steps(partner_id), dry_run)
+
+
+DELETERS = {
+    "contact": delete_contact,
+    "customer": delete_customer,
+    "partner": delete_partner,
+}
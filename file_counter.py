@@ -0,0 +1,266 @@
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime
+
+from sqlalchemy import bindparam, delete, insert, select, update
+
+from config import (
+    CACHE_BACKEND,
+    DISCOVERY_ROOT,
+    FILE_FULL_SCAN_SECONDS,
+    FILE_POLL_SECONDS,
+    SHARED_CACHE_PATH,
+    SKIP_FOLDERS,
+)
+from extensions import db
+from instrumentation import timed_io
+from models import FileIndex
+from shared_cache import exclusive_lock, shared_store
+
+logger = logging.getLogger("crm_logger")
+
+
+# --------------------- NEW-FILES-TODAY COUNTER ---------------------
+# Keeps path → mtime for every OneDrive file (persisted in FileIndex.mtime)
+# and a count of files per modification date. A background poller diffs the
+# tree against that index and only applies the changes, so reading today's
+# count is a dict lookup instead of a tree walk.
+#
+# Polls stat each directory and re-list only those whose mtime changed (a
+# file was added, removed or renamed in them); files in unchanged folders
+# keep their indexed mtime. Edits that rewrite a file in place don't touch
+# the folder, so every FILE_FULL_SCAN_SECONDS a poll re-stats every file.
+# Any unreadable folder aborts the poll: a partial scan would look like
+# deleted files.
+#
+# Today's count is published to the shared store. With several worker
+# processes (CACHE_BACKEND=sqlite) only the one holding the poller lock
+# walks the tree; the others read what it publishes.
+
+POLLER_LOCK = os.path.join(os.path.dirname(SHARED_CACHE_PATH), "new_files_poller.lock")
+
+
+def _mtime_day(mtime):
+    return date.fromtimestamp(mtime)
+
+
+class PartialScan(Exception):
+    """
+    A directory couldn't be read; the scan is incomplete and must not be applied.
+    """
+
+
+def _abort(error):
+    raise PartialScan(f"{error.filename}: {error.strerror}") from error
+
+
+class NewFilesCounter:
+    def __init__(self, root, skip_folders, interval=300, full_scan_interval=4 * 3600):
+        self.root = root
+        self.skip_folders = skip_folders
+        self.interval = interval
+        self.full_scan_interval = full_scan_interval
+        self._mtimes = {}
+        self._dirs = {}  # rel folder → (folder mtime, file names, subfolder names)
+        self._last_full_scan = None
+        self._per_day = Counter()  # date → files last modified that day
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._thread = None
+
+    def count(self):
+        """
+        Files modified today. O(1); the poller keeps it current.
+        """
+        today = date.today()
+        published = shared_store.get(f"new_files:{today.isoformat()}")
+        return published if published is not None else self._per_day[today]
+
+    def _publish(self):
+        today = date.today()
+        shared_store.set(f"new_files:{today.isoformat()}", self._per_day[today], ttl=2 * 86400)
+
+    def load(self):
+        """
+        Seed from the persisted index. Needs an app context.
+        """
+        rows = db.session.execute(
+            select(FileIndex.relative_path, FileIndex.mtime).where(FileIndex.mtime.isnot(None))
+        ).all()
+        with self._lock:
+            self._mtimes = {path: mtime for path, mtime in rows}
+            self._per_day = Counter(_mtime_day(m) for m in self._mtimes.values())
+            self._loaded = True
+        self._publish()
+
+    def apply(self, mtimes, persist=True):
+        """
+        Fold a fresh scan into the index; returns (added, changed, removed).
+        """
+        if not self._loaded:
+            self.load()  # a worker that isn't the poller diffs against the DB
+        with self._lock:
+            old = self._mtimes
+            added = {p: m for p, m in mtimes.items() if p not in old}
+            changed = {p: m for p, m in mtimes.items() if p in old and old[p] != m}
+            removed = [p for p in old if p not in mtimes]
+
+            for path, mtime in changed.items():
+                self._per_day[_mtime_day(old[path])] -= 1
+                self._per_day[_mtime_day(mtime)] += 1
+            for mtime in added.values():
+                self._per_day[_mtime_day(mtime)] += 1
+            for path in removed:
+                self._per_day[_mtime_day(old[path])] -= 1
+            self._mtimes = dict(mtimes)
+        self._publish()
+
+        if persist and (added or changed or removed):
+            self._persist(added, changed, removed)
+        return added, changed, removed
+
+    def _persist(self, added, changed, removed):
+        # Core statements on their own connection: no ORM events, so the
+        # fragment cache isn't invalidated every time a file changes
+        table = FileIndex.__table__
+        now = datetime.utcnow()
+        with db.engine.begin() as conn:
+            if removed:
+                for i in range(0, len(removed), 500):
+                    conn.execute(delete(table).where(table.c.relative_path.in_(removed[i:i + 500])))
+            if changed:
+                conn.execute(
+                    update(table)
+                    .where(table.c.relative_path == bindparam("path"))
+                    .values(mtime=bindparam("new_mtime"), last_indexed=now),
+                    [{"path": p, "new_mtime": m} for p, m in changed.items()],
+                )
+            if added:
+                existing = set()
+                paths = list(added)
+                for i in range(0, len(paths), 500):
+                    existing.update(
+                        conn.execute(
+                            select(table.c.relative_path).where(table.c.relative_path.in_(paths[i:i + 500]))
+                        ).scalars()
+                    )
+                if existing:  # indexed by a sync before they had an mtime
+                    conn.execute(
+                        update(table)
+                        .where(table.c.relative_path == bindparam("path"))
+                        .values(mtime=bindparam("new_mtime"), last_indexed=now),
+                        [{"path": p, "new_mtime": added[p]} for p in existing],
+                    )
+                new_rows = [
+                    {
+                        "relative_path": p,
+                        "filename": os.path.basename(p),
+                        "parent_folder": os.path.basename(os.path.dirname(os.path.join(self.root, p))),
+                        "mtime": m,
+                        "last_indexed": now,
+                    }
+                    for p, m in added.items()
+                    if p not in existing
+                ]
+                if new_rows:
+                    conn.execute(insert(table), new_rows)
+
+    def _list(self, path):
+        names, subdirs = [], []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                elif not entry.name.startswith(".") and not entry.is_dir():
+                    names.append(entry.name)
+        return names, subdirs
+
+    def scan(self, full=False):
+        """
+        rel_path → mtime for every visible file under `root`. Raises
+        PartialScan if any folder can't be read.
+        """
+        known = self._mtimes  # replaced, never mutated, by apply()
+        dirs, mtimes = {}, {}
+        pending = [""]
+        while pending:
+            rel_dir = pending.pop()
+            path = os.path.join(self.root, rel_dir)
+            if any(skip in path for skip in self.skip_folders):
+                continue
+            try:
+                dir_mtime = os.stat(path).st_mtime
+                cached = self._dirs.get(rel_dir)
+                if cached and cached[0] == dir_mtime:
+                    _, names, subdirs = cached
+                else:
+                    names, subdirs = self._list(path)
+            except OSError as e:
+                _abort(e)
+            dirs[rel_dir] = (dir_mtime, names, subdirs)
+            listed = cached is None or cached[0] != dir_mtime
+            for name in names:
+                rel_path = os.path.join(rel_dir, name)
+                mtime = None if full or listed else known.get(rel_path)
+                if mtime is None:
+                    try:
+                        mtime = os.path.getmtime(os.path.join(path, name))
+                    except FileNotFoundError:
+                        continue
+                    except OSError as e:
+                        _abort(e)
+                mtimes[rel_path] = mtime
+            pending.extend(os.path.join(rel_dir, d) for d in subdirs)
+        self._dirs = dirs
+        return mtimes
+
+    def poll(self):
+        if not os.path.isdir(self.root):
+            return
+        now = time.monotonic()
+        full = self._last_full_scan is None or now - self._last_full_scan >= self.full_scan_interval
+        with timed_io("new_files_poll"):
+            mtimes = self.scan(full)
+        if full:
+            self._last_full_scan = now
+        self.apply(mtimes)
+
+    def _run(self, app):
+        # Without a shared store every process counts for itself
+        leader = None if CACHE_BACKEND == "sqlite" else True
+        with app.app_context():
+            while True:
+                try:
+                    if leader is None:
+                        # Kept open, so held for life; retried in case the poller exits
+                        leader = exclusive_lock(POLLER_LOCK)
+                    if leader is not None:
+                        # Retried until it works: on a fresh start the table or the
+                        # mtime column may not exist until migrations have run
+                        if not self._loaded:
+                            self.load()
+                        self.poll()
+                except Exception as e:
+                    logger.warning(f"⚠️ New-files poll failed: {e}")
+                finally:
+                    db.session.remove()
+                time.sleep(self.interval)
+
+    def start(self, app):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, args=(app,), name="new-files-poller", daemon=True
+            )
+            self._thread.start()
+
+
+new_files_counter = NewFilesCounter(
+    DISCOVERY_ROOT, SKIP_FOLDERS, interval=FILE_POLL_SECONDS, full_scan_interval=FILE_FULL_SCAN_SECONDS
+)
+
+
+def init_file_counter(app):
+    new_files_counter.start(app)
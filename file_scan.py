@@ -0,0 +1,156 @@
+import json
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import FILE_SCAN_WORKERS
+from extensions import db
+from instrumentation import timed_walk
+
+logger = logging.getLogger("crm_logger")
+
+
+# --------------------- POOLED DIRECTORY SCANS ---------------------
+# Walks of the OneDrive share and upload folders run on a small bounded
+# pool instead of on request threads. Each directory comes back through a
+# bounded queue as soon as it's read, so a view can stream partial results;
+# closing the walk (the client went away) cancels it at the next directory.
+#
+# At most 2 × FILE_SCAN_WORKERS walks are admitted at once; past that a
+# request gets ScanBusy (503) immediately, so a pile-up of slow share scans
+# can't tie up every worker thread.
+
+scan_pool = ThreadPoolExecutor(max_workers=FILE_SCAN_WORKERS, thread_name_prefix="file-scan")
+_slots = threading.BoundedSemaphore(FILE_SCAN_WORKERS * 2)
+
+_DONE = object()
+
+
+class ScanBusy(Exception):
+    """
+    Too many directory scans in flight; rendered as a 503 with Retry-After.
+    """
+
+
+class PoolWalk:
+    """
+    os.walk(top) run on scan_pool. Iterate it (ideally inside `with`);
+    close() stops the walk and frees its slot.
+
+    Directories whose path contains one of `skip_folders` are left out,
+    like the inline walks this replaces. `prune(root, dirs)` runs on the
+    walk thread before each descent and may edit `dirs` in place.
+    Folders that couldn't be read are skipped and listed in `errors`.
+    """
+
+    def __init__(self, top, operation, skip_folders=(), topdown=True, prune=None):
+        self._closed = True  # nothing to release until a slot is ours
+        if not _slots.acquire(blocking=False):
+            raise ScanBusy()
+        self._closed = False
+        self.errors = []  # OSErrors from os.walk; complete once iteration ends
+        self._cancel = threading.Event()
+        self._results = queue.Queue(maxsize=64)  # a slow reader pauses the walk
+        try:
+            scan_pool.submit(self._run, top, operation, tuple(skip_folders), topdown, prune)
+        except Exception:
+            self.close()
+            raise
+
+    def _put(self, item):
+        while not self._cancel.is_set():
+            try:
+                self._results.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self, top, operation, skip_folders, topdown, prune):
+        try:
+            for root, dirs, files in timed_walk(top, operation, topdown=topdown, onerror=self.errors.append):
+                if self._cancel.is_set():
+                    return
+                if prune is not None:
+                    prune(root, dirs)
+                if any(skip in root for skip in skip_folders):
+                    continue
+                if not self._put((root, dirs, files)):
+                    return
+        except Exception as e:
+            self._put(e)
+        finally:
+            self._put(_DONE)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._closed:
+            raise StopIteration
+        item = self._results.get()
+        if item is _DONE:
+            self.close()
+            raise StopIteration
+        if isinstance(item, Exception):
+            self.close()
+            raise item
+        return item
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._cancel.set()
+            _slots.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+
+# ---- Background jobs ----
+
+_jobs = {}  # name → Future of the running job
+_jobs_lock = threading.Lock()
+
+
+def run_in_background(app, name, fn, *args):
+    """
+    Run `fn` on scan_pool inside an app context, unless a job called
+    `name` is still running. Returns True if it was started.
+    """
+
+    def job():
+        with app.app_context():
+            try:
+                fn(*args)
+            except Exception as e:
+                logger.error(f"❌ Background job {name} failed: {e}")
+            finally:
+                db.session.remove()
+
+    with _jobs_lock:
+        running = _jobs.get(name)
+        if running is not None and not running.done():
+            return False
+        _jobs[name] = scan_pool.submit(job)
+        return True
+
+
+def is_running(name):
+    with _jobs_lock:
+        running = _jobs.get(name)
+        return running is not None and not running.done()
+
+
+def ndjson(obj):
+    """
+    One line of a newline-delimited JSON stream.
+    """
+    return json.dumps(obj, separators=(",", ":")) + "\n"
@@ -0,0 +1,24 @@
+# gunicorn -c gunicorn.conf.py wsgi:application
+import multiprocessing
+import os
+
+# Loopback by default, like the dev server: /metrics and the calendar feed
+# are only open to local clients
+bind = os.environ.get("BIND", "127.0.0.1:5000")
+
+# SQLite takes one writer at a time, so a few processes with threads each
+# beat many single-threaded ones
+workers = int(os.environ.get("WEB_WORKERS", min(multiprocessing.cpu_count(), 4)))
+worker_class = "gthread"
+threads = int(os.environ.get("WEB_THREADS", "4"))
+
+# /files walks the whole OneDrive tree on a cold cache
+timeout = 120
+graceful_timeout = 30
+
+# Not preloaded: each worker starts its own background threads (audit
+# writer, log shipper, new-files poller), which wouldn't survive a fork
+preload_app = False
+
+accesslog = "-"
+errorlog = "-"
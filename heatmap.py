@@ -0,0 +1,137 @@
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects.sqlite import insert
+
+from config import COLUMNS
+from extensions import db
+from models import HeatmapCell
+from read_model import BLANK_CELL, get_snapshot
+from utils import log_change
+
+
+# --------------------- HEATMAP DELTA SAVES ---------------------
+# The heatmap page posts only the cells that changed, each with the version
+# it was rendered from. Every cell is one UPSERT whose ON CONFLICT branch
+# only fires if the stored version still matches; a new row starts at
+# version+1. If any cell lost the race, nothing is saved and the caller
+# gets the current state of those cells back.
+#
+# Cleared cells keep their row (blank color and text) so the next edit can
+# still be checked against its version.
+
+COLORS = ("", "red", "yellow", "green")
+
+
+class HeatmapConflict(Exception):
+    """
+    Some cells changed since the page was loaded; `cells` is their current state.
+    """
+
+    def __init__(self, cells):
+        super().__init__(f"{len(cells)} heatmap cell(s) changed")
+        self.cells = cells
+
+
+def parse_cells(payload, customer_ids):
+    """
+    Validated changes from a {"cells": [...]} request body. Raises ValueError.
+    """
+    cells = payload.get("cells") if isinstance(payload, dict) else None
+    if not isinstance(cells, list) or not cells:
+        raise ValueError("Expected a non-empty \"cells\" list")
+    changes = {}
+    for cell in cells:
+        try:
+            customer_id = int(cell["customer_id"])
+            column = cell["column"]
+            color = (cell.get("color") or "").strip()
+            text = (cell.get("text") or "").strip()
+            version = int(cell["version"])
+        except (AttributeError, KeyError, TypeError, ValueError):
+            raise ValueError(f"Malformed cell: {cell!r}")
+        if customer_id not in customer_ids:
+            raise ValueError(f"Unknown customer {customer_id}")
+        if column not in COLUMNS:
+            raise ValueError(f"Unknown column {column!r}")
+        if color not in COLORS:
+            raise ValueError(f"Unknown color {color!r}")
+        if len(text) > 255:
+            raise ValueError(f"Text too long for {column}")
+        # The last edit of a cell wins if the same one is sent twice
+        changes[(customer_id, column)] = (color, text, version)
+    return changes
+
+
+def _upsert(customer_id, column, color, text, version):
+    table = HeatmapCell.__table__
+    statement = insert(table).values(
+        customer_id=customer_id, column_name=column, color=color, text=text, version=version + 1
+    )
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.customer_id, table.c.column_name],
+        set_={"color": statement.excluded.color, "text": statement.excluded.text, "version": table.c.version + 1},
+        where=table.c.version == version,
+    ).returning(table.c.version)
+
+
+def _current(keys):
+    table = HeatmapCell.__table__
+    rows = db.session.execute(
+        select(table.c.customer_id, table.c.column_name, table.c.color, table.c.text, table.c.version)
+        .where(tuple_(table.c.customer_id, table.c.column_name).in_(keys))
+    ).all()
+    found = {(r.customer_id, r.column_name): r for r in rows}
+    cells = []
+    for customer_id, column in keys:
+        row = found.get((customer_id, column))
+        cells.append(
+            {
+                "customer_id": customer_id,
+                "column": column,
+                "color": (row.color if row else "") or "",
+                "text": (row.text if row else "") or "",
+                "version": row.version if row else 0,
+            }
+        )
+    return cells
+
+
+def _log(snapshot, changes):
+    summaries = {}
+    for (customer_id, column), (color, text, _) in changes.items():
+        old = snapshot.heatmap.get(customer_id, {}).get(column, BLANK_CELL)
+        if color or text:
+            summary = f"{column}: '{old.text}' → '{text}' [{old.color} → {color}]"
+        else:
+            summary = f"{column}: cleared '{old.text}' [{old.color}]"
+        summaries.setdefault(customer_id, []).append(summary)
+    for customer_id, summary in summaries.items():
+        log_change("Edited heatmap", f"{snapshot.customers[customer_id].name} → " + "; ".join(summary))
+
+
+def save_cells(payload):
+    """
+    Apply a delta in one transaction; returns the new version of each cell.
+    Raises ValueError for a bad payload, HeatmapConflict for stale cells.
+    """
+    snapshot = get_snapshot()
+    changes = parse_cells(payload, snapshot.customers)
+    customer_ids = {customer_id for customer_id, _ in changes}
+    options = {"cache_scopes": customer_ids, "row_ids": customer_ids}
+
+    saved, stale = [], []
+    for (customer_id, column), (color, text, version) in changes.items():
+        new_version = db.session.execute(
+            _upsert(customer_id, column, color, text, version), execution_options=options
+        ).scalar()
+        if new_version is None:
+            stale.append((customer_id, column))
+        else:
+            saved.append({"customer_id": customer_id, "column": column, "version": new_version})
+
+    if stale:
+        db.session.rollback()
+        raise HeatmapConflict(_current(stale))
+
+    db.session.commit()
+    _log(snapshot, changes)
+    return saved
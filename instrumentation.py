@@ -0,0 +1,265 @@
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import g, has_app_context, request, session
+from markupsafe import escape
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import PROFILE_PANEL
+
+
+# --------------------- PER-REQUEST PROFILE ---------------------
+
+
+class RequestProfile:
+    """
+    SQL and filesystem cost of the current request, kept on `g.profile`.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.statements = Counter()
+        self.io = defaultdict(lambda: [0, 0.0])  # operation -> [calls, seconds]
+
+    def record_sql(self, statement, elapsed):
+        self.sql_count += 1
+        self.sql_time += elapsed
+        self.statements[statement] += 1
+
+    def record_io(self, operation, elapsed):
+        self.io[operation][0] += 1
+        self.io[operation][1] += elapsed
+
+    @property
+    def io_time(self):
+        return sum(seconds for _, seconds in self.io.values())
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def current_profile():
+    if has_app_context():
+        return g.get("profile")
+    return None
+
+
+# --------------------- PROCESS-WIDE COUNTERS ---------------------
+
+_lock = threading.Lock()
+_endpoint_stats = defaultdict(
+    lambda: {
+        "requests": 0,
+        "seconds": 0.0,
+        "sql_queries": 0,
+        "sql_seconds": 0.0,
+        "sql_queries_max": 0,
+        "fs_seconds": 0.0,
+    }
+)
+_io_stats = defaultdict(lambda: [0, 0.0])  # operation -> [calls, seconds]
+
+
+def _record_request(endpoint, profile):
+    with _lock:
+        stats = _endpoint_stats[endpoint]
+        stats["requests"] += 1
+        stats["seconds"] += profile.elapsed
+        stats["sql_queries"] += profile.sql_count
+        stats["sql_seconds"] += profile.sql_time
+        stats["sql_queries_max"] = max(stats["sql_queries_max"], profile.sql_count)
+        stats["fs_seconds"] += profile.io_time
+
+
+def record_io(operation, elapsed):
+    with _lock:
+        _io_stats[operation][0] += 1
+        _io_stats[operation][1] += elapsed
+    profile = current_profile()
+    if profile is not None:
+        profile.record_io(operation, elapsed)
+
+
+# --------------------- SQL HOOKS ---------------------
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_started"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("query_started", None)
+    profile = current_profile()
+    if started is not None and profile is not None:
+        profile.record_sql(statement, time.perf_counter() - started)
+
+
+# --------------------- FILESYSTEM TIMERS ---------------------
+
+
+@contextmanager
+def timed_io(operation):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_io(operation, time.perf_counter() - started)
+
+
+def timed(operation):
+    """
+    Decorator version of timed_io() for whole helpers.
+    """
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed_io(operation):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def timed_walk(top, operation="os.walk", **kwargs):
+    """
+    os.walk() that only charges time spent inside the walk itself, not in
+    the caller's loop body.
+    """
+    walker = os.walk(top, **kwargs)
+    elapsed = 0.0
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                entry = next(walker)
+            except StopIteration:
+                return
+            finally:
+                elapsed += time.perf_counter() - started
+            yield entry
+    finally:
+        record_io(operation, elapsed)
+
+
+# --------------------- FLASK WIRING ---------------------
+
+
+def _panel_enabled():
+    return PROFILE_PANEL or bool(session.get("profile_panel"))
+
+
+def render_profile_panel(profile):
+    repeated = [(n, s) for s, n in profile.statements.most_common(5) if n > 1]
+    rows = "".join(
+        f"<li><strong>{n}×</strong> <code>{escape(s[:160])}</code></li>"
+        for n, s in repeated
+    )
+    io_rows = "".join(
+        f"<li>{escape(op)}: {calls} call(s), {seconds * 1000:.1f} ms</li>"
+        for op, (calls, seconds) in sorted(profile.io.items())
+    )
+    return (
+        '<div id="profile-panel" style="position:fixed;bottom:0;right:0;z-index:2000;'
+        "max-width:640px;max-height:40vh;overflow:auto;background:#212529;color:#f8f9fa;"
+        'font-size:12px;padding:8px 12px;opacity:.92">'
+        f"<strong>⏱ {escape(request.endpoint or '?')}</strong> — "
+        f"{profile.elapsed * 1000:.1f} ms total, "
+        f"{profile.sql_count} SQL ({profile.sql_time * 1000:.1f} ms), "
+        f"FS {profile.io_time * 1000:.1f} ms"
+        + (f"<div>Repeated statements (possible N+1):<ul>{rows}</ul></div>" if rows else "")
+        + (f"<div>Filesystem:<ul>{io_rows}</ul></div>" if io_rows else "")
+        + "</div>"
+    )
+
+
+def init_instrumentation(app):
+    @app.before_request
+    def start_profile():
+        g.profile = RequestProfile()
+        toggle = request.args.get("profile")
+        if toggle in ("0", "1"):
+            session["profile_panel"] = toggle == "1"
+
+    @app.after_request
+    def finish_profile(response):
+        profile = g.pop("profile", None)
+        if profile is None:
+            return response
+        _record_request(request.endpoint or "unknown", profile)
+
+        if (
+            _panel_enabled()
+            and response.mimetype == "text/html"
+            and not response.direct_passthrough
+            and not response.is_streamed
+        ):
+            html = response.get_data(as_text=True)
+            if "</body>" in html:
+                panel = render_profile_panel(profile)
+                response.set_data(html.replace("</body>", panel + "</body>", 1))
+        return response
+
+
+def render_metrics(startup_seconds=None):
+    """
+    Counters in the Prometheus text exposition format.
+    """
+    with _lock:
+        endpoints = {k: dict(v) for k, v in _endpoint_stats.items()}
+        io_stats = {k: list(v) for k, v in _io_stats.items()}
+
+    lines = []
+
+    def metric(name, kind, help_text, label, values):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for key, value in sorted(values.items()):
+            lines.append(f'{name}{{{label}="{key}"}} {value}')
+
+    for field, kind, help_text in (
+        ("requests", "counter", "Requests handled."),
+        ("seconds", "counter", "Wall time spent handling requests."),
+        ("sql_queries", "counter", "SQL statements executed."),
+        ("sql_seconds", "counter", "Time spent in SQL statements."),
+        ("sql_queries_max", "gauge", "Most SQL statements seen in a single request."),
+        ("fs_seconds", "counter", "Time spent in timed filesystem helpers."),
+    ):
+        metric(
+            f"crm_endpoint_{field}" + ("_total" if kind == "counter" else ""),
+            kind,
+            help_text,
+            "endpoint",
+            {endpoint: stats[field] for endpoint, stats in endpoints.items()},
+        )
+
+    metric(
+        "crm_fs_calls_total",
+        "counter",
+        "Calls to timed filesystem helpers.",
+        "operation",
+        {op: calls for op, (calls, _) in io_stats.items()},
+    )
+    metric(
+        "crm_fs_seconds_total",
+        "counter",
+        "Time spent in timed filesystem helpers.",
+        "operation",
+        {op: seconds for op, (_, seconds) in io_stats.items()},
+    )
+    if startup_seconds is not None:
+        lines.append("# HELP crm_startup_seconds Time from first import to create_app() finishing.")
+        lines.append("# TYPE crm_startup_seconds gauge")
+        lines.append(f"crm_startup_seconds {startup_seconds}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,155 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.orm import selectinload
+
+from extensions import db
+from models import (
+    ActionItem,
+    Contact,
+    Customer,
+    Division,
+    Meeting,
+    Partner,
+    RecurringMeeting,
+)
+
+
+# --------------------- LOADER PLANS ---------------------
+# Each page names the relationships its template walks, so they are loaded
+# with one SELECT ... IN per relationship instead of one lazy load per row.
+# Usage: Customer.query.options(*loader_plan("customer_detail"))
+
+LOADER_PLANS = {}
+
+
+def register_plan(name):
+    def decorator(fn):
+        LOADER_PLANS[name] = fn
+        return fn
+
+    return decorator
+
+
+def loader_plan(name):
+    return LOADER_PLANS[name]()
+
+
+@register_plan("customer_detail")
+def _customer_detail_plan():
+    return (
+        selectinload(Customer.meetings),
+        selectinload(Customer.partners),
+        selectinload(Customer.opportunities),
+        selectinload(Customer.recurring_meetings),
+        selectinload(Customer.divisions).options(
+            selectinload(Division.documents),
+            selectinload(Division.opportunities),
+            selectinload(Division.technologies),
+            selectinload(Division.projects),
+        ),
+    )
+
+
+@register_plan("contact_export")
+def _contact_export_plan():
+    return (
+        selectinload(Contact.divisions),
+        selectinload(Contact.customer),
+        selectinload(Contact.partner),
+    )
+
+
+@register_plan("contact_search")
+def _contact_search_plan():
+    return (
+        selectinload(Contact.customer),
+        selectinload(Contact.partner),
+    )
+
+
+@register_plan("partner_list")
+def _partner_list_plan():
+    return (selectinload(Partner.customers),)
+
+
+@register_plan("partner_detail")
+def _partner_detail_plan():
+    return (
+        selectinload(Partner.customers),
+        selectinload(Partner.contacts).selectinload(Contact.subordinates),
+    )
+
+
+@register_plan("division_detail")
+def _division_detail_plan():
+    return (
+        selectinload(Division.contacts).selectinload(Contact.subordinates),
+        selectinload(Division.documents),
+        selectinload(Division.opportunities),
+        selectinload(Division.technologies),
+        selectinload(Division.projects),
+    )
+
+
+@register_plan("action_items")
+def _action_items_plan():
+    return (
+        selectinload(ActionItem.updates),
+        selectinload(ActionItem.customer),
+    )
+
+
+@register_plan("meetings")
+def _meetings_plan():
+    return (selectinload(Meeting.customer),)
+
+
+@register_plan("recurring_meetings")
+def _recurring_meetings_plan():
+    return (selectinload(RecurringMeeting.customer),)
+
+
+# --------------------- QUERY COUNTING ---------------------
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries():
+    """
+    Count SQL statements sent to the database inside the block.
+    Needs an app context.
+    """
+    counter = QueryCounter()
+    engine = db.engine
+    event.listen(engine, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter)
+
+
+@contextmanager
+def assert_max_queries(limit):
+    """
+    Fail if the block issues more than `limit` SQL statements, e.g.
+
+        with assert_max_queries(12):
+            client.get(f"/customer/{customer.id}")
+    """
+    with count_queries() as counter:
+        yield counter
+    if counter.count > limit:
+        statements = "\n".join(counter.statements)
+        raise AssertionError(
+            f"Expected at most {limit} queries, got {counter.count}:\n{statements}"
+        )
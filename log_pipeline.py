@@ -0,0 +1,162 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+from shared_cache import exclusive_lock
+
+
+# --------------------- NON-BLOCKING LOGGING ---------------------
+# Requests only put records on an in-memory queue (QueueHandler). A
+# QueueListener thread appends them to a buffer file on local disk, and a
+# shipper thread moves that buffer to the OneDrive log in one write every few
+# seconds. A slow or missing share delays the shared log, never a request.
+#
+# Under gunicorn every worker has its own buffer and pending batch (named by
+# pid), and appends to the share under one inter-process lock. Each worker
+# holds a lock on its own pid file while alive, so whoever ships next can
+# tell a dead worker's leftovers from a live one's and ships them too.
+
+
+class BufferedShareHandler(logging.Handler):
+    """
+    Writes formatted lines to `buffer_dir` and ships them in batches to
+    `target`, rotating it like RotatingFileHandler (`target.1` … `.N`).
+    """
+
+    def __init__(self, target, buffer_dir, max_bytes=1_000_000, backup_count=5, interval=5.0):
+        super().__init__()
+        self.target = target
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.interval = interval
+        os.makedirs(buffer_dir, exist_ok=True)
+        self.buffer_dir = buffer_dir
+        self.name = os.path.basename(target)
+        self.pid = os.getpid()
+        self.buffer_path, self.pending_path, owner_path = self._paths(self.pid)
+        self._owner = exclusive_lock(owner_path, blocking=True)  # held for this process's lifetime
+        self.ship_lock_path = os.path.join(buffer_dir, f"{self.name}.ship.lock")
+        self._buffer_lock = threading.Lock()
+        self._ship_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._shipper = threading.Thread(target=self._run, name="log-shipper", daemon=True)
+        self._shipper.start()
+
+    def _paths(self, pid):
+        base = os.path.join(self.buffer_dir, f"{self.name}.{pid}")
+        return f"{base}.buffer", f"{base}.pending", f"{base}.lock"
+
+    # ---- listener thread ----
+
+    def emit(self, record):
+        try:
+            line = self.format(record) + "\n"
+            with self._buffer_lock:
+                with open(self.buffer_path, "a", encoding="utf-8") as f:
+                    f.write(line)
+        except Exception:
+            self.handleError(record)
+
+    # ---- shipper thread ----
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.ship()
+
+    def _rollover(self):
+        for i in range(self.backup_count - 1, 0, -1):
+            src, dst = f"{self.target}.{i}", f"{self.target}.{i + 1}"
+            if os.path.exists(src):
+                os.replace(src, dst)
+        os.replace(self.target, f"{self.target}.1")
+
+    def _append(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = f.read()
+        size = os.path.getsize(self.target) if os.path.exists(self.target) else 0
+        if size and size + len(data.encode("utf-8")) > self.max_bytes:
+            self._rollover()
+        with open(self.target, "a", encoding="utf-8") as f:
+            f.write(data)
+        os.remove(path)
+
+    def _orphans(self):
+        """
+        Batches left behind by workers that have exited: [(lock, paths)].
+        """
+        prefix, orphans = f"{self.name}.", []
+        for entry in sorted(os.listdir(self.buffer_dir)):
+            pid = entry[len(prefix):-len(".lock")]
+            if not (entry.startswith(prefix) and entry.endswith(".lock") and pid.isdigit()):
+                continue
+            if int(pid) == self.pid:
+                continue
+            lock = exclusive_lock(os.path.join(self.buffer_dir, entry))
+            if lock is None:
+                continue  # still running
+            buffer_path, pending_path, _ = self._paths(pid)
+            orphans.append((lock, [p for p in (pending_path, buffer_path) if os.path.exists(p)]))
+        return orphans
+
+    def ship(self):
+        """
+        Move everything buffered so far to the share. Returns False (and keeps
+        the batch for next time) if the share can't be written.
+        """
+        with self._ship_lock:
+            # A batch left over from a failed attempt goes out first
+            if not os.path.exists(self.pending_path):
+                with self._buffer_lock:
+                    if os.path.exists(self.buffer_path) and os.path.getsize(self.buffer_path):
+                        os.replace(self.buffer_path, self.pending_path)
+
+            if not os.path.isdir(os.path.dirname(self.target)):
+                return False
+            lock = exclusive_lock(self.ship_lock_path, blocking=True)
+            orphans = []
+            try:
+                orphans = self._orphans()
+                for owner, paths in orphans:
+                    for path in paths:
+                        self._append(path)
+                    os.remove(owner.name)
+                if os.path.exists(self.pending_path):
+                    self._append(self.pending_path)
+                return True
+            except OSError:
+                return False
+            finally:
+                for owner, _ in orphans:
+                    owner.close()
+                lock.close()
+
+    def close(self):
+        self._stop.set()
+        self.ship()
+        if os.path.exists(self.buffer_path):
+            self.ship()  # the buffer that accumulated behind a leftover batch
+        if not os.path.exists(self.buffer_path) and not os.path.exists(self.pending_path):
+            os.remove(self._owner.name)  # nothing left for another worker to pick up
+        self._owner.close()
+        super().close()
+
+
+def start_logging_pipeline(logger, handlers):
+    """
+    Route `logger` through a queue to `handlers`; returns the QueueListener.
+    """
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(QueueHandler(log_queue))
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+
+    def _shutdown():
+        listener.stop()  # drains the queue into the handlers first
+        for handler in handlers:
+            handler.close()
+
+    atexit.register(_shutdown)
+    return listener
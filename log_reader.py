@@ -0,0 +1,77 @@
+import os
+
+
+# --------------------- CHANGE LOG TAIL READER ---------------------
+# Reads log files backwards in fixed-size blocks, so showing the newest page
+# costs the same whether the log is 10 KB or 10 GB.
+
+BLOCK_SIZE = 64 * 1024
+
+
+def reverse_lines(path, end=None, block_size=BLOCK_SIZE):
+    """
+    Yield (offset, line) from the end of `path` (or from byte `end`)
+    towards the start. `offset` is where the line begins, so reading can
+    resume from it later.
+    """
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return
+    with f:
+        position = f.seek(0, os.SEEK_END) if end is None else min(end, f.seek(0, os.SEEK_END))
+        tail = b""
+        while position > 0:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            chunk = f.read(read_size) + tail
+            lines = chunk.split(b"\n")
+            tail = lines.pop(0)  # may continue in the previous block
+            line_end = position + len(chunk)
+            for line in reversed(lines):
+                line_end -= len(line) + 1
+                if line.strip():
+                    yield line_end + 1, line.decode("utf-8", errors="replace").rstrip("\r")
+        if tail.strip():
+            yield 0, tail.decode("utf-8", errors="replace").rstrip("\r")
+
+
+def _matches(line, user, action):
+    if user and f"— [{user}] " not in line:
+        return False
+    if action and action.lower() not in line.lower():
+        return False
+    return True
+
+
+def tail_log(paths, limit=200, user=None, action=None, cursor=None):
+    """
+    Newest-first page of matching lines across `paths` (newest file first).
+
+    Returns (lines, next_cursor). `cursor` is "<file index>:<byte offset>"
+    from a previous call, or None for the newest page; a malformed one
+    (e.g. a hand-edited URL) also gets the newest page.
+    """
+    file_index, end = 0, None
+    if cursor:
+        index, _, offset = cursor.partition(":")
+        try:
+            file_index, end = int(index), int(offset)
+            if file_index < 0 or end < 0:
+                raise ValueError(cursor)
+        except ValueError:
+            file_index, end = 0, None
+
+    lines, last = [], None
+    for i in range(file_index, len(paths)):
+        for offset, line in reverse_lines(paths[i], end if i == file_index else None):
+            if not _matches(line, user, action):
+                continue
+            if len(lines) == limit:
+                # One more match exists, so there is an older page; it starts
+                # just before the last line shown
+                return lines, f"{last[0]}:{last[1]}"
+            lines.append(line)
+            last = (i, offset)
+    return lines, None
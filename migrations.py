@@ -0,0 +1,121 @@
+from sqlalchemy import inspect, text
+
+from extensions import db
+from models import division_contact, meeting_participants, opportunity_contacts, partner_customer
+from utils import logger
+
+
+# --------------------- SCHEMA MIGRATIONS ---------------------
+# db.create_all() only creates missing tables, so columns added to existing
+# models are patched in here. Every step must be safe to run on every start.
+
+VERSIONED_TABLES = (
+    "contact",
+    "partner",
+    "customer",
+    "recurring_meeting",
+    "action_item",
+    "meeting",
+    "heatmap_cell",
+)
+
+# (table, column, DDL type) added after the table first shipped
+ADDED_COLUMNS = [
+    *((table, "version", "INTEGER NOT NULL DEFAULT 1") for table in VERSIONED_TABLES),
+    ("file_index", "mtime", "FLOAT"),
+]
+
+
+def add_missing_columns():
+    inspector = inspect(db.engine)
+    existing = set(inspector.get_table_names())
+    columns = {}
+    with db.engine.begin() as conn:
+        for table, column, ddl in ADDED_COLUMNS:
+            if table not in existing:
+                continue
+            if table not in columns:
+                columns[table] = {c["name"] for c in inspector.get_columns(table)}
+            if column not in columns[table]:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+                columns[table].add(column)
+                logger.info(f"🛠️ Added {table}.{column}")
+
+
+# ---- Association tables ----
+
+LINK_TABLES = (partner_customer, division_contact, meeting_participants, opportunity_contacts)
+
+
+def _pair_columns(table):
+    return ", ".join(c.name for c in table.primary_key.columns)
+
+
+def _rebuild_with_primary_key(conn, table):
+    """
+    SQLite can't add a primary key in place: copy the distinct, complete
+    pairs into a fresh table built from the model, then drop the old one.
+    """
+    columns = _pair_columns(table)
+    not_null = " AND ".join(f"{c.name} IS NOT NULL" for c in table.primary_key.columns)
+    conn.execute(text(f"ALTER TABLE {table.name} RENAME TO {table.name}_old"))
+    table.create(conn)
+    conn.execute(
+        text(
+            f"INSERT OR IGNORE INTO {table.name} ({columns}) "
+            f"SELECT DISTINCT {columns} FROM {table.name}_old WHERE {not_null}"
+        )
+    )
+    dropped = conn.execute(text(f"SELECT COUNT(*) FROM {table.name}_old")).scalar() - conn.execute(
+        text(f"SELECT COUNT(*) FROM {table.name}")
+    ).scalar()
+    conn.execute(text(f"DROP TABLE {table.name}_old"))
+    logger.info(f"🛠️ Rebuilt {table.name} with a composite primary key ({dropped} duplicate/empty rows dropped)")
+
+
+def consolidate_association_tables():
+    inspector = inspect(db.engine)
+    existing = set(inspector.get_table_names())
+    with db.engine.begin() as conn:
+        # division_contacts duplicated division_contact without a key
+        if "division_contacts" in existing:
+            conn.execute(
+                text(
+                    "INSERT OR IGNORE INTO division_contact (division_id, contact_id) "
+                    "SELECT DISTINCT division_id, contact_id FROM division_contacts "
+                    "WHERE division_id IS NOT NULL AND contact_id IS NOT NULL"
+                )
+            )
+            conn.execute(text("DROP TABLE division_contacts"))
+            logger.info("🛠️ Merged division_contacts into division_contact")
+
+        # customer_contacts was never read; Contact.customer_id is the real link.
+        # Keep what it knew for contacts that have no customer yet.
+        if "customer_contacts" in existing:
+            conn.execute(
+                text(
+                    "UPDATE contact SET customer_id = ("
+                    "SELECT MIN(cc.customer_id) FROM customer_contacts cc WHERE cc.contact_id = contact.id"
+                    ") WHERE customer_id IS NULL "
+                    "AND id IN (SELECT contact_id FROM customer_contacts WHERE customer_id IS NOT NULL)"
+                )
+            )
+            conn.execute(text("DROP TABLE customer_contacts"))
+            logger.info("🛠️ Merged customer_contacts into contact.customer_id")
+
+        for table in LINK_TABLES:
+            if table.name not in existing:
+                continue
+            if not inspector.get_pk_constraint(table.name)["constrained_columns"]:
+                _rebuild_with_primary_key(conn, table)
+            else:
+                for index in table.indexes:
+                    index.create(conn, checkfirst=True)
+
+
+def run_migrations():
+    """
+    Bring an existing database up to the current models. Needs an app context.
+    """
+    add_missing_columns()
+    consolidate_association_tables()
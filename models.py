@@ -2,45 +2,39 @@ from datetime import datetime, timedelta
 
 from extensions import db
 
+# Association tables: composite primary key (one row per pair, and the
+# forward lookup is a PK seek) plus an index for the reverse direction.
+# division_contacts and customer_contacts were merged away; see migrations.py.
 partner_customer = db.Table(
     "partner_customer",
     db.Column("partner_id", db.Integer, db.ForeignKey("partner.id"), primary_key=True),
     db.Column(
         "customer_id", db.Integer, db.ForeignKey("customer.id"), primary_key=True
     ),
+    db.Index("ix_partner_customer_customer", "customer_id"),
 )
 
-division_contacts = db.Table(
-    "division_contacts",
-    db.Column("division_id", db.Integer, db.ForeignKey("division.id")),
-    db.Column("contact_id", db.Integer, db.ForeignKey("contact.id")),
-)
-
-customer_contacts = db.Table(
-    "customer_contacts",
-    db.Column("customer_id", db.Integer, db.ForeignKey("customer.id")),
-    db.Column("contact_id", db.Integer, db.ForeignKey("contact.id")),
-)
-
-# Association Table (MUST be defined before usage)
 division_contact = db.Table(
     "division_contact",
     db.Column(
         "division_id", db.Integer, db.ForeignKey("division.id"), primary_key=True
     ),
     db.Column("contact_id", db.Integer, db.ForeignKey("contact.id"), primary_key=True),
+    db.Index("ix_division_contact_contact", "contact_id"),
 )
 
 meeting_participants = db.Table(
     "meeting_participants",
-    db.Column("meeting_id", db.Integer, db.ForeignKey("meeting.id")),
-    db.Column("contact_id", db.Integer, db.ForeignKey("contact.id")),
+    db.Column("meeting_id", db.Integer, db.ForeignKey("meeting.id"), primary_key=True),
+    db.Column("contact_id", db.Integer, db.ForeignKey("contact.id"), primary_key=True),
+    db.Index("ix_meeting_participants_contact", "contact_id"),
 )
 
 opportunity_contacts = db.Table(
     'opportunity_contacts',
-    db.Column('opportunity_id', db.Integer, db.ForeignKey('customer_opportunity.id')),
-    db.Column('contact_id', db.Integer, db.ForeignKey('contact.id'))
+    db.Column('opportunity_id', db.Integer, db.ForeignKey('customer_opportunity.id'), primary_key=True),
+    db.Column('contact_id', db.Integer, db.ForeignKey('contact.id'), primary_key=True),
+    db.Index("ix_opportunity_contacts_contact", "contact_id"),
 )
 
 # --------------------- MODELS ---------------------
@@ -60,6 +54,9 @@ class Contact(db.Model):
     technology = db.Column(db.String(100))  # New field added
     customer_id = db.Column(db.Integer, db.ForeignKey("customer.id"), nullable=True)
     partner_id = db.Column(db.Integer, db.ForeignKey("partner.id"), nullable=True)
+    version = db.Column(db.Integer, nullable=False, default=1)  # 🔢 optimistic concurrency
+
+    __mapper_args__ = {"version_id_col": version}
 
     manager = db.relationship(
         "Contact", remote_side=[id], backref="subordinates", uselist=False
@@ -75,6 +72,9 @@ class Partner(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     notes = db.Column(db.Text)
+    version = db.Column(db.Integer, nullable=False, default=1)  # 🔢 optimistic concurrency
+
+    __mapper_args__ = {"version_id_col": version}
 
     customers = db.relationship(
         "Customer", secondary=partner_customer, backref="partners"
@@ -86,6 +86,9 @@ class Customer(db.Model):
     name = db.Column(db.String(100), nullable=False)
     cx_services = db.Column(db.Text)
     notes = db.Column(db.Text)
+    version = db.Column(db.Integer, nullable=False, default=1)  # 🔢 optimistic concurrency
+
+    __mapper_args__ = {"version_id_col": version}
 
     divisions = db.relationship(
         "Division", back_populates="customer", cascade="all, delete-orphan"
@@ -143,6 +146,9 @@ class RecurringMeeting(db.Model):
     description = db.Column(db.Text)
     generate_ics = db.Column(db.Boolean, default=False)
     duration_minutes = db.Column(db.Integer, default=60)  # ✅ Added duration field
+    version = db.Column(db.Integer, nullable=False, default=1)  # 🔢 optimistic concurrency
+
+    __mapper_args__ = {"version_id_col": version}
 
     customer = db.relationship("Customer", back_populates="recurring_meetings")
 
@@ -228,6 +234,9 @@ class ActionItem(db.Model):
     cisco_contact = db.Column(db.String(100))
     completed = db.Column(db.Boolean, default=False)
     category = db.Column(db.String(50), default="daily")  # ← NEW LINE
+    version = db.Column(db.Integer, nullable=False, default=1)  # 🔢 optimistic concurrency
+
+    __mapper_args__ = {"version_id_col": version}
 
     updates = db.relationship(
         "ActionItemUpdate",
@@ -244,6 +253,10 @@ class Meeting(db.Model):
     title = db.Column(db.String(200))
     host = db.Column(db.String(100))
     notes = db.Column(db.Text)
+    version = db.Column(db.Integer, nullable=False, default=1)  # 🔢 optimistic concurrency
+
+    __mapper_args__ = {"version_id_col": version}
+
     participants = db.relationship(
         "Contact", secondary=meeting_participants, backref="meetings"
     )
@@ -327,6 +340,7 @@ class FileIndex(db.Model):
     filename = db.Column(db.String(200), nullable=False)
     parent_folder = db.Column(db.String(300))
     last_indexed = db.Column(db.DateTime, default=datetime.utcnow)
+    mtime = db.Column(db.Float)  # 🕒 os.path.getmtime(), kept current by file_counter.py
 
 
 class HeatmapCell(db.Model):
@@ -337,14 +351,59 @@ class HeatmapCell(db.Model):
     )  # e.g., "Security", "Wireless"
     color = db.Column(db.String(20), nullable=True)  # e.g., "red", "yellow", "green"
     text = db.Column(db.String(255), nullable=True)  # editable cell content
+    version = db.Column(db.Integer, nullable=False, default=1)  # 🔢 optimistic concurrency
 
     __table_args__ = (
         db.UniqueConstraint("customer_id", "column_name", name="_customer_column_uc"),
     )
+    __mapper_args__ = {"version_id_col": version}
     
 class Link(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     link_text = db.Column(db.Text, nullable=True)  # formerly 'notes'
     url = db.Column(db.String(512), nullable=False)
     others = db.Column(db.Text, nullable=True)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
\ No newline at end of file
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class AuditEvent(db.Model):
+    """
+    One structured row per log_change() call, written by the background
+    writer in audit.py. change_log.txt keeps getting the same events as text.
+    """
+
+    __tablename__ = "audit_event"
+    id = db.Column(db.Integer, primary_key=True)
+    timestamp = db.Column(db.DateTime, nullable=False, default=datetime.now, index=True)
+    actor = db.Column(db.String(100), index=True)
+    action = db.Column(db.String(100), nullable=False, index=True)
+    entity_type = db.Column(db.String(50))
+    entity_id = db.Column(db.Integer)
+    target = db.Column(db.Text)  # the human-readable part of the old log line
+    diff = db.Column(db.Text)  # JSON: {"field": [old, new]}
+
+    __table_args__ = (
+        db.Index("ix_audit_event_entity", "entity_type", "entity_id"),
+    )
+
+
+class MeetingOccurrence(db.Model):
+    """
+    One expanded occurrence of a RecurringMeeting inside the rolling window
+    kept by occurrences.py. Derived data: safe to drop and rebuild.
+    """
+
+    __tablename__ = "meeting_occurrence"
+    id = db.Column(db.Integer, primary_key=True)
+    recurring_meeting_id = db.Column(
+        db.Integer, db.ForeignKey("recurring_meeting.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    customer_id = db.Column(db.Integer, db.ForeignKey("customer.id"), nullable=False)
+    starts_at = db.Column(db.DateTime, nullable=False, index=True)
+    ends_at = db.Column(db.DateTime, nullable=False)
+
+    recurring_meeting = db.relationship("RecurringMeeting")
+
+    __table_args__ = (
+        db.Index("ix_meeting_occurrence_customer_start", "customer_id", "starts_at"),
+    )
@@ -0,0 +1,212 @@
+import threading
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import delete, event, insert, select
+from sqlalchemy.orm import joinedload
+
+from extensions import db
+from models import MeetingOccurrence, RecurringMeeting
+from shared_cache import shared_store
+
+
+# --------------------- MEETING OCCURRENCES ---------------------
+# Recurring meetings are expanded into meeting_occurrence rows for a rolling
+# window around today, so "what's on today / this week" is an indexed range
+# query instead of walking every RecurringMeeting in Python. Rows for a
+# meeting are rewritten after any commit that touches it; the whole window
+# is rebuilt by the first query of each day.
+#
+# The table is shared by every worker, so the day it was last built for is
+# kept in shared_store: only the first worker to query each day rebuilds it,
+# and a worker that hasn't queried yet still knows which window to rewrite a
+# meeting's rows in.
+
+WINDOW_PAST_DAYS = 45  # keeps last month's agenda answerable
+WINDOW_FUTURE_DAYS = 190
+
+# Same cadence as RecurringMeeting.get_next_occurrence ("monthly" = 4 weeks)
+STEPS = {
+    "daily": timedelta(days=1),
+    "weekly": timedelta(weeks=1),
+    "biweekly": timedelta(weeks=2),
+    "monthly": timedelta(weeks=4),
+}
+
+WINDOW_DAY_KEY = "occurrences:window_day"
+
+_window_day = None  # day this process last rebuilt (or found rebuilt) the window for
+_lock = threading.Lock()
+
+
+def expand(start, pattern, repeat_until, duration_minutes, window_start, window_end):
+    """
+    Yield (starts_at, ends_at) for every occurrence inside the window.
+    """
+    step = STEPS.get(pattern)
+    duration = timedelta(minutes=duration_minutes or 60)
+    last_day = repeat_until or window_end.date()
+    current = start
+    if step and current < window_start:
+        current += step * ((window_start - current) // step)  # jump, don't walk
+    while current < window_end and current.date() <= last_day:
+        if current >= window_start:
+            yield current, current + duration
+        if not step:
+            break  # unknown pattern: just the first occurrence
+        current += step
+
+
+def _occurrence_rows(conn, window_start, window_end, meeting_ids=None):
+    table = RecurringMeeting.__table__
+    query = select(
+        table.c.id,
+        table.c.customer_id,
+        table.c.start_datetime,
+        table.c.recurrence_pattern,
+        table.c.repeat_until,
+        table.c.duration_minutes,
+    )
+    if meeting_ids is not None:
+        query = query.where(table.c.id.in_(meeting_ids))
+    rows = []
+    for m in conn.execute(query):
+        for starts_at, ends_at in expand(
+            m.start_datetime, m.recurrence_pattern, m.repeat_until,
+            m.duration_minutes, window_start, window_end,
+        ):
+            rows.append(
+                {
+                    "recurring_meeting_id": m.id,
+                    "customer_id": m.customer_id,
+                    "starts_at": starts_at,
+                    "ends_at": ends_at,
+                }
+            )
+    return rows
+
+
+def window_for(day):
+    midnight = datetime.combine(day, time.min)
+    return midnight - timedelta(days=WINDOW_PAST_DAYS), midnight + timedelta(days=WINDOW_FUTURE_DAYS)
+
+
+def materialized_window():
+    """
+    (start, end) the table currently holds, as built by any worker, or None.
+    """
+    day = shared_store.get(WINDOW_DAY_KEY)
+    return window_for(date.fromisoformat(day)) if day else None
+
+
+def rebuild_window():
+    """
+    Re-expand every recurring meeting for a window around today.
+    """
+    global _window_day
+    today = date.today()
+    window = window_for(today)
+    table = MeetingOccurrence.__table__
+    # Core on its own connection: derived rows shouldn't trip ORM cache events
+    with db.engine.begin() as conn:
+        conn.execute(delete(table))
+        rows = _occurrence_rows(conn, *window)
+        if rows:
+            conn.execute(insert(table), rows)
+    shared_store.set(WINDOW_DAY_KEY, today.isoformat())
+    _window_day = today
+
+
+def refresh_meetings(meeting_ids):
+    """
+    Rewrite the rows of just these recurring meetings (deleted ones vanish).
+    """
+    window = materialized_window()
+    if window is None:
+        return  # nothing materialized yet; the next query builds everything
+    table = MeetingOccurrence.__table__
+    meeting_ids = list(meeting_ids)
+    with db.engine.begin() as conn:
+        conn.execute(delete(table).where(table.c.recurring_meeting_id.in_(meeting_ids)))
+        rows = _occurrence_rows(conn, *window, meeting_ids=meeting_ids)
+        if rows:
+            conn.execute(insert(table), rows)
+
+
+def ensure_window():
+    """
+    Materialize on first use and roll the window over once a day.
+    """
+    global _window_day
+    today = date.today()
+    if _window_day != today:
+        with _lock:
+            if _window_day != today:
+                if shared_store.get(WINDOW_DAY_KEY) == today.isoformat():
+                    _window_day = today  # another worker already built today's window
+                else:
+                    rebuild_window()
+    return window_for(today)
+
+
+# ---- Keeping rows in step with RecurringMeeting writes ----
+
+
+@event.listens_for(db.session, "after_flush")
+def _collect_changed_meetings(session, flush_context):
+    changed = session.info.setdefault("occurrence_meetings", set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, RecurringMeeting) and obj.id is not None:
+            changed.add(obj.id)
+
+
+@event.listens_for(db.session, "do_orm_execute")
+def _collect_bulk_meeting_writes(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    if table is not None and table.name == RecurringMeeting.__tablename__:
+        orm_execute_state.session.info["occurrence_rebuild"] = True
+
+
+@event.listens_for(db.session, "after_commit")
+def _refresh_changed_meetings(session):
+    changed = session.info.pop("occurrence_meetings", set())
+    if session.info.pop("occurrence_rebuild", False) and materialized_window() is not None:
+        with _lock:
+            rebuild_window()
+    elif changed:
+        refresh_meetings(changed)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _discard_changed_meetings(session):
+    session.info.pop("occurrence_meetings", None)
+    session.info.pop("occurrence_rebuild", None)
+
+
+# ---- Queries ----
+
+
+def occurrences_between(start, end, customer_id=None):
+    """
+    Occurrences starting in [start, end), earliest first, across customers
+    unless `customer_id` is given. Only the materialized window is covered.
+    """
+    ensure_window()
+    query = MeetingOccurrence.query.options(
+        joinedload(MeetingOccurrence.recurring_meeting).joinedload(RecurringMeeting.customer)
+    ).filter(MeetingOccurrence.starts_at >= start, MeetingOccurrence.starts_at < end)
+    if customer_id:
+        query = query.filter(MeetingOccurrence.customer_id == customer_id)
+    return query.order_by(MeetingOccurrence.starts_at).all()
+
+
+def meetings_on(day, customer_id=None):
+    """
+    Distinct recurring meetings with an occurrence on `day`.
+    """
+    start = datetime.combine(day, time.min)
+    meetings = {}
+    for occurrence in occurrences_between(start, start + timedelta(days=1), customer_id):
+        meetings.setdefault(occurrence.recurring_meeting_id, occurrence.recurring_meeting)
+    return list(meetings.values())
@@ -0,0 +1,173 @@
+from collections import deque
+
+from cache import CONTACTS_SCOPE, MemoryCache, versioned_key
+from models import Contact
+from utils import logger
+
+
+# --------------------- ORG CHART ---------------------
+
+
+class OrgNode:
+    """
+    Plain snapshot of a contact's place in the reporting tree.
+
+    Nodes carry copies of the fields the templates and exports need, not
+    ORM objects, so a cached chart stays valid across requests/sessions.
+    """
+
+    __slots__ = (
+        "id",
+        "name",
+        "role",
+        "email",
+        "reports_to",
+        "customer_id",
+        "manager",
+        "subordinates",
+        "subtree_size",
+        "depth",
+        "in_cycle",
+    )
+
+    def __init__(self, contact):
+        self.id = contact.id
+        self.name = contact.name
+        self.role = contact.role
+        self.email = contact.email
+        self.reports_to = contact.reports_to
+        self.customer_id = contact.customer_id
+        self.manager = None
+        self.subordinates = []
+        self.subtree_size = 0  # all descendants, not just direct reports
+        self.depth = 0
+        self.in_cycle = False
+
+
+class OrgChart:
+    """
+    Reporting hierarchy built from a list of contacts in O(n).
+
+    - `roots`: top-level nodes, biggest reporting trees first, then
+      contacts with nobody reporting to them (alphabetical)
+    - `nodes`: contact id → OrgNode
+    - `cycles`: lists of contact ids whose `reports_to` chain loops; each
+      cycle is broken at its lowest id, which is promoted to a root
+    """
+
+    def __init__(self, contacts):
+        self.nodes = {c.id: OrgNode(c) for c in contacts}
+        self.cycles = []
+
+        # Step 1: Link every node to its manager in one pass
+        roots = []
+        for node in self.nodes.values():
+            manager = self.nodes.get(node.reports_to)
+            if manager is None:
+                roots.append(node)  # no manager, or manager outside this set
+            elif manager is node:
+                self._break_cycle([node.id], roots)
+            else:
+                node.manager = manager
+                manager.subordinates.append(node)
+
+        # Step 2: Walk down from the roots; whatever is unreachable hangs off a cycle
+        order = self._walk(roots)
+        if len(order) < len(self.nodes):
+            self._resolve_cycles(roots, order)
+
+        # Step 3: Subtree sizes bottom-up (children always come after parents in `order`)
+        for node in reversed(order):
+            if node.manager is not None:
+                node.manager.subtree_size += node.subtree_size + 1
+
+        # Step 4: Biggest reporting trees first, then disconnected contacts
+        connected = [n for n in roots if n.subordinates]
+        disconnected = [n for n in roots if not n.subordinates]
+        connected.sort(key=lambda n: (-n.subtree_size, n.name.lower()))
+        disconnected.sort(key=lambda n: n.name.lower())
+        self.roots = connected + disconnected
+
+    def _walk(self, starts, order=None):
+        order = [] if order is None else order
+        queue = deque(starts)
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+            for sub in node.subordinates:
+                sub.depth = node.depth + 1
+                queue.append(sub)
+        return order
+
+    def _break_cycle(self, cycle_ids, roots):
+        head = self.nodes[min(cycle_ids)]
+        if head.manager is not None:
+            head.manager.subordinates.remove(head)
+            head.manager = None
+        for contact_id in cycle_ids:
+            self.nodes[contact_id].in_cycle = True
+        head.depth = 0
+        roots.append(head)
+        self.cycles.append(cycle_ids)
+        logger.warning(f"⚠️ reports_to cycle detected between contacts {cycle_ids}")
+        return head
+
+    def _resolve_cycles(self, roots, order):
+        seen = {n.id for n in order}
+        for node in self.nodes.values():
+            if node.id in seen:
+                continue
+            # Follow managers until we revisit something from this same walk
+            path, on_path = [], set()
+            current = node
+            while current is not None and current.id not in seen and current.id not in on_path:
+                path.append(current.id)
+                on_path.add(current.id)
+                current = current.manager
+            if current is not None and current.id in on_path:
+                cycle = path[path.index(current.id):]
+                head = self._break_cycle(cycle, roots)
+                new_nodes = self._walk([head])
+                order.extend(new_nodes)
+                seen.update(n.id for n in new_nodes)
+
+    def get(self, contact_id):
+        return self.nodes.get(contact_id)
+
+    def manager_name(self, contact_id):
+        node = self.nodes.get(contact_id)
+        return node.manager.name if node and node.manager else ""
+
+    def chain(self, contact_id):
+        """
+        Managers above a contact, nearest first.
+        """
+        node = self.nodes.get(contact_id)
+        chain = []
+        while node is not None and node.manager is not None:
+            node = node.manager
+            chain.append(node)
+        return chain
+
+
+# --------------------- CACHED CHARTS ---------------------
+
+org_chart_cache = MemoryCache(max_entries=64)
+
+
+def customer_org_chart(customer_id):
+    key = versioned_key("org_chart", customer_id)
+    chart = org_chart_cache.get(key)
+    if chart is None:
+        chart = OrgChart(Contact.query.filter_by(customer_id=customer_id).all())
+        org_chart_cache.set(key, chart)
+    return chart
+
+
+def contacts_org_chart():
+    key = versioned_key("org_chart", CONTACTS_SCOPE)
+    chart = org_chart_cache.get(key)
+    if chart is None:
+        chart = OrgChart(Contact.query.all())
+        org_chart_cache.set(key, chart)
+    return chart
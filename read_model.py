@@ -0,0 +1,380 @@
+import threading
+
+from sqlalchemy import event, func, or_, select
+
+from cache import _attr_values
+from config import READ_MODEL
+from extensions import db
+from models import (
+    ActionItem,
+    Contact,
+    Customer,
+    Division,
+    HeatmapCell,
+    Meeting,
+    Partner,
+    RecurringMeeting,
+)
+from shared_cache import shared_store
+
+
+# --------------------- READ MODEL ---------------------
+# An immutable snapshot of customers, contacts, partners, divisions, the
+# per-customer counts and heatmap cells, indexed by id, so the read-heavy
+# pages (dashboard, heatmap, customers, contacts, settings) render without
+# building ORM objects. Commits record which rows they touched; the next
+# read re-fetches just those rows and swaps in a new snapshot. Bulk
+# statements we can't attribute to rows trigger a full rebuild instead.
+#
+# READ_MODEL=0 turns the cache off: every call builds a fresh snapshot.
+
+
+class _View:
+    """
+    Read-only record; attributes are set once, in the constructor.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            object.__setattr__(self, name, values[name])
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def replace(self, **changes):
+        return type(self)(**{**{name: getattr(self, name) for name in self.__slots__}, **changes})
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {getattr(self, 'id', '')}>"
+
+
+class CustomerView(_View):
+    __slots__ = ("id", "name", "notes", "cx_services", "open_ais", "past_meetings", "recurring_meetings")
+
+
+class ContactView(_View):
+    __slots__ = (
+        "id", "name", "email", "phone", "role", "technology",
+        "contact_type", "customer_id", "partner_id", "reports_to",
+    )
+
+
+class PartnerView(_View):
+    __slots__ = ("id", "name", "notes")
+
+
+class DivisionView(_View):
+    __slots__ = ("id", "name", "customer_id", "parent_id")
+
+
+class HeatmapCellView(_View):
+    __slots__ = ("color", "text", "version")  # version 0: no row yet
+
+
+class ContactGroup(_View):
+    """
+    A customer or partner with its contacts, as the contacts page lists them.
+    """
+
+    __slots__ = ("id", "name", "contacts")
+
+
+NO_COUNTS = {"open_ais": 0, "past_meetings": 0, "recurring_meetings": 0}
+BLANK_CELL = HeatmapCellView(color="", text="", version=0)
+
+
+def _by_name(views):
+    return tuple(sorted(views, key=lambda v: ((v.name or "").lower(), v.id)))
+
+
+class Snapshot:
+    """
+    One consistent view of the CRM graph; never mutated after construction.
+
+    - `customers`, `contacts`, `partners`, `divisions`: id → view
+    - `heatmap`: customer id → {column name: HeatmapCellView}
+    - `counts`: customer id (None for unlinked rows) → the three counts
+    - derived: name-sorted customers/partners, contact groups, totals
+    """
+
+    __slots__ = (
+        "customers", "contacts", "partners", "divisions", "heatmap", "counts",
+        "customers_by_name", "partners_by_name",
+        "cisco_contacts", "unassigned_contacts", "customer_groups", "partner_groups",
+        "totals",
+    )
+
+    def __init__(self, customers, contacts, partners, divisions, heatmap, counts):
+        self.customers = customers
+        self.contacts = contacts
+        self.partners = partners
+        self.divisions = divisions
+        self.heatmap = heatmap
+        self.counts = counts
+
+        self.customers_by_name = _by_name(customers.values())
+        self.partners_by_name = _by_name(partners.values())
+
+        # One pass over the name-sorted contacts fills every group in order
+        by_type = {"Cisco": [], "Unassigned": []}
+        by_customer, by_partner = {}, {}
+        for contact in _by_name(contacts.values()):
+            if contact.contact_type == "Customer" and contact.customer_id in customers:
+                by_customer.setdefault(contact.customer_id, []).append(contact)
+            elif contact.contact_type == "Partner" and contact.partner_id in partners:
+                by_partner.setdefault(contact.partner_id, []).append(contact)
+            elif contact.contact_type in by_type:
+                by_type[contact.contact_type].append(contact)
+        self.cisco_contacts = tuple(by_type["Cisco"])
+        self.unassigned_contacts = tuple(by_type["Unassigned"])
+        self.customer_groups = tuple(
+            ContactGroup(id=c.id, name=c.name, contacts=tuple(by_customer[c.id]))
+            for c in self.customers_by_name
+            if c.id in by_customer
+        )
+        self.partner_groups = tuple(
+            ContactGroup(id=p.id, name=p.name, contacts=tuple(by_partner[p.id]))
+            for p in self.partners_by_name
+            if p.id in by_partner
+        )
+
+        self.totals = {
+            "customers": len(customers),
+            "contacts": len(contacts),
+            "partners": len(partners),
+            **{key: sum(c[key] for c in counts.values()) for key in NO_COUNTS},
+        }
+
+    def heatmap_row(self, customer_id, columns):
+        cells = self.heatmap.get(customer_id, {})
+        return [cells.get(column, BLANK_CELL) for column in columns]
+
+
+# ---- Loading (Core on its own connection, never the ORM session) ----
+
+
+def _where_ids(column, ids):
+    ids = set(ids)
+    clause = column.in_([i for i in ids if i is not None])
+    return or_(clause, column.is_(None)) if None in ids else clause
+
+
+def _load(conn, view, model, ids=None):
+    columns = [model.__table__.c[name] for name in view.__slots__]
+    query = select(*columns)
+    if ids is not None:
+        query = query.where(_where_ids(model.__table__.c.id, ids))
+    return {row.id: view(**row._mapping) for row in conn.execute(query)}
+
+
+def _load_customer_rows(conn, ids=None):
+    table = Customer.__table__
+    query = select(table.c.id, table.c.name, table.c.notes, table.c.cx_services)
+    if ids is not None:
+        query = query.where(_where_ids(table.c.id, ids))
+    return {row.id: dict(row._mapping) for row in conn.execute(query)}
+
+
+def _load_counts(conn, customer_ids=None):
+    """
+    customer id → counts; every requested id is present, even with no rows.
+    """
+    counts = {i: dict(NO_COUNTS) for i in (customer_ids or ())}
+    sources = (
+        ("open_ais", ActionItem.__table__, ActionItem.__table__.c.completed.is_(False)),
+        ("past_meetings", Meeting.__table__, None),
+        ("recurring_meetings", RecurringMeeting.__table__, None),
+    )
+    for key, table, condition in sources:
+        query = select(table.c.customer_id, func.count()).group_by(table.c.customer_id)
+        if condition is not None:
+            query = query.where(condition)
+        if customer_ids is not None:
+            query = query.where(_where_ids(table.c.customer_id, customer_ids))
+        for customer_id, count in conn.execute(query):
+            counts.setdefault(customer_id, dict(NO_COUNTS))[key] = count
+    return counts
+
+
+def _load_heatmap(conn, customer_ids=None):
+    table = HeatmapCell.__table__
+    query = select(
+        table.c.customer_id, table.c.column_name, table.c.color, table.c.text, table.c.version
+    )
+    if customer_ids is not None:
+        query = query.where(_where_ids(table.c.customer_id, customer_ids))
+    heatmap = {}
+    for row in conn.execute(query):
+        # Cleared cells keep their row (and version) so edits can be checked against it
+        heatmap.setdefault(row.customer_id, {})[row.column_name] = HeatmapCellView(
+            color=row.color or "", text=row.text or "", version=row.version
+        )
+    return heatmap
+
+
+def build_snapshot():
+    with db.engine.connect() as conn:
+        counts = _load_counts(conn)
+        customers = {
+            i: CustomerView(**row, **counts.get(i, NO_COUNTS))
+            for i, row in _load_customer_rows(conn).items()
+        }
+        return Snapshot(
+            customers=customers,
+            contacts=_load(conn, ContactView, Contact),
+            partners=_load(conn, PartnerView, Partner),
+            divisions=_load(conn, DivisionView, Division),
+            heatmap=_load_heatmap(conn),
+            counts=counts,
+        )
+
+
+def refresh_snapshot(snapshot, touched):
+    """
+    New snapshot with the rows in `touched` (kind → ids) re-read; the
+    rest are shared with `snapshot`.
+    """
+    customers, heatmap, counts = dict(snapshot.customers), dict(snapshot.heatmap), dict(snapshot.counts)
+    others = {
+        "contact": (dict(snapshot.contacts), ContactView, Contact),
+        "partner": (dict(snapshot.partners), PartnerView, Partner),
+        "division": (dict(snapshot.divisions), DivisionView, Division),
+    }
+
+    with db.engine.connect() as conn:
+        for kind, (views, view, model) in others.items():
+            ids = touched.get(kind)
+            if ids:
+                for i in ids:
+                    views.pop(i, None)  # deleted rows just don't come back
+                views.update(_load(conn, view, model, ids))
+
+        count_ids = touched.get("counts", set())
+        if count_ids:
+            counts.update(_load_counts(conn, count_ids))
+        row_ids = touched.get("customer", set())
+        rows = _load_customer_rows(conn, row_ids) if row_ids else {}
+        for i in row_ids | count_ids:
+            if i is None:
+                continue
+            if i in rows:
+                customers[i] = CustomerView(**rows[i], **counts.get(i, NO_COUNTS))
+            elif i in row_ids:
+                customers.pop(i, None)
+                heatmap.pop(i, None)
+            elif i in customers:
+                customers[i] = customers[i].replace(**counts.get(i, NO_COUNTS))
+
+        heatmap_ids = touched.get("heatmap")
+        if heatmap_ids:
+            for i in heatmap_ids:
+                heatmap.pop(i, None)
+            heatmap.update(_load_heatmap(conn, heatmap_ids))
+
+    return Snapshot(
+        customers=customers,
+        contacts=others["contact"][0],
+        partners=others["partner"][0],
+        divisions=others["division"][0],
+        heatmap=heatmap,
+        counts=counts,
+    )
+
+
+# Commits publish what they touched on a shared change feed, so every
+# worker process folds in every other worker's writes too.
+FEED = "read_model"
+
+_snapshot = None
+_seen = 0  # last feed entry folded into _snapshot
+_build_lock = threading.Lock()
+
+
+def _merge(entries):
+    touched = {}
+    for entry in entries:
+        for kind, ids in entry.items():
+            if kind == "full":
+                touched["full"] = True
+            else:
+                touched.setdefault(kind, set()).update(ids)
+    return touched
+
+
+def get_snapshot():
+    global _snapshot, _seen
+    if not READ_MODEL:
+        return build_snapshot()
+    entries, _, _ = shared_store.read_since(FEED, _seen)
+    if _snapshot is not None and not entries:
+        return _snapshot
+    with _build_lock:
+        entries, latest, complete = shared_store.read_since(FEED, _seen)
+        touched = _merge(entries)
+        if _snapshot is None or not complete or touched.get("full"):
+            _snapshot = build_snapshot()
+        elif touched:
+            _snapshot = refresh_snapshot(_snapshot, touched)
+        _seen = latest
+        return _snapshot
+
+
+# ---- Tracking commits ----
+
+ROW_KINDS = {Customer: "customer", Contact: "contact", Partner: "partner", Division: "division"}
+COUNTED = (ActionItem, Meeting, RecurringMeeting)
+TRACKED_TABLES = {
+    model.__table__.name for model in (*ROW_KINDS, *COUNTED, HeatmapCell)
+}
+
+
+def _touch(session, kind, ids):
+    session.info.setdefault("read_model_touched", {}).setdefault(kind, set()).update(ids)
+
+
+@event.listens_for(db.session, "after_flush")
+def _collect_read_model_rows(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        kind = ROW_KINDS.get(type(obj))
+        if kind and obj.id is not None:
+            _touch(session, kind, {obj.id})
+        elif isinstance(obj, COUNTED):
+            # None too: unlinked rows still count towards the dashboard totals
+            _touch(session, "counts", {None, *_attr_values(obj, "customer_id")})
+        elif isinstance(obj, HeatmapCell):
+            _touch(session, "heatmap", _attr_values(obj, "customer_id"))
+
+
+@event.listens_for(db.session, "do_orm_execute")
+def _collect_bulk_read_model_writes(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    if table is None or table.name not in TRACKED_TABLES:
+        return
+    # associations.assign_rows says which rows it updates, heatmap.save_cells
+    # which customers' cells
+    row_ids = orm_execute_state.execution_options.get("row_ids")
+    kind = next((k for model, k in ROW_KINDS.items() if model.__table__ is table), None)
+    if table is HeatmapCell.__table__:
+        kind = "heatmap"
+    if row_ids is not None and kind:
+        _touch(orm_execute_state.session, kind, row_ids)
+    else:
+        orm_execute_state.session.info.setdefault("read_model_touched", {})["full"] = True
+
+
+@event.listens_for(db.session, "after_commit")
+def _queue_read_model_refresh(session):
+    touched = session.info.pop("read_model_touched", None)
+    if touched:
+        shared_store.append(
+            FEED, {kind: True if kind == "full" else list(ids) for kind, ids in touched.items()}
+        )
+
+
+@event.listens_for(db.session, "after_rollback")
+def _discard_read_model_rows(session):
+    session.info.pop("read_model_touched", None)
@@ -1,6 +1,6 @@
 # Imports from your own app
-import csv
 import io
+import json
 import os
 from datetime import date, datetime, timedelta
 
@@ -10,13 +10,14 @@ from flask import (
     render_template,
     request,
     send_file,
+    stream_template,
+    stream_with_context,
     url_for,
     flash,
+    jsonify,
     session,
 )
-from icalendar import Calendar, Event
-from sqlalchemy.orm import joinedload
-from sqlalchemy import func
+from markupsafe import Markup
 from werkzeug.utils import secure_filename
 
 # If you have this defined globally in app.py, replicate or import
@@ -31,17 +32,26 @@ from config import (
     COLUMNS,
     DATABASE_PATH,
     DISCOVERY_ROOT,
+    SEARCH_SECTION_LIMIT,
     SKIP_FOLDERS,
     USERS,
 
 )
+from associations import assign_rows, sync_links
+from cache import CONTACTS_SCOPE, fragment_cache, versioned_key
+from calendar_feed import build_feed, single_event_calendar
+import deletion
+from concurrency import EditConflict, commit_versioned, remember_version, versioned_form
 from extensions import db
+from file_counter import new_files_counter
+from file_scan import PoolWalk, ScanBusy, ndjson, run_in_background, scan_pool
 
 # Many-to-many association tables (if needed explicitly for deletes/clears)
 # Model classes
 from models import (
     ActionItem,
     ActionItemUpdate,
+    AuditEvent,
     Contact,
     Customer,
     CustomerOpportunity,
@@ -56,25 +66,33 @@ from models import (
     Meeting,
     Partner,
     RecurringMeeting,
-    division_contact,
     Link,
+    division_contact,
+    partner_customer,
 )
+from instrumentation import render_metrics
+from loader_plans import loader_plan
+from occurrences import ensure_window, meetings_on, occurrences_between
+from typeahead import MAX_RESULTS as TYPEAHEAD_LIMIT, search as typeahead_search
+from log_reader import tail_log
+from org_chart import contacts_org_chart, customer_org_chart
+from heatmap import HeatmapConflict, save_cells as save_heatmap_delta
+from read_model import get_snapshot
+from search import SECTIONS as SEARCH_SECTIONS, SearchPage, hit_key, search_pages, sorted_walk_pruner
 from utils import (
+    apply_customer_files,
+    clean_empty_folders,
+    customer_upload_folder,
     get_customer_attachments,
+    split_customer_attachments,
     log_change,
     scan_and_index_files,
     secure_folder_name,
-    sync_customer_files_logic,
+    upload_files_in,
     logger,
-    CHANGE_LOG_FILE,
     get_last_backup_times, 
-    acquire_lock, 
-    release_lock, 
-    is_locked, 
-    lock_info, 
-    lock_expired,
+    change_log_files,
     get_new_files_today_count,
-    file_scan_cache,
 )
 
 
@@ -101,172 +119,201 @@ def home():
 
 
 def get_grouped_contacts():
-    # ✅ Cisco contacts sorted alphabetically (case-insensitive)
-    cisco_contacts = (
-        Contact.query.filter_by(contact_type="Cisco")
-        .order_by(func.lower(Contact.name))
-        .all()
-    )
-
-    # ✅ Customers sorted by name, with their contacts sorted too
-    customer_groups = []
-    for customer in Customer.query.order_by(func.lower(Customer.name)).all():
-        filtered = sorted(
-            [c for c in customer.contacts if c.contact_type == "Customer"],
-            key=lambda c: c.name.lower()
-        )
-        if filtered:
-            customer.contacts = filtered
-            customer_groups.append(customer)
-
-    # ✅ Partners sorted by name, with their contacts sorted too
-    partner_groups = []
-    for partner in Partner.query.order_by(func.lower(Partner.name)).all():
-        filtered = sorted(
-            [c for c in partner.contacts if c.contact_type == "Partner"],
-            key=lambda c: c.name.lower()
-        )
-        if filtered:
-            partner.contacts = filtered
-            partner_groups.append(partner)
-
-    # ✅ Unassigned contacts sorted
-    unassigned_contacts = (
-        Contact.query.filter_by(contact_type="Unassigned")
-        .order_by(func.lower(Contact.name))
-        .all()
-    )
-
+    # ✅ Name-sorted groups, precomputed by the read-model snapshot
+    snapshot = get_snapshot()
     return {
-        "cisco_contacts": cisco_contacts,
-        "customer_contacts": customer_groups,
-        "partner_contacts": partner_groups,
-        "unassigned_contacts": unassigned_contacts,
+        "cisco_contacts": snapshot.cisco_contacts,
+        "customer_contacts": snapshot.customer_groups,
+        "partner_contacts": snapshot.partner_groups,
+        "unassigned_contacts": snapshot.unassigned_contacts,
     }
 
 @app.route("/search")
 def search():
     query = request.args.get("q", "").strip()
-    query_words = query.lower().split()  # ✅ Define early, before use
-
-    customers = Customer.query.filter(
-        (Customer.name.ilike(f"%{query}%"))
-        | (Customer.cx_services.ilike(f"%{query}%"))
-        | (Customer.notes.ilike(f"%{query}%"))
-    ).all()
-
-    contacts = Contact.query.filter(
-        (Contact.name.ilike(f"%{query}%"))
-        | (Contact.email.ilike(f"%{query}%"))
-        | (Contact.role.ilike(f"%{query}%"))
-        | (Contact.location.ilike(f"%{query}%"))
-        | (Contact.technology.ilike(f"%{query}%"))
-        | (Contact.notes.ilike(f"%{query}%"))
-        | (Contact.customer.has(Customer.name.ilike(f"%{query}%")))
-    ).all()
-    
-    links = Link.query.filter(
-        (Link.link_text.ilike(f"%{query}%"))
-        | (Link.url.ilike(f"%{query}%"))
-        | (Link.others.ilike(f"%{query}%"))
-    ).all()
-        
-    partners = Partner.query.filter(
-        (Partner.name.ilike(f"%{query}%")) | (Partner.notes.ilike(f"%{query}%"))
-    ).all()
-
-    file_name_hits = []
-
-    for root, dirs, files in os.walk(DISCOVERY_ROOT):
-        if any(skip in root for skip in SKIP_FOLDERS):
-            continue
-
-        rel_root = os.path.relpath(root, DISCOVERY_ROOT)
-        if all(word in rel_root.lower() for word in query_words):
-            file_name_hits.append(rel_root + "/")
-
-        for file in files:
-            if file.startswith("."):
-                continue
-            if all(word in file.lower() for word in query_words):
-                rel_path = os.path.relpath(os.path.join(root, file), DISCOVERY_ROOT)
-                file_name_hits.append(rel_path)
 
-    return render_template(
+    # 📡 Streamed: the page head goes out at once, each section is queried
+    # (capped) as the template reaches it, and file hits follow from
+    # /search/files
+    return stream_template(
         "search_results.html",
         query=query,
-        customers=customers,
-        contacts=contacts,
-        partners=partners,
-        file_name_hits=file_name_hits,
-        links=links  # ✅ Add this line
+        **search_pages(query),
     )
 
 
+@app.route("/search/more/<section>")
+def search_more(section):
+    if section not in SEARCH_SECTIONS:
+        abort(404)
+    page = SearchPage(
+        section,
+        request.args.get("q", "").strip(),
+        offset=request.args.get("offset", 0, type=int),
+    )
+    return render_template("search_section.html", page=page)
+
+
+# --------------------- STREAMED FILE SCANS ---------------------
+# Share walks run on the file_scan pool; these views only relay what it
+# finds as NDJSON, one line per directory, and the page renders as lines
+# arrive. The walk is opened before the response starts so a full pool is
+# a clean 503, and closed when the client goes away.
+
+def stream_walk(walk, lines):
+    """
+    NDJSON response over `lines` (a generator reading `walk`).
+    """
+    response = app.response_class(
+        stream_with_context(lines), mimetype="application/x-ndjson"
+    )
+    response.headers["Cache-Control"] = "no-store"
+    response.headers["X-Accel-Buffering"] = "no"  # don't let a proxy hold lines back
+    response.call_on_close(walk.close)  # disconnect → cancel the walk
+    return response
+
+
+@app.route("/search/files")
+def search_files():
+    """
+    File and folder names containing every word of ?q=, in walk order,
+    SEARCH_SECTION_LIMIT at a time; ?after= is the "more" cursor.
+    """
+    query = request.args.get("q", "").strip()
+    query_words = query.lower().split()
+    after = request.args.get("after") or None
+    cursor = hit_key(after) if after else None
+    walk = PoolWalk(
+        DISCOVERY_ROOT, "search_file_scan", SKIP_FOLDERS,
+        prune=sorted_walk_pruner(DISCOVERY_ROOT, after),
+    )
+
+    def matches(hit, text):
+        return all(word in text.lower() for word in query_words) and (
+            cursor is None or hit_key(hit) > cursor
+        )
+
+    def lines():
+        count, more, last = 0, None, None
+        with walk:
+            for root, _, files in walk:
+                hits = []
+                rel_root = os.path.relpath(root, DISCOVERY_ROOT)
+                if matches(rel_root + "/", rel_root):
+                    hits.append(rel_root + "/")
+
+                for file in sorted(files):
+                    if file.startswith("."):
+                        continue
+                    rel_path = os.path.relpath(os.path.join(root, file), DISCOVERY_ROOT)
+                    if matches(rel_path, file):
+                        hits.append(rel_path)
+
+                if count + len(hits) > SEARCH_SECTION_LIMIT:
+                    # Page is full: stop walking, resume after the last hit sent
+                    hits = hits[: SEARCH_SECTION_LIMIT - count]
+                    more = hits[-1] if hits else last
+                if hits:
+                    count += len(hits)
+                    last = hits[-1]
+                    yield ndjson({"hits": hits})
+                if more:
+                    break
+        yield ndjson({"done": True, "count": count, "more": more})
+
+    return stream_walk(walk, lines())
+
+
+TYPEAHEAD_KINDS = ("customer", "contact", "partner")
+
+
+@app.route("/typeahead/<kind>")
+def typeahead(kind):
+    """
+    Picker lookups from the in-memory prefix index (typeahead.py).
+
+    Contacts can be narrowed with ?type=, ?customer_id=, ?exclude=<id> and
+    ?unassigned=1 (no customer and no partner yet).
+    """
+    if kind not in TYPEAHEAD_KINDS:
+        abort(404)
+    prefix = request.args.get("q", "")
+    limit = min(request.args.get("limit", TYPEAHEAD_LIMIT, type=int), 50)
+
+    accept = None
+    if kind == "contact":
+        contact_type = request.args.get("type")
+        customer_id = request.args.get("customer_id", type=int)
+        exclude = request.args.get("exclude", type=int)
+        unassigned = request.args.get("unassigned") == "1"
+
+        def accept(record):
+            return (
+                (not contact_type or record["type"] == contact_type)
+                and (customer_id is None or record["customer_id"] == customer_id)
+                and record["id"] != exclude
+                and (not unassigned or not (record["customer_id"] or record["partner_id"]))
+            )
+
+    return jsonify(typeahead_search(kind, prefix, limit, accept))
+
+
 from datetime import datetime
 
 
 @app.route("/files")
 def all_files_by_customer():
-    grouped_files = {}
-    all_files = []
+    # 📁 Tree and recent files fill in from /files/scan
+    return render_template("all_files.html")
+
+
+@app.route("/files/scan")
+def files_scan():
     today = date.today()
-    new_files_today = []
+    walk = PoolWalk(DISCOVERY_ROOT, "files_page_scan", SKIP_FOLDERS)
+
+    def lines():
+        mtimes = {}
+        new_today = 0
+        with walk:
+            for root, _, files in walk:
+                rel_root = os.path.relpath(root, DISCOVERY_ROOT)
+                entries = []
+                for file in files:
+                    if file.startswith("."):
+                        continue
+                    full_path = os.path.join(root, file)
+                    try:
+                        mod_time = os.path.getmtime(full_path)
+                    except FileNotFoundError:
+                        continue
+                    mod_dt = datetime.fromtimestamp(mod_time)
+                    is_new = mod_dt.date() == today
+                    new_today += is_new
+                    mtimes[os.path.relpath(full_path, DISCOVERY_ROOT)] = mod_time
+                    entries.append([file, mod_time, mod_dt.strftime("%Y-%m-%d %H:%M"), is_new])
+                if entries:
+                    yield ndjson({"dir": "" if rel_root == "." else rel_root, "files": entries})
+
+        # ✅ This walk saw every file anyway, so hand it to the new-files counter
+        # (unless a folder couldn't be read: its files would count as deleted)
+        if walk.errors:
+            logger.warning(f"⚠️ /files scan skipped {len(walk.errors)} unreadable folder(s): {walk.errors[0]}")
+        else:
+            new_files_counter.apply(mtimes)
+        logger.info(f"📁 /files scan — {new_today} new files today.")
+        yield ndjson({"done": True, "files": len(mtimes), "new_today": new_today})
 
-    for root, _, files in os.walk(DISCOVERY_ROOT):
-        if any(skip in root for skip in SKIP_FOLDERS):
-            continue
-        for file in files:
-            if file.startswith("."):
-                continue
-            full_path = os.path.join(root, file)
-            rel_path = os.path.relpath(full_path, DISCOVERY_ROOT)
-            mod_time = os.path.getmtime(full_path)
-            mod_dt = datetime.fromtimestamp(mod_time)
-
-            if mod_dt.date() == today:
-                new_files_today.append(rel_path)
-
-            all_files.append({
-                "path": rel_path,
-                "timestamp": mod_time,
-                "date": mod_dt.strftime("%Y-%m-%d %H:%M")
-            })
-
-            # Build folder tree
-            parts = rel_path.split("/")
-            current = grouped_files
-            for part in parts[:-1]:
-                current = current.setdefault(part, {})
-            current[parts[-1]] = rel_path
-
-    # ✅ Update file_scan_cache with latest real-time scan result
-    now = datetime.now()
-    file_scan_cache.update({
-        "date": today,
-        "count": len(new_files_today),
-    })
-    logger.info(f"📁 /files triggered real scan at {now.strftime('%H:%M')} — {len(new_files_today)} new files found.")
-
-    # ✅ Respect your scanning window logic
-    if 11 <= now.hour < 16:
-        file_scan_cache["scanned_11"] = True
-    elif 16 <= now.hour <= 23:
-        file_scan_cache["scanned_16"] = True
-    # NOTE: if before 11, don't mark either flag
-
-    recent_files = sorted(all_files, key=lambda x: x["timestamp"], reverse=True)[:5]
+    return stream_walk(walk, lines())
 
-    return render_template(
-        "all_files.html",
-        grouped_files=grouped_files,
-        recent_files=recent_files,
-        new_files_today=new_files_today
-    )
 
 @app.route("/sync_all_files", methods=["POST"])
 def sync_all_files():
-    scan_and_index_files()
+    # Re-indexing walks the whole share; it runs on the scan pool instead
+    if run_in_background(app, "sync_all_files", scan_and_index_files):
+        flash("🔄 Re-indexing OneDrive files in the background.", "info")
+    else:
+        flash("⏳ A re-index is already running.", "info")
     return redirect(url_for("all_files_by_customer"))
 
 
@@ -287,14 +334,18 @@ def contact_list():
 @app.route("/contacts/<int:contact_id>")
 def view_contact(contact_id):
     contact = Contact.query.get_or_404(contact_id)
-    return render_template("view_contact.html", contact=contact)
+    org_chart = contacts_org_chart()
+    return render_template(
+        "view_contact.html",
+        contact=contact,
+        org_node=org_chart.get(contact.id),
+        reporting_chain=org_chart.chain(contact.id),
+    )
 
 
 @app.route("/contacts/add", methods=["GET", "POST"])
 def add_contact():
     if request.method == "POST":
-        logger.debug("📤 POST request — releasing lock")
-        release_lock()
         c = Contact(
             name=request.form["name"],
             email=request.form["email"],
@@ -311,209 +362,88 @@ def add_contact():
         db.session.add(c)
         division_ids = request.form.getlist("division_ids")
         if division_ids:
-            divisions_to_add = Division.query.filter(
-                Division.id.in_(division_ids)
-            ).all()
-            c.divisions = divisions_to_add
+            db.session.flush()  # need c.id for the link rows
+            sync_links(
+                division_contact.c.contact_id, c.id,
+                division_contact.c.division_id, division_ids,
+                scopes={CONTACTS_SCOPE},
+            )
 
         db.session.commit()
-        log_change("Added contact", f"{c.name} – {c.contact_type}")
-        return redirect(url_for("contact_list"))
-    if is_locked():
-        if not lock_expired():
-            logger.info("🚫 Lock active — denying access")
-            flash(f"🚫 Locked: {lock_info()}", "danger")
-            return redirect(url_for("contact_list"))
-        else:
-            logger.info("⚠️ Lock expired — releasing stale lock")
-            flash("⚠️ Lock expired. Releasing stale lock...", "warning")
-            release_lock()
-
-    if not acquire_lock():
-        logger.warning("🛑 Failed to acquire lock")
-        flash("⚠️ Could not acquire lock. Another user may have just opened it.", "danger")
+        log_change("Added contact", f"{c.name} – {c.contact_type}", entity=c)
         return redirect(url_for("contact_list"))
-
-    logger.debug("✅ Lock acquired — showing form")
-    # 👇 Keep everything below the same
-    def serialize_contact(contact):
-        return {
-            "id": contact.id,
-            "name": contact.name,
-            "customer_id": contact.customer_id,
-        }
-
-    customer_grouped = {}
-    all_customer_contacts = (
-        Contact.query.filter_by(contact_type="Customer").order_by(Contact.name).all()
-    )
-    for c in all_customer_contacts:
-        if c.customer_id:
-            customer_grouped.setdefault(c.customer_id, []).append(serialize_contact(c))
-
-    contacts_by_type = {
-        "Cisco": [
-            serialize_contact(c)
-            for c in Contact.query.filter_by(contact_type="Cisco")
-            .order_by(Contact.name)
-            .all()
-        ],
-        "Partner": [
-            serialize_contact(c)
-            for c in Contact.query.filter_by(contact_type="Partner")
-            .order_by(Contact.name)
-            .all()
-        ],
-        "Customer": customer_grouped,
-    }
-
-    customers = Customer.query.all()
-    partners = Partner.query.all()
-
-    # In your add_contact() GET section
-    divisions = Division.query.order_by(Division.name).all()
-    customer_div_map = {}
-    for c in customers:
-        customer_div_map[c.id] = [
-            {"id": d.id, "name": d.name} for d in c.divisions if d.parent_id is not None
-        ]
-
-    # Pass to template:
-    return render_template(
-        "add_contact.html",
-        contacts_by_type=contacts_by_type,
-        customers=customers,
-        partners=partners,
-        divisions=divisions,  # ✅ add this
-        customer_divisions=customer_div_map,
-    )
+    # Pickers and divisions load on demand (/typeahead, /customers/<id>/division_options)
+    return render_template("add_contact.html")
 
 
 @app.route("/contacts/edit/<int:contact_id>", methods=["GET", "POST"])
 def edit_contact(contact_id):
     contact = Contact.query.get_or_404(contact_id)
-    customers = Customer.query.all()
-    partners = Partner.query.all()
-    all_contacts = Contact.query.filter(Contact.id != contact.id).all()
 
     if request.method == "POST":
-        logger.debug("📤 POST request — releasing lock")
-        release_lock()
-        contact.name = request.form["name"]
-        contact.email = request.form["email"]
-        contact.phone = request.form.get("phone")
-        contact.role = request.form["role"]
-        contact.location = request.form.get("location")
-        contact.reports_to = request.form.get("reports_to") or None
-        contact.notes = request.form.get("notes")
-        contact.contact_type = request.form["contact_type"]
-        contact.customer_id = request.form.get("customer_id") or None
-        contact.partner_id = request.form.get("partner_id") or None
+        form = versioned_form("contact", contact)
+        contact.name = form["name"]
+        contact.email = form["email"]
+        contact.phone = form.get("phone")
+        contact.role = form["role"]
+        contact.location = form.get("location")
+        contact.reports_to = form.get("reports_to") or None
+        contact.notes = form.get("notes")
+        contact.contact_type = form["contact_type"]
+        contact.customer_id = form.get("customer_id") or None
+        contact.partner_id = form.get("partner_id") or None
 
         # ✅ Update divisions only if contact is a customer contact
         if contact.contact_type == "Customer" and contact.customer_id:
-            division_ids = request.form.getlist("division_ids")
-            contact.divisions = Division.query.filter(
-                Division.id.in_(division_ids)
-            ).all()
+            division_ids = form.getlist("division_ids")
         else:
-            contact.divisions = []  # Clear if no customer type
+            division_ids = []  # Clear if no customer type
+        sync_links(
+            division_contact.c.contact_id, contact.id,
+            division_contact.c.division_id, division_ids,
+            scopes={CONTACTS_SCOPE},
+        )
 
-        db.session.commit()
-        log_change("Edited contact", f"{contact.name} – {contact.contact_type}")
+        commit_versioned("contact", contact, form)
+        log_change("Edited contact", f"{contact.name} – {contact.contact_type}", entity=contact)
         return redirect(url_for("contact_list"))
 
-    # === On GET: enforce locking ===
-    if is_locked():
-        if not lock_expired():
-            logger.info("🚫 Lock active — denying access")
-            flash(f"🚫 Locked: {lock_info()}", "danger")
-            return redirect(url_for("contact_list"))
-        else:
-            logger.info("⚠️ Lock expired — releasing stale lock")
-            flash("⚠️ Lock expired. Releasing stale lock...", "warning")
-            release_lock()
-
-    if not acquire_lock():
-        logger.warning("🛑 Failed to acquire lock")
-        flash("⚠️ Could not acquire lock. Another user may have just opened it.", "danger")
-        return redirect(url_for("contact_list"))
-
-    logger.debug("✅ Lock acquired — showing form")
-    
-    def serialize_contact(c):
-        return {
-            "id": c.id,
-            "name": c.name,
-            "customer_id": c.customer_id,
-            "partner_id": c.partner_id,
-        }
-
-    contacts_by_type = {
-        "Cisco": [
-            serialize_contact(c)
-            for c in Contact.query.filter(
-                Contact.id != contact.id, Contact.contact_type == "Cisco"
-            )
-            .order_by(Contact.name)
-            .all()
-        ],
-        "Customer": [
-            serialize_contact(c)
-            for c in Contact.query.filter(
-                Contact.id != contact.id, Contact.contact_type == "Customer"
-            )
-            .order_by(Contact.name)
-            .all()
-        ],
-        "Partner": [
-            serialize_contact(c)
-            for c in Contact.query.filter(
-                Contact.id != contact.id, Contact.contact_type == "Partner"
-            )
-            .order_by(Contact.name)
-            .all()
-        ],
-    }
-
-    # ✅ Divisions for the contact’s customer
-    customer_divisions = {
-        str(c.id): [
-            {"id": d.id, "name": d.name}
-            for d in c.divisions
-            if d.parent_id  # filter only real sub-divisions
-        ]
-        for c in customers
-    }
+    remember_version("contact", contact)
 
     return render_template(
         "edit_contact.html",
         contact=contact,
-        customers=customers,
-        partners=partners,
-        contacts_by_type=contacts_by_type,
-        customer_divisions=customer_divisions,  # ✅ THIS
     )
 
 
-@app.route("/contacts/delete/<int:contact_id>")
-def delete_contact(contact_id):
-    contact = Contact.query.get_or_404(contact_id)
+@app.route("/customers/<int:customer_id>/division_options")
+def customer_division_options(customer_id):
+    """
+    Compact [[id, name], ...] of a customer's sub-divisions for the contact
+    forms. Cached per customer version, with an ETag for the browser.
+    """
+    cache_key = versioned_key("division_options", customer_id)
+    body = fragment_cache.get(cache_key)
+    if body is None:
+        rows = db.session.execute(
+            db.select(Division.id, Division.name)
+            .where(Division.customer_id == customer_id, Division.parent_id.isnot(None))
+            .order_by(Division.name)
+        ).all()
+        body = json.dumps([[d_id, name] for d_id, name in rows], separators=(",", ":"))
+        fragment_cache.set(cache_key, body)
 
-    # Remove from any customer's contact list
-    for customer in Customer.query.all():
-        if contact in customer.contacts:
-            customer.contacts.remove(contact)
+    response = app.response_class(body, mimetype="application/json")
+    response.set_etag(cache_key)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
-    # Clear customer_id and partner_id (if present)
-    contact.customer_id = None
-    contact.partner_id = None
 
-    # Disassociate from meetings
-    for meeting in contact.meetings:
-        meeting.participants.remove(contact)
-    log_change("Deleted contact", f"{contact.name} – {contact.contact_type}")
-    db.session.delete(contact)
+@app.route("/contacts/delete/<int:contact_id>")
+def delete_contact(contact_id):
+    contact = Contact.query.get_or_404(contact_id)
+    log_change("Deleted contact", f"{contact.name} – {contact.contact_type}", entity=contact)
+    deletion.delete_contact(contact.id)
     db.session.commit()
     return redirect(url_for("contact_list"))
 
@@ -521,19 +451,30 @@ def delete_contact(contact_id):
 @app.route("/contacts/delete_all")
 def delete_all_contacts():
     log_change("Deleted all contacts", "All contacts removed via bulk delete.")
-    db.session.execute(division_contact.delete())  # Clean up many-to-many link
-    Contact.query.delete()
+    deletion.delete_all_contacts()
     db.session.commit()
     return redirect(url_for("contact_list"))
 
 
+@app.route("/delete_preview/<kind>/<int:entity_id>")
+def delete_preview(kind, entity_id):
+    """
+    Dry run of a delete: {"label": rows affected} for the confirm dialogs.
+    """
+    if kind not in deletion.DELETERS:
+        abort(404)
+    counts = deletion.DELETERS[kind](entity_id, dry_run=True)
+    return jsonify([[label, count] for label, count in counts.items()])
+
+
 @app.route("/contacts/export_csv")
 def export_contacts_csv():
 
     import csv
     from io import StringIO
 
-    contacts = Contact.query.all()
+    contacts = Contact.query.options(*loader_plan("contact_export")).all()
+    org_chart = contacts_org_chart()
 
     si = StringIO()
     writer = csv.writer(si)
@@ -567,7 +508,7 @@ def export_contacts_csv():
                 c.location or "",
                 c.technology or "",
                 c.contact_type or "",
-                c.manager.name if c.manager else "",
+                org_chart.manager_name(c.id),
                 c.customer.name if c.customer else "",
                 c.partner.name if c.partner else "",
                 division_names,
@@ -593,6 +534,8 @@ def export_contacts_csv():
 @app.route("/contacts/import_csv", methods=["GET", "POST"])
 def import_contacts_csv():
     if request.method == "POST":
+        import csv  # 📦 only when a CSV is actually imported
+
         file = request.files["csv_file"]
         if not file or not file.filename.endswith(".csv"):
             return "Invalid file", 400
@@ -681,7 +624,8 @@ def import_contacts_csv():
 
 @app.route("/partners")
 def partner_list():
-    return render_template("partners.html", partners=Partner.query.all())
+    partners = Partner.query.options(*loader_plan("partner_list")).all()
+    return render_template("partners.html", partners=partners)
 
 
 @app.route("/partners/add", methods=["GET", "POST"])
@@ -689,40 +633,20 @@ def add_partner():
     customers = Customer.query.order_by(Customer.name).all()
 
     if request.method == "POST":
-        logger.debug("📤 POST request — releasing lock")
-        release_lock()
         partner = Partner(name=request.form["name"], notes=request.form.get("notes"))
-
-        customer_ids = request.form.getlist("customer_ids")
-        for cid in customer_ids:
-            customer = Customer.query.get(int(cid))
-            if customer:
-                partner.customers.append(customer)
-
         db.session.add(partner)
-        log_change("Added partner", partner.name)
+        db.session.flush()  # need partner.id for the link rows
+
+        sync_links(
+            partner_customer.c.partner_id, partner.id,
+            partner_customer.c.customer_id, request.form.getlist("customer_ids"),
+        )
+        log_change("Added partner", partner.name, entity=partner)
         db.session.commit()
 
         if request.args.get("from") == "settings":
             return redirect(url_for("settings", tab="partners"))
         return redirect(url_for("partner_list"))
-# === On GET: enforce locking ===
-    if is_locked():
-        if not lock_expired():
-            logger.info("🚫 Lock active — denying access")
-            flash(f"🚫 Locked: {lock_info()}", "danger")
-            return redirect(url_for("partner_list"))
-        else:
-            logger.info("⚠️ Lock expired — releasing stale lock")
-            flash("⚠️ Lock expired. Releasing stale lock...", "warning")
-            release_lock()
-
-    if not acquire_lock():
-        logger.warning("🛑 Failed to acquire lock")
-        flash("⚠️ Could not acquire lock. Another user may have just opened it.", "danger")
-        return redirect(url_for("partner_list"))
-
-    logger.debug("✅ Lock acquired — showing form")
     return render_template("add_partner.html", customers=customers)
 
 
@@ -732,38 +656,23 @@ def edit_partner(partner_id):
     customers = Customer.query.order_by(Customer.name).all()
 
     if request.method == "POST":
-        logger.debug("📤 POST request — releasing lock")
-        release_lock()
-        partner.name = request.form["name"]
-        partner.notes = request.form.get("notes")
-
-        # Update assigned customers
-        customer_ids = request.form.getlist("customer_ids")
-        partner.customers = Customer.query.filter(Customer.id.in_(customer_ids)).all()
+        form = versioned_form("partner", partner)
+        partner.name = form["name"]
+        partner.notes = form.get("notes")
+
+        # Update assigned customers (only the links that changed are written)
+        sync_links(
+            partner_customer.c.partner_id, partner.id,
+            partner_customer.c.customer_id, form.getlist("customer_ids"),
+        )
 
-        db.session.commit()
-        log_change("Edited partner", partner.name)
+        commit_versioned("partner", partner, form)
+        log_change("Edited partner", partner.name, entity=partner)
 
         if request.args.get("from") == "settings":
             return redirect(url_for("settings", tab="partners"))
         return redirect(url_for("partner_list"))
-# === On GET: enforce locking ===
-    if is_locked():
-        if not lock_expired():
-            logger.info("🚫 Lock active — denying access")
-            flash(f"🚫 Locked: {lock_info()}", "danger")
-            return redirect(url_for("partner_list"))
-        else:
-            logger.info("⚠️ Lock expired — releasing stale lock")
-            flash("⚠️ Lock expired. Releasing stale lock...", "warning")
-            release_lock()
-
-    if not acquire_lock():
-        logger.warning("🛑 Failed to acquire lock")
-        flash("⚠️ Could not acquire lock. Another user may have just opened it.", "danger")
-        return redirect(url_for("partner_list"))
-
-    logger.debug("✅ Lock acquired — showing form")
+    remember_version("partner", partner)
     return render_template("edit_partner.html", partner=partner, customers=customers)
 
 
@@ -775,16 +684,8 @@ def delete_partner(partner_id):
     if confirm_name != partner.name:
         return redirect(url_for("settings", tab="partners", msg="confirm_failed"))
 
-    # Disassociate the partner from linked customers
-    for customer in partner.customers:
-        customer.partners.remove(partner)
-
-    # Disassociate the partner from contacts
-    for contact in partner.contacts:
-        contact.partner_id = None
-
-    log_change("Deleted partner", partner.name)
-    db.session.delete(partner)
+    log_change("Deleted partner", partner.name, entity=partner)
+    deletion.delete_partner(partner.id)
     db.session.commit()
 
     if request.args.get("from") == "settings":
@@ -799,7 +700,9 @@ def delete_partner(partner_id):
 
 @app.route("/partners/<int:partner_id>")
 def partner_detail(partner_id):
-    partner = Partner.query.get_or_404(partner_id)
+    partner = Partner.query.options(*loader_plan("partner_detail")).get_or_404(
+        partner_id
+    )
     return render_template("partner_detail.html", partner=partner)
 
 
@@ -810,55 +713,31 @@ def partner_detail(partner_id):
 
 @app.route("/customers")
 def customer_list():
-    return render_template("customers.html", customers=Customer.query.all())
-
-
-def build_contact_tree(contacts):
-    id_map = {c.id: c for c in contacts}
-    report_counts = {c.id: 0 for c in contacts}
-
-    # Step 1: Build subordinates and count direct reports
-    for contact in contacts:
-        manager_id = contact.reports_to
-        if manager_id and manager_id in id_map:
-            manager = id_map[manager_id]
-            if not hasattr(manager, "subordinates"):
-                manager.subordinates = []
-            manager.subordinates.append(contact)
-            report_counts[manager_id] += 1
-
-    # Step 2: Recursive function to count all descendants (subtree size)
-    def count_descendants(contact):
-        if not hasattr(contact, "subordinates"):
-            return 0
-        return len(contact.subordinates) + sum(count_descendants(sub) for sub in contact.subordinates)
-
-    # Step 3: Identify top-level contacts (no manager)
-    tree = []
-    for contact in contacts:
-        manager_id = contact.reports_to
-        if not manager_id:
-            tree.append(contact)
-
-    # Step 4: Separate disconnected contacts
-    connected = [c for c in tree if hasattr(c, "subordinates")]
-    disconnected = [c for c in tree if not hasattr(c, "subordinates")]
+    customers = get_snapshot().customers_by_name
+    return render_template("customers.html", customers=customers)
 
-    # Step 5: Sort by total size of reporting tree (then alphabetically)
-    connected.sort(key=lambda c: (-count_descendants(c), c.name.lower()))
-    disconnected.sort(key=lambda c: c.name.lower())
 
-    return connected + disconnected
+@app.route("/customer/<int:id>")
+def customer_detail(id):
+    # ⚡ Body is cached per customer version; any commit touching this
+    # customer's graph bumps the version (see cache.py)
+    cache_key = versioned_key("customer_detail", id)
+    customer_body = fragment_cache.get(cache_key)
+    if customer_body is None:
+        customer_body = render_customer_detail_body(id)
+        fragment_cache.set(cache_key, customer_body)
 
+    return render_template(
+        "customer_detail.html", customer_body=Markup(customer_body)
+    )
 
 
-@app.route("/customer/<int:id>")
-def customer_detail(id):
-    customer = Customer.query.options(joinedload(Customer.meetings)).get_or_404(id)
-    contact_tree = build_contact_tree(customer.contacts)
+def render_customer_detail_body(id):
+    customer = Customer.query.options(*loader_plan("customer_detail")).get_or_404(id)
+    contact_tree = customer_org_chart(customer.id).roots
     past_meetings = sorted(customer.meetings, key=lambda m: m.date, reverse=True)
 
-    root_docs, division_docs = get_customer_attachments(customer.id)
+    root_docs, division_docs = split_customer_attachments(customer.divisions)
 
     # 🧹 Exclude hidden files (e.g., .DS_Store)
     root_docs = [
@@ -870,8 +749,9 @@ def customer_detail(id):
 
     total_attachments = len(root_docs) + len(division_docs)
 
-    return render_template(
-        "customer_detail.html",
+    # Rendered straight from the Jinja env: the body needs no context
+    # processors, and skipping them saves their queries on every cache miss
+    return app.jinja_env.get_template("customer_detail_body.html").render(
         customer=customer,
         contact_tree=contact_tree,
         past_meetings=past_meetings,
@@ -882,8 +762,6 @@ def customer_detail(id):
 @app.route("/customers/add", methods=["GET", "POST"])
 def add_customer():
     if request.method == "POST":
-        logger.debug("📤 POST request — releasing lock")
-        release_lock()
         customer_name = request.form["name"]
         customer = Customer(
             name=customer_name,
@@ -891,17 +769,16 @@ def add_customer():
             notes=request.form.get("notes"),
         )
 
+        db.session.add(customer)
+        db.session.flush()  # need customer.id for the link rows
+
         # Relationships
-        partner_ids = request.form.getlist("partners")
-        contact_ids = request.form.getlist("contacts")
-        for pid in partner_ids:
-            partner = Partner.query.get(int(pid))
-            customer.partners.append(partner)
-        for cid in contact_ids:
-            contact = Contact.query.get(int(cid))
-            customer.contacts.append(contact)
+        sync_links(
+            partner_customer.c.customer_id, customer.id,
+            partner_customer.c.partner_id, request.form.getlist("partners"),
+        )
+        assign_rows(Contact, request.form.getlist("contacts"), customer_id=customer.id)
 
-        db.session.add(customer)
         db.session.commit()
 
         # ✅ Save logo if uploaded
@@ -934,28 +811,7 @@ def add_customer():
             return redirect(url_for("settings", tab="customers"))
         return redirect(url_for("customer_list"))
     
-    # === On GET: enforce locking ===
-    if is_locked():
-        if not lock_expired():
-            logger.info("🚫 Lock active — denying access")
-            flash(f"🚫 Locked: {lock_info()}", "danger")
-            return redirect(url_for("customer_list"))
-        else:
-            logger.info("⚠️ Lock expired — releasing stale lock")
-            flash("⚠️ Lock expired. Releasing stale lock...", "warning")
-            release_lock()
-
-    if not acquire_lock():
-        logger.warning("🛑 Failed to acquire lock")
-        flash("⚠️ Could not acquire lock. Another user may have just opened it.", "danger")
-        return redirect(url_for("customer_list"))
-
-    logger.debug("✅ Lock acquired — showing form")
-    contacts = Contact.query.filter(
-        Contact.customer_id == None, Contact.partner_id == None
-    ).all()
-    partners = Partner.query.all()
-    return render_template("add_customer.html", contacts=contacts, partners=partners)
+    return render_template("add_customer.html")
 
 
 @app.route("/customers/edit/<int:id>", methods=["GET", "POST"])
@@ -963,11 +819,10 @@ def edit_customer(id):
     customer = Customer.query.get_or_404(id)
 
     if request.method == "POST":
-        logger.debug("📤 POST request — releasing lock")
-        release_lock()
-        customer.name = request.form["name"]
-        customer.cx_services = request.form.get("cx_services")
-        customer.notes = request.form.get("notes")
+        form = versioned_form("customer", customer)
+        customer.name = form["name"]
+        customer.cx_services = form.get("cx_services")
+        customer.notes = form.get("notes")
 
         # ✅ Handle logo upload
         logo = request.files.get("logo")
@@ -977,27 +832,11 @@ def edit_customer(id):
             os.makedirs(os.path.dirname(logo_path), exist_ok=True)
             logo.save(logo_path)
 
-        log_change("Edited customer", customer.name)
-        db.session.commit()
+        commit_versioned("customer", customer, form)
+        log_change("Edited customer", customer.name, entity=customer)
 
         return redirect(url_for("customer_detail", id=customer.id))
-    # === On GET: enforce locking ===
-    if is_locked():
-        if not lock_expired():
-            logger.info("🚫 Lock active — denying access")
-            flash(f"🚫 Locked: {lock_info()}", "danger")
-            return redirect(url_for("customer_detail", id=customer.id))
-        else:
-            logger.info("⚠️ Lock expired — releasing stale lock")
-            flash("⚠️ Lock expired. Releasing stale lock...", "warning")
-            release_lock()
-
-    if not acquire_lock():
-        logger.warning("🛑 Failed to acquire lock")
-        flash("⚠️ Could not acquire lock. Another user may have just opened it.", "danger")
-        return redirect(url_for("customer_detail", id=customer.id))
-
-    logger.debug("✅ Lock acquired — showing form")
+    remember_version("customer", customer)
     return render_template(
         "edit_customer.html", customer=customer, available_contacts=Contact.query.all()
     )
@@ -1012,23 +851,9 @@ def delete_customer(id):
     if confirm_name != customer.name:
         return redirect(url_for("settings", tab="customers", msg="confirm_failed"))
 
-    # 🔄 Disassociate relationships
-    for item in customer.action_items:
-        item.customer_id = None
-    for meeting in customer.meetings:
-        meeting.customer_id = None
-    for recurring in customer.recurring_meetings:
-        recurring.customer_id = None
-    for contact in customer.contacts:
-        contact.customer_id = None
-        contact.contact_type = "Unassigned"
-    for division in customer.divisions:
-        division.customer_id = None
-
-    log_change("Deleted customer", customer.name)
-    db.session.commit()  # commit disassociations
-
-    db.session.delete(customer)
+    # 🔄 Unlink or remove everything hanging off the customer, one transaction
+    log_change("Deleted customer", customer.name, entity=customer)
+    deletion.delete_customer(customer.id)
     db.session.commit()
 
     if request.args.get("from") == "settings":
@@ -1075,7 +900,7 @@ def upload_customer_file(id):
 
 @app.route("/customers/<int:id>/attachments")
 def customer_attachments(id):
-    sync_customer_files_logic(id)  # auto-sync before rendering
+    # Renders what the DB knows; the page then syncs with the upload folder
     customer = Customer.query.get_or_404(id)
     root_docs, division_docs = get_customer_attachments(customer.id)
 
@@ -1098,6 +923,27 @@ def customer_attachments(id):
     )
 
 
+@app.route("/customers/<int:id>/attachments/sync", methods=["POST"])
+def customer_attachments_sync(id):
+    customer = Customer.query.get_or_404(id)
+    customer_folder = customer_upload_folder(customer)
+    walk = PoolWalk(customer_folder, "customer_files_scan")
+
+    def lines():
+        disk_files = []
+        with walk:
+            for root, _, files in walk:
+                disk_files.extend(upload_files_in(root, files))
+                yield ndjson({"scanned": len(disk_files)})
+
+        # Only a finished walk may remove rows; a cancelled one never gets here
+        added, removed = apply_customer_files(customer, disk_files)
+        yield ndjson({"done": True, "added": added, "removed": removed})
+        scan_pool.submit(clean_empty_folders, customer_folder)
+
+    return stream_walk(walk, lines())
+
+
 # --- Customer Opportunities ---
 @app.route("/customers/<int:customer_id>/add_opportunity", methods=["POST"])
 def add_customer_opportunity(customer_id):
@@ -1134,7 +980,7 @@ def edit_opportunity(opp_id):
     opp.last_updated = datetime.now()
 
     db.session.commit()
-    log_change("Edited customer opportunity", f"{opp.title} (ID: {opp.id})")
+    log_change("Edited customer opportunity", f"{opp.title} (ID: {opp.id})", entity=opp)
 
     return redirect(url_for("customer_detail", id=opp.customer_id))
 
@@ -1258,11 +1104,12 @@ def assign_contacts_to_division(division_id):
     available_contacts = Contact.query.filter_by(customer_id=customer.id).all()
 
     if request.method == "POST":
-        selected_ids = request.form.getlist("contact_ids")
-        selected_contacts = Contact.query.filter(Contact.id.in_(selected_ids)).all()
-
-        # Reset and reassign contacts
-        division.contacts = selected_contacts
+        # Only the links that changed are written
+        sync_links(
+            division_contact.c.division_id, division.id,
+            division_contact.c.contact_id, request.form.getlist("contact_ids"),
+            scopes={CONTACTS_SCOPE, division.customer_id},
+        )
 
         db.session.commit()
         return redirect(url_for("division_detail", division_id=division.id))
@@ -1277,7 +1124,9 @@ def assign_contacts_to_division(division_id):
 
 @app.route("/division/<int:division_id>")
 def division_detail(division_id):
-    division = Division.query.get_or_404(division_id)
+    division = Division.query.options(*loader_plan("division_detail")).get_or_404(
+        division_id
+    )
     return render_template(
         "division_detail.html",
         division=division,
@@ -1514,7 +1363,7 @@ def action_item_list():
     tab = request.args.get("tab", "daily")
     all_customers = Customer.query.order_by(Customer.name).all()
 
-    query = ActionItem.query
+    query = ActionItem.query.options(*loader_plan("action_items"))
     if customer_id:
         query = query.filter_by(customer_id=customer_id)
 
@@ -1550,9 +1399,6 @@ def action_item_list():
 @app.route("/action_items/add", methods=["GET", "POST"])
 def add_action_item():
     if request.method == "POST":
-        # 🔓 Release the lock after successful submission
-        release_lock()
-
         item = ActionItem(
             date=request.form["date"],
             detail=request.form["detail"],
@@ -1565,25 +1411,12 @@ def add_action_item():
         db.session.add(item)
         db.session.commit()
         log_change(
-            "Added action item", f"{item.detail} (Customer ID: {item.customer_id})"
+            "Added action item",
+            f"{item.detail} (Customer ID: {item.customer_id})",
+            entity=item,
         )
         return redirect(url_for("action_item_list", tab=item.category))
 
-   # ✅ On GET: check and enforce locking
-    if is_locked():
-        if not lock_expired():
-            flash(f"🚫 Locked: {lock_info()}", "danger")
-            return redirect(url_for("action_item_list"))
-        else:
-            flash(f"⚠️ Lock expired. Releasing stale lock...", "warning")
-            release_lock()
-
-    # ✅ Now try to acquire it freshly
-    if not acquire_lock():
-        flash("⚠️ Could not acquire lock. Another user may have just opened it.", "danger")
-        return redirect(url_for("action_item_list"))
-    
-    # Lock acquired; proceed to show form
     customers = Customer.query.all()
     return render_template(
         "add_action_item.html",
@@ -1596,7 +1429,9 @@ def delete_action_item(item_id):
     item = ActionItem.query.get_or_404(item_id)
     category = item.category  # ✅ Capture the current category before deletion
     log_change(
-        "Deleted action item", f"{item.detail} (Customer ID: {item.customer_id})"
+        "Deleted action item",
+        f"{item.detail} (Customer ID: {item.customer_id})",
+        entity=item,
     )
     db.session.delete(item)
     db.session.commit()
@@ -1609,42 +1444,27 @@ def edit_action_item(item_id):
     tab = request.args.get("tab", "daily")  # ← Capture tab from query string
 
     if request.method == "POST":
-        logger.debug("📤 POST request — releasing lock")
-        release_lock()
-        item.date = request.form["date"]
-        item.detail = request.form["detail"]
-        item.customer_id = request.form["customer_id"]
-        item.customer_contact = request.form["customer_contact"]
-        item.cisco_contact = request.form["cisco_contact"]
-        item.completed = "completed" in request.form
-        item.category = request.form.get(
+        form = versioned_form("action_item", item)
+        item.date = form["date"]
+        item.detail = form["detail"]
+        item.customer_id = form["customer_id"]
+        item.customer_contact = form["customer_contact"]
+        item.cisco_contact = form["cisco_contact"]
+        item.completed = "completed" in form
+        item.category = form.get(
             "category", item.category
         )  # ← Allow changing category
-        db.session.commit()
+        commit_versioned("action_item", item, form)
         log_change(
-            "Edited action item", f"{item.detail} (Customer ID: {item.customer_id})"
+            "Edited action item",
+            f"{item.detail} (Customer ID: {item.customer_id})",
+            entity=item,
         )
 
         # Redirect to correct tab based on (possibly updated) category
         return redirect(url_for("action_item_list", tab=item.category))
     
-    # === On GET: enforce locking ===
-    if is_locked():
-        if not lock_expired():
-            logger.info("🚫 Lock active — denying access")
-            flash(f"🚫 Locked: {lock_info()}", "danger")
-            return redirect(url_for("action_item_list", tab=item.category))
-        else:
-            logger.info("⚠️ Lock expired — releasing stale lock")
-            flash("⚠️ Lock expired. Releasing stale lock...", "warning")
-            release_lock()
-
-    if not acquire_lock():
-        logger.warning("🛑 Failed to acquire lock")
-        flash("⚠️ Could not acquire lock. Another user may have just opened it.", "danger")
-        return redirect(url_for("action_item_list", tab=item.category))
-
-    logger.debug("✅ Lock acquired — showing form")
+    remember_version("action_item", item)
     customers = Customer.query.all()
     return render_template(
         "edit_action_item.html", item=item, customers=customers, active_tab=tab
@@ -1756,7 +1576,11 @@ def export_action_items_csv():
             )
 
     # Fetch all items and sort by date descending
-    all_items = ActionItem.query.order_by(ActionItem.date.desc()).all()
+    all_items = (
+        ActionItem.query.options(*loader_plan("action_items"))
+        .order_by(ActionItem.date.desc())
+        .all()
+    )
 
     # Filter into 4 groups
     ordered_items = (
@@ -1792,7 +1616,7 @@ def meeting_list():
     search_query = request.args.get("q", "").strip()
     customers = Customer.query.order_by(Customer.name).all()
 
-    meetings = Meeting.query
+    meetings = Meeting.query.options(*loader_plan("meetings"))
 
     if customer_id:
         meetings = meetings.filter(Meeting.customer_id == customer_id)
@@ -1828,8 +1652,6 @@ def redirect_back(fallback_endpoint=None, fallback_kwargs=None):
 @app.route("/meetings/add", methods=["GET", "POST"])
 def add_meeting():
     if request.method == "POST":
-        logger.debug("📤 POST request — releasing lock")
-        release_lock()
         meeting = Meeting(
             customer_id=request.form["customer_id"],
             date=request.form["date"],
@@ -1842,40 +1664,19 @@ def add_meeting():
         log_change(
             "Added meeting",
             f"{meeting.title} for {meeting.customer.name} on {meeting.date}",
+            entity=meeting,
         )
         return redirect_back(fallback_endpoint="meeting_list")  # 👈 updated
     
-    # === On GET: enforce locking ===
-    if is_locked():
-        if not lock_expired():
-            logger.info("🚫 Lock active — denying access")
-            flash(f"🚫 Locked: {lock_info()}", "danger")
-            return redirect(url_for("meeting_list"))
-        else:
-            logger.info("⚠️ Lock expired — releasing stale lock")
-            flash("⚠️ Lock expired. Releasing stale lock...", "warning")
-            release_lock()
 
-    if not acquire_lock():
-        logger.warning("🛑 Failed to acquire lock")
-        flash("⚠️ Could not acquire lock. Another user may have just opened it.", "danger")
-        return redirect(url_for("meeting_list"))
-
-    logger.debug("✅ Lock acquired — showing form")
-
-    customers = Customer.query.all()
-    contacts = Contact.query.all()
     selected_customer_id = request.args.get(
         "customer_id", type=int
     )  # 👈 get it from URL
-    current_date = date.today().strftime("%Y-%m-%d")  # ✅ Provide today's date
 
     return render_template(
         "add_meeting.html",
-        customers=customers,
-        contacts=contacts,
         current_date=datetime.today().date(),
-        selected_customer_id=selected_customer_id,
+        selected_customer=db.session.get(Customer, selected_customer_id) if selected_customer_id else None,
     )
 
 
@@ -1885,39 +1686,23 @@ def edit_meeting(meeting_id):
     customers = Customer.query.order_by(Customer.name).all()  # ⬅️ Needed for dropdown
 
     if request.method == "POST":
-        logger.debug("📤 POST request — releasing lock")
-        release_lock()
-        meeting.date = request.form["date"]
-        meeting.title = request.form["title"]
-        meeting.host = request.form["host"]
-        meeting.notes = request.form.get("notes")
-        meeting.customer_id = request.form.get(
+        form = versioned_form("meeting", meeting)
+        meeting.date = form["date"]
+        meeting.title = form["title"]
+        meeting.host = form["host"]
+        meeting.notes = form.get("notes")
+        meeting.customer_id = form.get(
             "customer_id", type=int
         )  # ⬅️ Allow reassignment
-        db.session.commit()
+        commit_versioned("meeting", meeting, form)
         log_change(
             "Edited meeting",
             f"{meeting.title} (ID: {meeting.id}) for {meeting.customer.name}",
+            entity=meeting,
         )
         return redirect(url_for("meeting_list"))
 
-    # === On GET: enforce locking ===
-    if is_locked():
-        if not lock_expired():
-            logger.info("🚫 Lock active — denying access")
-            flash(f"🚫 Locked: {lock_info()}", "danger")
-            return redirect(url_for("meeting_list"))
-        else:
-            logger.info("⚠️ Lock expired — releasing stale lock")
-            flash("⚠️ Lock expired. Releasing stale lock...", "warning")
-            release_lock()
-
-    if not acquire_lock():
-        logger.warning("🛑 Failed to acquire lock")
-        flash("⚠️ Could not acquire lock. Another user may have just opened it.", "danger")
-        return redirect(url_for("meeting_list"))
-
-    logger.debug("✅ Lock acquired — showing form")
+    remember_version("meeting", meeting)
 
     return render_template("edit_meeting.html", meeting=meeting, customers=customers)
 
@@ -1928,6 +1713,7 @@ def delete_meeting(meeting_id):
     log_change(
         "Deleted meeting",
         f"{meeting.title} (ID: {meeting.id}) for {meeting.customer.name}",
+        entity=meeting,
     )
     db.session.delete(meeting)
     db.session.commit()
@@ -1946,24 +1732,20 @@ def recurring_meeting_list():
 
     if customer_id:
         meetings = (
-            RecurringMeeting.query.filter_by(customer_id=customer_id)
+            RecurringMeeting.query.options(*loader_plan("recurring_meetings"))
+            .filter_by(customer_id=customer_id)
             .order_by(RecurringMeeting.start_datetime.desc())
             .all()
         )
     else:
-        meetings = RecurringMeeting.query.order_by(
-            RecurringMeeting.start_datetime.desc()
-        ).all()
+        meetings = (
+            RecurringMeeting.query.options(*loader_plan("recurring_meetings"))
+            .order_by(RecurringMeeting.start_datetime.desc())
+            .all()
+        )
 
     # --- Find meetings happening today ---
-    today = datetime.today().date()
-    meetings_today = []
-    for meeting in meetings:
-        next_occurrence = meeting.get_next_occurrence(
-            today=datetime.combine(today, datetime.min.time())
-        )
-        if next_occurrence and next_occurrence.date() == today:
-            meetings_today.append(meeting)
+    meetings_today = meetings_on(date.today(), customer_id)
 
     return render_template(
         "recurring_meetings.html",
@@ -2005,8 +1787,6 @@ def ordinal(n):
 @app.route("/recurring_meetings/add", methods=["GET", "POST"])
 def add_recurring_meeting():
     if request.method == "POST":
-        logger.debug("📤 POST request — releasing lock")
-        release_lock()
         title = request.form["title"]
         start_datetime = datetime.strptime(
             request.form["start_datetime"], "%Y-%m-%dT%H:%M"
@@ -2038,34 +1818,11 @@ def add_recurring_meeting():
         log_change(
             "Added recurring meeting",
             f"{meeting.title} every {meeting.recurrence_pattern} for {meeting.customer.name}",
+            entity=meeting,
         )
 
         if generate_ics:
-            cal = Calendar()
-            event = Event()
-
-            event.add("summary", title)
-            event.add("dtstart", start_datetime)
-            event.add("dtend", start_datetime + timedelta(minutes=duration))
-            event.add("description", description or "")
-            event.add("location", f"Customer ID: {customer_id}")
-
-            freq_map = {
-                "daily": "DAILY",
-                "weekly": "WEEKLY",
-                "biweekly": "WEEKLY",
-                "monthly": "MONTHLY",
-            }
-            rrule = {
-                "FREQ": freq_map.get(recurrence_pattern, "WEEKLY"),
-                "INTERVAL": 2 if recurrence_pattern == "biweekly" else 1,
-                "UNTIL": repeat_until,
-            }
-            event.add("rrule", rrule)
-
-            cal.add_component(event)
-
-            ics_bytes = io.BytesIO(cal.to_ical())
+            ics_bytes = io.BytesIO(single_event_calendar(meeting))
             ics_bytes.seek(0)
 
             return send_file(
@@ -2077,23 +1834,6 @@ def add_recurring_meeting():
 
         return redirect(url_for("recurring_meeting_list"))
     
-    # === On GET: enforce locking ===
-    if is_locked():
-        if not lock_expired():
-            logger.info("🚫 Lock active — denying access")
-            flash(f"🚫 Locked: {lock_info()}", "danger")
-            return redirect(url_for("recurring_meeting_list"))
-        else:
-            logger.info("⚠️ Lock expired — releasing stale lock")
-            flash("⚠️ Lock expired. Releasing stale lock...", "warning")
-            release_lock()
-
-    if not acquire_lock():
-        logger.warning("🛑 Failed to acquire lock")
-        flash("⚠️ Could not acquire lock. Another user may have just opened it.", "danger")
-        return redirect(url_for("recurring_meeting_list"))
-
-    logger.debug("✅ Lock acquired — showing form")
     customers = Customer.query.all()
 
     return render_template("add_recurring_meeting.html", customers=customers)
@@ -2104,47 +1844,31 @@ def edit_recurring_meeting(meeting_id):
     meeting = RecurringMeeting.query.get_or_404(meeting_id)
 
     if request.method == "POST":
-        logger.debug("📤 POST request — releasing lock")
-        release_lock()
+        form = versioned_form("recurring_meeting", meeting)
         meeting.start_datetime = datetime.strptime(
-            request.form["start_datetime"], "%Y-%m-%dT%H:%M"
+            form["start_datetime"], "%Y-%m-%dT%H:%M"
         )
-        meeting.title = request.form["title"]
-        meeting.customer_id = int(request.form["customer_id"])
-        meeting.host = request.form["host"]
-        meeting.recurrence_pattern = request.form["recurrence_pattern"]
+        meeting.title = form["title"]
+        meeting.customer_id = int(form["customer_id"])
+        meeting.host = form["host"]
+        meeting.recurrence_pattern = form["recurrence_pattern"]
         meeting.repeat_until = (
-            datetime.strptime(request.form["repeat_until"], "%Y-%m-%d").date()
-            if request.form["repeat_until"]
+            datetime.strptime(form["repeat_until"], "%Y-%m-%d").date()
+            if form["repeat_until"]
             else None
         )
-        meeting.description = request.form.get("description")
-        meeting.duration_minutes = request.form.get("duration_minutes", type=int) or 60
+        meeting.description = form.get("description")
+        meeting.duration_minutes = form.get("duration_minutes", type=int) or 60
 
-        db.session.commit()
+        commit_versioned("recurring_meeting", meeting, form)
         log_change(
             "Edited recurring meeting",
             f"{meeting.title} (ID: {meeting.id}) for {meeting.customer.name}",
+            entity=meeting,
         )
         return redirect(url_for("recurring_meeting_list"))
     
-    # === On GET: enforce locking ===
-    if is_locked():
-        if not lock_expired():
-            logger.info("🚫 Lock active — denying access")
-            flash(f"🚫 Locked: {lock_info()}", "danger")
-            return redirect(url_for("recurring_meeting_list"))
-        else:
-            logger.info("⚠️ Lock expired — releasing stale lock")
-            flash("⚠️ Lock expired. Releasing stale lock...", "warning")
-            release_lock()
-
-    if not acquire_lock():
-        logger.warning("🛑 Failed to acquire lock")
-        flash("⚠️ Could not acquire lock. Another user may have just opened it.", "danger")
-        return redirect(url_for("recurring_meeting_list"))
-
-    logger.debug("✅ Lock acquired — showing form")
+    remember_version("recurring_meeting", meeting)
 
     customers = Customer.query.all()
     return render_template(
@@ -2158,6 +1882,7 @@ def delete_recurring_meeting(meeting_id):
     log_change(
         "Deleted recurring meeting",
         f"{meeting.title} (ID: {meeting.id}) for {meeting.customer.name}",
+        entity=meeting,
     )
     db.session.delete(meeting)
     db.session.commit()
@@ -2168,36 +1893,7 @@ def delete_recurring_meeting(meeting_id):
 def download_recurring_ics(meeting_id):
     meeting = RecurringMeeting.query.get_or_404(meeting_id)
 
-    cal = Calendar()
-    event = Event()
-
-    event.add("summary", meeting.title)
-    event.add("dtstart", meeting.start_datetime)
-    event.add(
-        "dtend",
-        meeting.start_datetime + timedelta(minutes=meeting.duration_minutes or 60),
-    )
-    event.add("description", meeting.description or "")
-    event.add("location", meeting.customer.name)
-
-    # ✅ Add RRULE
-    freq_map = {
-        "daily": "DAILY",
-        "weekly": "WEEKLY",
-        "biweekly": "WEEKLY",
-        "monthly": "MONTHLY",
-    }
-    rrule = {
-        "FREQ": freq_map.get(meeting.recurrence_pattern, "WEEKLY"),
-        "INTERVAL": 2 if meeting.recurrence_pattern == "biweekly" else 1,
-        "UNTIL": meeting.repeat_until,  # should be datetime.date or datetime
-    }
-    event.add("rrule", rrule)
-
-    cal.add_component(event)
-
-    # Write .ics to memory
-    ics_bytes = io.BytesIO(cal.to_ical())
+    ics_bytes = io.BytesIO(single_event_calendar(meeting))
     ics_bytes.seek(0)
 
     return send_file(
@@ -2208,6 +1904,102 @@ def download_recurring_ics(meeting_id):
     )
 
 
+AGENDA_VIEWS = ("day", "week", "month")
+
+
+def agenda_range(view, anchor):
+    """
+    [start, end) of the day/week/month containing `anchor`, plus the
+    anchors of the previous and next pages.
+    """
+    if view == "day":
+        start, end = anchor, anchor + timedelta(days=1)
+        prev_anchor, next_anchor = anchor - timedelta(days=1), end
+    elif view == "week":
+        start = anchor - timedelta(days=anchor.weekday())
+        end = start + timedelta(days=7)
+        prev_anchor, next_anchor = start - timedelta(days=7), end
+    else:
+        start = anchor.replace(day=1)
+        end = (start + timedelta(days=32)).replace(day=1)
+        prev_anchor, next_anchor = (start - timedelta(days=1)).replace(day=1), end
+    return start, end, prev_anchor, next_anchor
+
+
+@app.route("/agenda")
+def agenda():
+    """
+    Recurring meeting occurrences for a day, week or month, or for an
+    explicit ?start=&end= range (end inclusive), across all customers
+    unless ?customer_id= is given.
+    """
+    customer_id = request.args.get("customer_id", type=int)
+    view = request.args.get("view", "week")
+    if view not in AGENDA_VIEWS:
+        view = "week"
+
+    def parse_day(name):
+        try:
+            return datetime.strptime(request.args.get(name, ""), "%Y-%m-%d").date()
+        except ValueError:
+            return None
+
+    anchor = parse_day("date") or date.today()
+    range_start, range_end = parse_day("start"), parse_day("end")
+    if range_start and range_end and range_start <= range_end:
+        view = "range"
+        start, end = range_start, range_end + timedelta(days=1)
+        prev_anchor = next_anchor = None
+    else:
+        start, end, prev_anchor, next_anchor = agenda_range(view, anchor)
+
+    occurrences = occurrences_between(
+        datetime.combine(start, datetime.min.time()),
+        datetime.combine(end, datetime.min.time()),
+        customer_id,
+    )
+    days = {}
+    for occurrence in occurrences:
+        days.setdefault(occurrence.starts_at.date(), []).append(occurrence)
+
+    window_start, window_end = ensure_window()
+    return render_template(
+        "agenda.html",
+        view=view,
+        views=AGENDA_VIEWS,
+        anchor=anchor,
+        start=start,
+        last_day=end - timedelta(days=1),
+        prev_anchor=prev_anchor,
+        next_anchor=next_anchor,
+        days=days,
+        customers=Customer.query.order_by(Customer.name).all(),
+        selected_customer_id=customer_id,
+        outside_window=(
+            datetime.combine(start, datetime.min.time()) < window_start
+            or datetime.combine(end, datetime.min.time()) > window_end
+        ),
+        window_start=window_start.date(),
+        window_end=(window_end - timedelta(days=1)).date(),
+        today=date.today(),
+    )
+
+
+@app.route("/recurring_meetings/feed.ics")
+def recurring_meetings_feed():
+    """
+    Subscribable calendar of every recurring meeting (?customer_id= narrows it).
+    """
+    customer_id = request.args.get("customer_id", type=int)
+    etag, last_modified, body = build_feed(customer_id)
+
+    response = app.response_class(body, mimetype="text/calendar")
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.cache_control.no_cache = True  # 🔁 always revalidate, usually a 304
+    return response.make_conditional(request)
+
+
 # --- BACKUP ROUTES ---
 # --- BACKUP ROUTES ---
 # --- BACKUP ROUTES ---
@@ -2269,13 +2061,14 @@ def inject_division_setup_links():
 
 @app.context_processor
 def inject_counts():
+    totals = get_snapshot().totals  # 📸 no queries per render
     return {
-        "customer_count": Customer.query.count(),
-        "contact_count": Contact.query.count(),
-        "partner_count": Partner.query.count(),
-        "action_item_open_count": ActionItem.query.filter_by(completed=False).count(),
-        "meeting_count": Meeting.query.count(),
-        "recurring_meeting_count": RecurringMeeting.query.count(),
+        "customer_count": totals["customers"],
+        "contact_count": totals["contacts"],
+        "partner_count": totals["partners"],
+        "action_item_open_count": totals["open_ais"],
+        "meeting_count": totals["past_meetings"],
+        "recurring_meeting_count": totals["recurring_meetings"],
     }
 
 
@@ -2295,31 +2088,12 @@ def inject_attachment_logic():
 
 @app.context_processor
 def inject_meetings_today():
-    from datetime import datetime
-
-    today = datetime.today().date()
-    meetings = RecurringMeeting.query.all()
-
-    meetings_today = []
-    for meeting in meetings:
-        next_occurrence = meeting.get_next_occurrence(
-            today=datetime.combine(today, datetime.min.time())
-        )
-        if next_occurrence and next_occurrence.date() == today:
-            meetings_today.append(meeting)
-
-    return dict(meetings_today=meetings_today)
-
-
-@app.context_processor
-def inject_lock_status():
-    return dict(is_locked=is_locked)
+    return dict(meetings_today=meetings_on(date.today()))
 
 
 @app.context_processor
 def inject_new_file_count():
-    from config import DISCOVERY_ROOT, SKIP_FOLDERS
-    return dict(new_files_today_count=get_new_files_today_count(DISCOVERY_ROOT, SKIP_FOLDERS))
+    return dict(new_files_today_count=get_new_files_today_count())
 
 
 # ------------------ DASHBOARD ROUTES ---------------------
@@ -2327,55 +2101,28 @@ def inject_new_file_count():
 
 @app.route("/dashboard")
 def dashboard():
-    customers = Customer.query.order_by(Customer.name).all()
-
-    customer_cards = []
-    open_action_customers = []  # 🔥 list instead of just True/False
-
-    for customer in customers:
-        open_ais_count = ActionItem.query.filter_by(
-            customer_id=customer.id, completed=False
-        ).count()
+    snapshot = get_snapshot()
+    customer_cards = snapshot.customers_by_name  # 📸 counts precomputed per customer
 
-        if open_ais_count >= 5:  # 👈 Customize threshold (e.g., 5 or more)
-            open_action_customers.append(
-                {"name": customer.name, "count": open_ais_count}
-            )
-
-        customer_cards.append(
-            {
-                "id": customer.id,
-                "name": customer.name,
-                "open_ais": open_ais_count,
-                "past_meetings": Meeting.query.filter_by(
-                    customer_id=customer.id
-                ).count(),
-                "recurring_meetings": RecurringMeeting.query.filter_by(
-                    customer_id=customer.id
-                ).count(),
-            }
-        )
+    open_action_customers = [  # 🔥 list instead of just True/False
+        {"name": customer.name, "count": customer.open_ais}
+        for customer in customer_cards
+        if customer.open_ais >= 5  # 👈 Customize threshold (e.g., 5 or more)
+    ]
 
     # Existing recurring meetings check
-    meetings = RecurringMeeting.query.all()
-    today = datetime.today().date()
-    meetings_today = []
-    for meeting in meetings:
-        next_occurrence = meeting.get_next_occurrence(
-            today=datetime.combine(today, datetime.min.time())
-        )
-        if next_occurrence and next_occurrence.date() == today:
-            meetings_today.append(meeting)
+    meetings_today = meetings_on(date.today())
 
+    totals = snapshot.totals
     return render_template(
         "dashboard.html",
         customer_cards=customer_cards,
-        total_customers=len(customers),
-        total_contacts=Contact.query.count(),
-        total_partners=Partner.query.count(),
-        total_meetings=Meeting.query.count(),
-        total_recurring=RecurringMeeting.query.count(),
-        open_actions=ActionItem.query.filter_by(completed=False).count(),
+        total_customers=totals["customers"],
+        total_contacts=totals["contacts"],
+        total_partners=totals["partners"],
+        total_meetings=totals["past_meetings"],
+        total_recurring=totals["recurring_meetings"],
+        open_actions=totals["open_ais"],
         meetings_today=meetings_today,
         open_action_customers=open_action_customers, # ✅ pass list instead of bool
     )
@@ -2384,100 +2131,26 @@ def dashboard():
 # ------------------ HEATMAP ROUTES ---------------------
 @app.route("/heatmap")
 def heatmap():
-    customers = Customer.query.order_by(Customer.name).all()
-    heatmap_data = []
-
-    for customer in customers:
-        row = {"id": customer.id, "name": customer.name, "data": []}
-        for column in COLUMNS:
-            cell = HeatmapCell.query.filter_by(
-                customer_id=customer.id, column_name=column
-            ).first()
-            if cell and (cell.color or cell.text):
-                row["data"].append({"color": cell.color, "text": cell.text})
-            else:
-                row["data"].append({"color": "", "text": ""})
-        heatmap_data.append(row)
-
+    snapshot = get_snapshot()
+    heatmap_data = [
+        {"id": customer.id, "name": customer.name, "data": snapshot.heatmap_row(customer.id, COLUMNS)}
+        for customer in snapshot.customers_by_name
+    ]
     return render_template("heatmap.html", customers=heatmap_data, columns=COLUMNS)
 
 
-@app.route("/save_heatmap", methods=["POST"])
-def save_heatmap():
-    raw_data = request.form.get("heatmap_data", "")
-    logger.info("📥 Saving Heatmap Data:")
-   # logger.info(raw_data)
-
-    for line in raw_data.strip().split("\n"):
-        if not line.strip():
-            continue
-
-        try:
-            customer_id_str, cells_raw = line.split("||")
-            customer = Customer.query.get(int(customer_id_str.strip()))
-            if not customer:
-                logger.error(f"❌ Customer not found with ID: {customer_id_str}")
-                continue
-
-            cell_values = cells_raw.split("|")
-            if len(cell_values) != len(COLUMNS):
-                logger.error(f"⚠️ Column mismatch for customer ID {customer_id_str}")
-                continue
-
-            change_summary = []
-
-            for i, value in enumerate(cell_values):
-                if "::" not in value:
-                    color, text = "", ""
-                else:
-                    color, text = value.split("::", 1)
-
-                column = COLUMNS[i]
-                color = color.strip()
-                text = text.strip()
-
-                existing_cell = HeatmapCell.query.filter_by(
-                    customer_id=customer.id, column_name=column
-                ).first()
-
-                if color or text:
-                    if existing_cell:
-                        if existing_cell.color != color or existing_cell.text != text:
-                            change_summary.append(
-                                f"{column}: '{existing_cell.text}' → '{text}' [{existing_cell.color} → {color}]"
-                            )
-                        existing_cell.color = color
-                        existing_cell.text = text
-                        db.session.add(existing_cell)
-                    else:
-                        change_summary.append(f"{column}: (new) '{text}' [{color}]")
-                        new_cell = HeatmapCell(
-                            customer_id=customer.id,
-                            column_name=column,
-                            color=color,
-                            text=text,
-                        )
-                        db.session.add(new_cell)
-                else:
-                    if existing_cell:
-                        change_summary.append(
-                            f"{column}: cleared '{existing_cell.text}' [{existing_cell.color}]"
-                        )
-                        db.session.delete(existing_cell)
-
-            if change_summary:
-                log_change(
-                    "Edited heatmap", f"{customer.name} → " + "; ".join(change_summary)
-                )
-
-        except Exception as e:
-            logger.error(f"❌ Exception occurred while processing line: {line}")
-            logger.error(f"   Error: {e}")
-            continue
-
-    db.session.commit()
-    logger.info("✅ DB commit completed")
-    return redirect(url_for("heatmap", msg="✅ Heatmap saved!"))
+@app.route("/heatmap/cells", methods=["POST"])
+def save_heatmap_cells():
+    """
+    JSON delta save: {"cells": [{customer_id, column, color, text, version}]}
+    → {"cells": [{customer_id, column, version}]}, or 409 with the current
+    state of any cell that changed meanwhile (heatmap.py).
+    """
+    try:
+        saved = save_heatmap_delta(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"cells": saved})
 
 
 @app.route("/reset_heatmap")
@@ -2489,32 +2162,63 @@ def reset_heatmap():
         if customer:
             log_change("Reset heatmap", f"{customer.name} → all cells cleared")
 
-    HeatmapCell.query.delete()
+    # Blanked rather than deleted, so cell versions keep counting up (heatmap.py)
+    HeatmapCell.query.update(
+        {"color": "", "text": "", "version": HeatmapCell.version + 1}, synchronize_session=False
+    )
     db.session.commit()
     return redirect(url_for("heatmap", msg="🧹 Heatmap reset — all cells cleared!"))
 
 
 # ------------------ SETTINGS ROUTES ---------------------
 
+AUDIT_PAGE_SIZE = 50
+LOG_PAGE_SIZE = 200
+
 @app.route("/settings")
 def settings():
-    from models import Customer, Partner
-
-    customers = Customer.query.order_by(Customer.name).all()
-    partners = Partner.query.order_by(Partner.name).all()
+    snapshot = get_snapshot()
+    customers = snapshot.customers_by_name
+    partners = snapshot.partners_by_name
     tab = request.args.get("tab", "log")
 
-    # 🔍 Read & filter the log file
-    log_content = ""
-    try:
-        with open(CHANGE_LOG_FILE, "r") as f:
-            lines = f.readlines()
-            #filtered_lines = lines
-            filtered_lines = [line for line in lines if "Nik" in line or "Gary" in line]
-            log_content = "".join(reversed(filtered_lines[-200:]))  # Show last 200 matching lines
-    except Exception as e:
-        log_content = f"❌ Could not read log file: {e}"
-    
+    log_source = request.args.get("log_source", "audit")
+    audit_events, audit_next_before, audit_actors, audit_actions = [], None, [], []
+    log_lines, log_cursor = [], None
+    audit_filters = {
+        key: request.args.get(key) or None for key in ("actor", "action", "entity_type")
+    }
+    log_filters = {
+        "log_user": request.args.get("log_user") or None,
+        "log_action": request.args.get("log_action") or None,
+    }
+
+    if log_source == "file":
+        # 📄 Raw change_log.txt (+ rotations), read backwards until the page is full
+        log_lines, log_cursor = tail_log(
+            change_log_files(),
+            limit=LOG_PAGE_SIZE,
+            user=log_filters["log_user"],
+            action=log_filters["log_action"],
+            cursor=request.args.get("log_cursor"),
+        )
+    else:
+        # 📜 Audit events, newest first, one page at a time (keyset on id)
+        query = AuditEvent.query
+        for key, value in audit_filters.items():
+            if value:
+                query = query.filter(getattr(AuditEvent, key) == value)
+        before = request.args.get("before", type=int)
+        if before:
+            query = query.filter(AuditEvent.id < before)
+        audit_events = query.order_by(AuditEvent.id.desc()).limit(AUDIT_PAGE_SIZE + 1).all()
+        if len(audit_events) > AUDIT_PAGE_SIZE:
+            audit_events = audit_events[:AUDIT_PAGE_SIZE]
+            audit_next_before = audit_events[-1].id
+
+        audit_actors = [a for (a,) in db.session.query(AuditEvent.actor).distinct().order_by(AuditEvent.actor) if a]
+        audit_actions = [a for (a,) in db.session.query(AuditEvent.action).distinct().order_by(AuditEvent.action)]
+
     backup_times = get_last_backup_times()
     
     return render_template(
@@ -2522,7 +2226,15 @@ def settings():
         customers=customers,
         partners=partners,
         tab=tab,
-        log_content=log_content,
+        audit_events=audit_events,
+        audit_filters=audit_filters,
+        audit_next_before=audit_next_before,
+        audit_actors=audit_actors,
+        audit_actions=audit_actions,
+        log_source=log_source,
+        log_lines=log_lines,
+        log_cursor=log_cursor,
+        log_filters=log_filters,
         backup_times=backup_times,
         now=datetime.now()
     )
@@ -2536,22 +2248,6 @@ def links():
 
 @app.route('/add-link', methods=['POST'])
 def add_link():
-    logger.debug("📤 add-link POST — attempting to acquire lock")
-    if is_locked():
-        if not lock_expired():
-            logger.info("🚫 Lock active — denying access to add-link")
-            flash(f"🚫 Locked: {lock_info()}", "danger")
-            return redirect(url_for("links"))
-        else:
-            logger.info("⚠️ Lock expired — releasing stale lock for add-link")
-            flash("⚠️ Lock expired. Releasing stale lock...", "warning")
-            release_lock()
-
-    if not acquire_lock():
-        logger.warning("🛑 Failed to acquire lock for add-link")
-        flash("⚠️ Could not acquire lock. Another user may have just opened it.", "danger")
-        return redirect(url_for("links"))
-
     link_text = request.form.get('link_text')
     url = request.form.get('url')
     others = request.form.get('others')
@@ -2560,37 +2256,19 @@ def add_link():
         new_link = Link(link_text=link_text, url=url, others=others)
         db.session.add(new_link)
         db.session.commit()
-        log_change("Added link", f"{link_text} → {url}")
+        log_change("Added link", f"{link_text} → {url}", entity=new_link)
     
-    release_lock()
     return redirect(url_for('links'))
 
 @app.route('/edit-link/<int:link_id>', methods=['POST'])
 def edit_link(link_id):
-    logger.debug("📤 edit-link POST — attempting to acquire lock")
-    if is_locked():
-        if not lock_expired():
-            logger.info("🚫 Lock active — denying access to edit-link")
-            flash(f"🚫 Locked: {lock_info()}", "danger")
-            return redirect(url_for("links"))
-        else:
-            logger.info("⚠️ Lock expired — releasing stale lock for edit-link")
-            flash("⚠️ Lock expired. Releasing stale lock...", "warning")
-            release_lock()
-
-    if not acquire_lock():
-        logger.warning("🛑 Failed to acquire lock for edit-link")
-        flash("⚠️ Could not acquire lock. Another user may have just opened it.", "danger")
-        return redirect(url_for("links"))
-
     link = Link.query.get_or_404(link_id)
     link.link_text = request.form.get('link_text')
     link.url = request.form.get('url')
     link.others = request.form.get('others')
     db.session.commit()
-    log_change("Edited link", f"{link.link_text} → {link.url}")
+    log_change("Edited link", f"{link.link_text} → {link.url}", entity=link)
     
-    release_lock()
     return redirect(url_for('links'))
 
 
@@ -2602,13 +2280,32 @@ def delete_link(link_id):
     return redirect(url_for('links'))
 
 
-# UNLOCK ROUTE
+# ------------------  METRICS ROUTES ---------------------
+
+
+@app.route("/metrics")
+def metrics():
+    return app.response_class(
+        render_metrics(app.config.get("STARTUP_SECONDS")), mimetype="text/plain; version=0.0.4"
+    )
+
+
+# ------------------  EDIT CONFLICTS ---------------------
+
+
+@app.errorhandler(ScanBusy)
+def scan_busy(_):
+    response = jsonify({"error": "Too many file scans running, try again shortly."})
+    response.status_code = 503
+    response.headers["Retry-After"] = "5"
+    return response
+
+
+@app.errorhandler(HeatmapConflict)
+def heatmap_conflict(conflict):
+    return jsonify({"error": str(conflict), "conflicts": conflict.cells}), 409
 
 
-@app.route("/unlock", methods=["POST"])
-def unlock():
-    if session.get("owns_lock"):
-        release_lock()
-        return "", 204  # Success
-    logger.info("⚠️ Unlock blocked: session does not own the lock")
-    return "", 403  # Forbidden
+@app.errorhandler(EditConflict)
+def edit_conflict(conflict):
+    return render_template("edit_conflict.html", conflict=conflict), 409
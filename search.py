@@ -0,0 +1,131 @@
+import os
+from functools import cached_property
+
+from config import SEARCH_SECTION_LIMIT
+from loader_plans import loader_plan
+from models import Contact, Customer, Link, Partner
+
+
+# --------------------- SEARCH SECTIONS ---------------------
+# /search shows at most SEARCH_SECTION_LIMIT hits per section, plus a
+# "more" cursor for the next page. Database sections page by offset and are
+# queried lazily, when the streamed template first reaches them; file hits
+# page by the last path sent (see hit_key), so the next page resumes the walk
+# instead of starting it over.
+
+
+def _customers(q):
+    return Customer.query.filter(
+        (Customer.name.ilike(f"%{q}%"))
+        | (Customer.cx_services.ilike(f"%{q}%"))
+        | (Customer.notes.ilike(f"%{q}%"))
+    ).order_by(Customer.name, Customer.id)
+
+
+def _contacts(q):
+    return Contact.query.options(*loader_plan("contact_search")).filter(
+        (Contact.name.ilike(f"%{q}%"))
+        | (Contact.email.ilike(f"%{q}%"))
+        | (Contact.role.ilike(f"%{q}%"))
+        | (Contact.location.ilike(f"%{q}%"))
+        | (Contact.technology.ilike(f"%{q}%"))
+        | (Contact.notes.ilike(f"%{q}%"))
+        | (Contact.customer.has(Customer.name.ilike(f"%{q}%")))
+    ).order_by(Contact.name, Contact.id)
+
+
+def _links(q):
+    return Link.query.filter(
+        (Link.link_text.ilike(f"%{q}%"))
+        | (Link.url.ilike(f"%{q}%"))
+        | (Link.others.ilike(f"%{q}%"))
+    ).order_by(Link.id)
+
+
+def _partners(q):
+    return Partner.query.filter(
+        (Partner.name.ilike(f"%{q}%")) | (Partner.notes.ilike(f"%{q}%"))
+    ).order_by(Partner.name, Partner.id)
+
+
+SECTIONS = {
+    "customers": _customers,
+    "contacts": _contacts,
+    "links": _links,
+    "partners": _partners,
+}
+
+
+class SearchPage:
+    """
+    One page of a database section. `rows` runs the query on first use;
+    `more` is the offset of the next page, or None.
+    """
+
+    def __init__(self, section, query, offset=0, limit=SEARCH_SECTION_LIMIT):
+        self.section = section
+        self.query = query
+        self.offset = max(offset, 0)
+        self.limit = limit
+
+    @cached_property
+    def _fetched(self):
+        # One row past the page says whether there's more
+        return SECTIONS[self.section](self.query).offset(self.offset).limit(self.limit + 1).all()
+
+    @property
+    def rows(self):
+        return self._fetched[: self.limit]
+
+    @property
+    def more(self):
+        return self.offset + self.limit if len(self._fetched) > self.limit else None
+
+
+def search_pages(query):
+    return {section: SearchPage(section, query) for section in SECTIONS}
+
+
+# ---- File hits ----
+# Walks for /search/files visit folders in sorted order: a folder's own hit,
+# then its files by name, then its subfolders. hit_key() gives that order as
+# a tuple, so a cursor (the last hit sent) tells which folders are done.
+
+
+def _folder_key(parts):
+    key = ()
+    for part in parts:
+        key += (1, part)
+    return key
+
+
+def hit_key(hit):
+    """
+    Walk-order key for a hit: "a/b/" is a folder, "a/b/c.pdf" a file.
+    """
+    if hit.endswith("/"):
+        parts = hit.rstrip("/").split("/")
+        return _folder_key([] if parts == ["."] else parts)
+    *folders, name = hit.split("/")
+    return _folder_key(folders) + (0, name)
+
+
+def sorted_walk_pruner(top, after=None):
+    """
+    PoolWalk `prune` hook: sorts subfolders so the walk order is stable and,
+    with a cursor, drops those whose whole subtree came before it.
+    """
+    cursor = hit_key(after) if after else None
+
+    def prune(root, dirs):
+        dirs.sort()
+        if cursor is None:
+            return
+        rel_root = os.path.relpath(root, top)
+        base = [] if rel_root == "." else rel_root.split("/")
+        dirs[:] = [
+            d for d in dirs
+            if not _folder_key(base + [d]) < cursor[: len(base) * 2 + 2]
+        ]
+
+    return prune
@@ -0,0 +1,197 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: waitress serves from a single process anyway
+    fcntl = None
+
+from config import CACHE_BACKEND, SHARED_CACHE_PATH
+
+
+# --------------------- SHARED CACHE STORE ---------------------
+# State every worker process must agree on: cache version counters, the
+# read model's change feed, the new-files count, edit-form snapshots.
+# "memory" keeps it in this process (dev server); "sqlite" keeps it in a
+# small WAL-mode database file next to the app, so gunicorn workers on one
+# box see each other's writes. Values are JSON.
+#
+# - get / get_many / set (optional ttl in seconds) / incr
+# - append(channel, value) + read_since(channel, seq): an ordered change
+#   feed; only the newest `keep` entries are kept, and a reader that fell
+#   further behind is told so (complete=False) and should start over.
+
+
+class MemoryStore:
+    def __init__(self, keep=1000):
+        self.keep = keep
+        self._data = {}  # key → (value, expires_at or None)
+        self._feeds = {}  # channel → [(seq, value)]
+        self._floors = {}  # channel → highest seq dropped
+        self._seq = 0
+        self._sets = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            value, expires_at = self._data.get(key, (default, None))
+            if expires_at is not None and expires_at < time.time():
+                del self._data[key]
+                return default
+            return value
+
+    def get_many(self, keys, default=None):
+        return [self.get(key, default) for key in keys]
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl if ttl else None)
+            self._sets += 1
+            if ttl and self._sets % 256 == 0:  # expired entries are swept now and then
+                now = time.time()
+                for k in [k for k, (_, e) in self._data.items() if e is not None and e < now]:
+                    del self._data[k]
+
+    def incr(self, key):
+        with self._lock:
+            value = (self._data.get(key, (0, None))[0] or 0) + 1
+            self._data[key] = (value, None)
+            return value
+
+    def append(self, channel, value):
+        with self._lock:
+            self._seq += 1
+            feed = self._feeds.setdefault(channel, [])
+            feed.append((self._seq, value))
+            if len(feed) > self.keep:
+                self._floors[channel] = feed[-self.keep - 1][0]
+                del feed[: -self.keep]
+            return self._seq
+
+    def read_since(self, channel, seq):
+        """
+        (values after `seq`, newest seq, complete).
+        """
+        with self._lock:
+            feed = self._feeds.get(channel, [])
+            values = [v for s, v in feed if s > seq]
+            latest = feed[-1][0] if feed else seq
+            return values, max(latest, seq), seq >= self._floors.get(channel, 0)
+
+
+class SQLiteStore:
+    def __init__(self, path, keep=1000):
+        self.path = path
+        self.keep = keep
+        self._sets = 0
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")  # readers never wait for a writer
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT, expires_at REAL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS feed (seq INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT, value TEXT)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_feed_channel_seq ON feed (channel, seq)")
+
+    def _conn(self):
+        # One connection per thread; never reuse one inherited across fork()
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key, default=None):
+        return self.get_many([key], default)[0]
+
+    def get_many(self, keys, default=None):
+        rows = dict(
+            self._conn().execute(
+                f"SELECT key, value FROM kv WHERE key IN ({','.join('?' * len(keys))})"
+                " AND (expires_at IS NULL OR expires_at >= ?)",
+                (*keys, time.time()),
+            ).fetchall()
+        )
+        return [json.loads(rows[key]) if key in rows else default for key in keys]
+
+    def set(self, key, value, ttl=None):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), time.time() + ttl if ttl else None),
+        )
+        self._sets += 1
+        if ttl and self._sets % 256 == 0:  # expired entries are swept now and then
+            conn.execute("DELETE FROM kv WHERE expires_at < ?", (time.time(),))
+
+    def incr(self, key):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO kv (key, value) VALUES (?, '1')"
+                " ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1, expires_at = NULL",
+                (key,),
+            )
+            value = int(conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()[0])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return value
+
+    def append(self, channel, value):
+        conn = self._conn()
+        seq = conn.execute(
+            "INSERT INTO feed (channel, value) VALUES (?, ?)", (channel, json.dumps(value))
+        ).lastrowid
+        if seq % 100 == 0:
+            floor = conn.execute(
+                "SELECT seq FROM feed WHERE channel = ? ORDER BY seq DESC LIMIT 1 OFFSET ?",
+                (channel, self.keep),
+            ).fetchone()
+            if floor:
+                conn.execute("DELETE FROM feed WHERE channel = ? AND seq <= ?", (channel, floor[0]))
+                self.set(f"feed_floor:{channel}", floor[0])
+        return seq
+
+    def read_since(self, channel, seq):
+        rows = self._conn().execute(
+            "SELECT seq, value FROM feed WHERE channel = ? AND seq > ? ORDER BY seq", (channel, seq)
+        ).fetchall()
+        latest = rows[-1][0] if rows else seq
+        complete = seq >= self.get(f"feed_floor:{channel}", 0)
+        return [json.loads(value) for _, value in rows], latest, complete
+
+
+def exclusive_lock(path, blocking=False):
+    """
+    Take an inter-process lock on `path`. Returns the open lock file (the
+    lock lasts until it's closed) or None if another process holds it.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    handle = open(path, "a")
+    if fcntl is None:
+        return handle
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+    except BlockingIOError:
+        handle.close()
+        return None
+    return handle
+
+
+def _create_store():
+    if CACHE_BACKEND == "sqlite":
+        return SQLiteStore(SHARED_CACHE_PATH)
+    return MemoryStore()
+
+
+shared_store = _create_store()
@@ -0,0 +1,42 @@
+// 📡 Reads a newline-delimited JSON response as it streams in.
+//
+// streamNdjson("/files/scan", line => { ... })          // GET
+// streamNdjson(url, onLine, {method: "POST"})           // extra fetch() options
+//
+// onLine gets each parsed line as soon as it arrives. Resolves when the
+// stream ends; rejects with {status, retryAfter} if the server said no
+// (503 = too many file scans running, try again shortly).
+function streamNdjson(url, onLine, options) {
+  return fetch(url, options).then(response => {
+    if (!response.ok) {
+      return Promise.reject({
+        status: response.status,
+        retryAfter: Number(response.headers.get('Retry-After')) || null,
+      });
+    }
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    function read() {
+      return reader.read().then(({done, value}) => {
+        buffer += decoder.decode(value || new Uint8Array(), {stream: !done});
+        const lines = buffer.split('\n');
+        buffer = lines.pop();  // last piece may be half a line
+        lines.filter(line => line.trim()).forEach(line => onLine(JSON.parse(line)));
+        if (done) {
+          if (buffer.trim()) onLine(JSON.parse(buffer));
+          return;
+        }
+        return read();
+      });
+    }
+    return read();
+  });
+}
+
+// Message to show when streamNdjson() rejects
+function streamErrorText(error) {
+  if (error && error.status === 503) return 'File scans are busy right now, try again in a few seconds.';
+  return 'Could not scan the files.';
+}
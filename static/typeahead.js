@@ -0,0 +1,105 @@
+// 🔎 Pickers backed by /typeahead/<kind> instead of lists embedded in the page.
+//
+// attachTypeahead(input, {
+//   url: "/typeahead/contact",      // endpoint
+//   params: () => ({type: "Cisco"}), // extra filters, read on every lookup
+//   hidden: element,                 // receives the picked id (optional)
+//   onPick: item => {},              // called with {id, name, ...} (optional)
+//   required: true,                  // block submit until something is picked
+// })
+function attachTypeahead(input, options) {
+  const menu = document.createElement('div');
+  menu.className = 'list-group position-absolute shadow-sm';
+  menu.style.zIndex = 1050;
+  menu.style.display = 'none';
+  input.parentNode.style.position = 'relative';
+  input.parentNode.appendChild(menu);
+  input.setAttribute('autocomplete', 'off');
+
+  let timer = null;
+  let request = 0;
+
+  function hide() {
+    menu.style.display = 'none';
+    menu.innerHTML = '';
+  }
+
+  function pick(item) {
+    input.setCustomValidity('');
+    if (options.hidden) {
+      options.hidden.value = item.id;
+      input.value = item.name;
+    }
+    hide();
+    if (options.onPick) options.onPick(item);
+  }
+
+  function lookup() {
+    const url = new URL(options.url, window.location.origin);
+    url.searchParams.set('q', input.value);
+    const extra = options.params ? options.params() : {};
+    Object.entries(extra).forEach(([key, value]) => {
+      if (value !== null && value !== undefined && value !== '') url.searchParams.set(key, value);
+    });
+
+    const current = ++request;
+    fetch(url).then(r => r.json()).then(items => {
+      if (current !== request) return;  // a newer keystroke already asked
+      menu.innerHTML = '';
+      items.forEach(item => {
+        const row = document.createElement('button');
+        row.type = 'button';
+        row.className = 'list-group-item list-group-item-action py-1';
+        row.textContent = item.name;
+        if (item.hint) {
+          const hint = document.createElement('small');
+          hint.className = 'text-muted ms-2';
+          hint.textContent = item.hint;
+          row.appendChild(hint);
+        }
+        row.addEventListener('mousedown', event => {
+          event.preventDefault();  // keep focus so blur doesn't hide first
+          pick(item);
+        });
+        menu.appendChild(row);
+      });
+      menu.style.width = input.offsetWidth + 'px';
+      menu.style.display = items.length ? 'block' : 'none';
+    });
+  }
+
+  if (options.required && input.form) {
+    input.form.addEventListener('submit', event => {
+      if (!options.hidden.value) {
+        event.preventDefault();
+        input.setCustomValidity('Pick an entry from the list');
+        input.reportValidity();
+      }
+    });
+  }
+
+  input.addEventListener('input', () => {
+    input.setCustomValidity('');
+    if (options.hidden) options.hidden.value = '';  // typed text is not a pick yet
+    clearTimeout(timer);
+    timer = setTimeout(lookup, 150);
+  });
+  input.addEventListener('focus', lookup);
+  input.addEventListener('blur', () => setTimeout(hide, 100));
+  input.addEventListener('keydown', event => {
+    if (event.key === 'Enter' && menu.style.display === 'block' && menu.firstChild) {
+      event.preventDefault();
+      menu.firstChild.dispatchEvent(new MouseEvent('mousedown'));
+    } else if (event.key === 'Escape') {
+      hide();
+    }
+  });
+
+  return {
+    reset() {
+      input.value = '';
+      if (options.hidden) options.hidden.value = '';
+      hide();
+    },
+  };
+}
@@ -0,0 +1,36 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# config.py reads these on import, so they're set before anything imports it;
+# the scratch dir keeps tests off the real .env paths
+_workdir = tempfile.mkdtemp(prefix="crm-tests-")
+os.makedirs(os.path.join(_workdir, "onedrive", "APP"), exist_ok=True)
+os.environ["ONEDRIVE_PATH"] = os.path.join(_workdir, "onedrive")
+os.environ["DATABASE_PATH"] = os.path.join(_workdir, "test.db")
+os.chdir(_workdir)
+sys.path.insert(0, REPO_ROOT)
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app import create_app
+    from extensions import db
+
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["username"] = "Tester"
+    return client
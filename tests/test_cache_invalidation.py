@@ -0,0 +1,30 @@
+from extensions import db
+from models import Customer, Partner
+
+# --------------------- CACHED PAGES AFTER EDITS ---------------------
+# customer_detail is served from fragment_cache until a commit bumps the
+# customer's version (cache.py); these edits must bump it.
+
+
+def test_partner_rename_refreshes_linked_customer_page(app, client):
+    with app.app_context():
+        customer = Customer(name="Rename Co")
+        partner = Partner(name="Old Partner Name")
+        partner.customers.append(customer)
+        db.session.add_all([customer, partner])
+        db.session.commit()
+        customer_id, partner_id, version = customer.id, partner.id, partner.version
+
+    assert b"Old Partner Name" in client.get(f"/customer/{customer_id}").data  # now cached
+
+    # Same customer link, new name: only the partner row changes
+    client.get(f"/partners/edit/{partner_id}")
+    response = client.post(
+        f"/partners/edit/{partner_id}",
+        data={"name": "New Partner Name", "notes": "", "customer_ids": [str(customer_id)], "version": str(version)},
+    )
+    assert response.status_code == 302
+
+    page = client.get(f"/customer/{customer_id}").data
+    assert b"New Partner Name" in page
+    assert b"Old Partner Name" not in page
@@ -0,0 +1,53 @@
+import os
+from datetime import date
+
+import pytest
+
+from file_counter import NewFilesCounter, PartialScan
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for folder in ("Acme/Docs", "Globex"):
+        os.makedirs(tmp_path / folder)
+    for path in ("Acme/a.pdf", "Acme/Docs/b.pdf", "Globex/c.pdf"):
+        (tmp_path / path).write_text("x")
+    return tmp_path
+
+
+@pytest.fixture
+def counter(app, tree):
+    counter = NewFilesCounter(str(tree), skip_folders=())
+    counter._loaded = True  # start from an empty index instead of the database
+    with app.app_context():
+        yield counter
+
+
+def test_poll_relists_only_changed_folders(counter, tree, monkeypatch):
+    counter.poll()
+    assert counter._per_day[date.today()] == 3
+
+    listed = []
+    real_list = counter._list
+    monkeypatch.setattr(counter, "_list", lambda path: listed.append(path) or real_list(path))
+    (tree / "Globex" / "d.pdf").write_text("x")
+    counter.poll()
+
+    assert listed == [os.path.join(str(tree), "Globex")]
+    assert counter._per_day[date.today()] == 4
+
+
+def test_unreadable_folder_aborts_the_poll(counter, tree, monkeypatch):
+    counter.poll()
+    os.utime(tree / "Acme")  # force a re-list, which then fails
+    real_scandir = os.scandir
+
+    def flaky_scandir(path):
+        if path.endswith("Acme"):
+            raise PermissionError(13, "Permission denied", path)
+        return real_scandir(path)
+
+    monkeypatch.setattr(os, "scandir", flaky_scandir)
+    with pytest.raises(PartialScan):
+        counter.poll()
+    assert counter._per_day[date.today()] == 3  # nothing under Acme was dropped
@@ -0,0 +1,108 @@
+from datetime import date, datetime
+
+import pytest
+
+from cache import fragment_cache
+from extensions import db
+from loader_plans import assert_max_queries
+from models import (
+    Contact,
+    Customer,
+    CustomerOpportunity,
+    Division,
+    DivisionDocument,
+    DivisionOpportunity,
+    DivisionProject,
+    DivisionTechnology,
+    Meeting,
+    Partner,
+    RecurringMeeting,
+)
+from org_chart import org_chart_cache
+
+# --------------------- QUERY BOUNDS PER PAGE ---------------------
+# A loader plan makes a page's query count independent of the account's
+# size, so a 3-row account and a 60-row one must both fit the same bound.
+
+SMALL, LARGE = 3, 60
+
+CUSTOMER_DETAIL_MAX = 12
+PARTNER_DETAIL_MAX = 5
+DIVISION_DETAIL_MAX = 9
+
+
+def make_account(size):
+    """
+    A customer with `size` of every child row; returns (customer, partner, division) ids.
+    """
+    customer = Customer(name=f"Account {size}")
+    partner = Partner(name=f"Partner {size}")
+    partner.customers.append(customer)
+    db.session.add_all([customer, partner])
+    db.session.flush()
+
+    division = Division(name="HQ", customer_id=customer.id)
+    db.session.add(division)
+    db.session.flush()
+
+    boss = Contact(name="Boss", role="CEO", customer_id=customer.id, partner_id=partner.id)
+    db.session.add(boss)
+    db.session.flush()
+    for i in range(size):
+        contact = Contact(
+            name=f"Contact {i}", role="Engineer", customer_id=customer.id,
+            partner_id=partner.id, reports_to=boss.id,
+        )
+        contact.divisions.append(division)
+        db.session.add_all(
+            [
+                contact,
+                Division(name=f"Site {i}", customer_id=customer.id, parent_id=division.id),
+                DivisionDocument(division_id=division.id, filename=f"doc{i}.pdf"),
+                DivisionOpportunity(division_id=division.id, title=f"Opportunity {i}"),
+                DivisionTechnology(division_id=division.id, name=f"Tech {i}"),
+                DivisionProject(division_id=division.id, name=f"Project {i}"),
+                CustomerOpportunity(customer_id=customer.id, title=f"Deal {i}"),
+                Meeting(customer_id=customer.id, date=f"2025-01-{i % 28 + 1:02d}", title=f"Meeting {i}"),
+                RecurringMeeting(
+                    customer_id=customer.id, title=f"Sync {i}",
+                    start_datetime=datetime(2025, 1, 1, 9), recurrence_pattern="weekly",
+                    repeat_until=date(2030, 1, 1),
+                ),
+            ]
+        )
+    db.session.commit()
+    return customer.id, partner.id, division.id
+
+
+@pytest.fixture(scope="module")
+def accounts(app):
+    with app.app_context():
+        return {size: make_account(size) for size in (SMALL, LARGE)}
+
+
+def render_uncached(app, client, url, limit):
+    client.get(url)  # warm the layout's own per-process state (snapshot, counters)
+    fragment_cache.clear()
+    org_chart_cache.clear()
+    with app.app_context(), assert_max_queries(limit):
+        response = client.get(url)
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("size", [SMALL, LARGE])
+def test_customer_detail_query_bound(app, client, accounts, size):
+    customer_id, _, _ = accounts[size]
+    render_uncached(app, client, f"/customer/{customer_id}", CUSTOMER_DETAIL_MAX)
+
+
+@pytest.mark.parametrize("size", [SMALL, LARGE])
+def test_partner_detail_query_bound(app, client, accounts, size):
+    _, partner_id, _ = accounts[size]
+    render_uncached(app, client, f"/partners/{partner_id}", PARTNER_DETAIL_MAX)
+
+
+@pytest.mark.parametrize("size", [SMALL, LARGE])
+def test_division_detail_query_bound(app, client, accounts, size):
+    _, _, division_id = accounts[size]
+    render_uncached(app, client, f"/division/{division_id}", DIVISION_DETAIL_MAX)
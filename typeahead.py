@@ -0,0 +1,154 @@
+from bisect import bisect_left
+
+from sqlalchemy import event, select
+
+from extensions import db
+from models import Contact, Customer, Partner
+from shared_cache import shared_store
+
+
+# --------------------- TYPEAHEAD INDEX ---------------------
+# Sorted (token, id) arrays per entity kind, searched with bisect, so picker
+# lookups never touch the database. Every word of a name is a token, so
+# "smi" finds "John Smith". An index is marked stale by any commit that
+# writes its table and rebuilt by the next lookup.
+
+MAX_RESULTS = 15
+
+
+class PrefixIndex:
+    def __init__(self, records):
+        # records: id → dict with at least "id" and "name"
+        self.records = records
+        self.tokens = sorted(
+            (token, record_id)
+            for record_id, record in records.items()
+            for token in {(record["name"] or "").lower(), *(record["name"] or "").lower().split()}
+            if token
+        )
+        self._keys = [token for token, _ in self.tokens]
+
+    def search(self, prefix, limit=MAX_RESULTS, accept=None):
+        """
+        Records with a name word starting with `prefix`, best match first.
+        """
+        prefix = prefix.lower().strip()
+        matches = {}
+        for i in range(bisect_left(self._keys, prefix), len(self._keys)):
+            token, record_id = self.tokens[i]
+            if not token.startswith(prefix):
+                break
+            record = self.records[record_id]
+            if record_id in matches or (accept and not accept(record)):
+                continue
+            # Names that start with the prefix rank above mid-name word hits
+            rank = 0 if (record["name"] or "").lower().startswith(prefix) else 1
+            matches[record_id] = (rank, (record["name"] or "").lower())
+        ranked = sorted(matches, key=matches.get)
+        return [self.records[record_id] for record_id in ranked[:limit]]
+
+
+def _load_customers(conn):
+    return {
+        r.id: {"id": r.id, "name": r.name}
+        for r in conn.execute(select(Customer.id, Customer.name))
+    }
+
+
+def _load_partners(conn):
+    return {
+        r.id: {"id": r.id, "name": r.name}
+        for r in conn.execute(select(Partner.id, Partner.name))
+    }
+
+
+def _load_contacts(conn):
+    customer_names = dict(conn.execute(select(Customer.id, Customer.name)).all())
+    return {
+        r.id: {
+            "id": r.id,
+            "name": r.name,
+            "type": r.contact_type,
+            "customer_id": r.customer_id,
+            "partner_id": r.partner_id,
+            "hint": customer_names.get(r.customer_id) or r.role or "",
+        }
+        for r in conn.execute(
+            select(
+                Contact.id, Contact.name, Contact.role, Contact.contact_type,
+                Contact.customer_id, Contact.partner_id,
+            )
+        )
+    }
+
+
+LOADERS = {
+    "customer": _load_customers,
+    "partner": _load_partners,
+    "contact": _load_contacts,
+}
+
+# Contact hints show the customer name, so a renamed customer stales contacts too
+_STALES = {
+    "customer": ("customer", "contact"),
+    "partner": ("partner",),
+    "contact": ("contact",),
+}
+
+_indexes = {}  # kind → (generation it was built at, PrefixIndex)
+
+
+def get_index(kind):
+    # Generations live in the shared store: a commit in any worker process
+    # stales the indexes of all of them
+    generation = shared_store.get(f"typeahead:{kind}", 0)
+    cached = _indexes.get(kind)
+    if cached is not None and cached[0] == generation:
+        return cached[1]
+    with db.engine.connect() as conn:
+        index = PrefixIndex(LOADERS[kind](conn))
+    # Built from data at least as new as `generation`; a commit racing the
+    # build bumps it again, so the next lookup rebuilds
+    _indexes[kind] = (generation, index)
+    return index
+
+
+def invalidate(*kinds):
+    for kind in kinds or tuple(LOADERS):
+        shared_store.incr(f"typeahead:{kind}")
+
+
+def search(kind, prefix, limit=MAX_RESULTS, accept=None):
+    return get_index(kind).search(prefix, limit, accept)
+
+
+# ---- Invalidation on writes ----
+
+
+@event.listens_for(db.session, "after_flush")
+def _collect_index_writes(session, flush_context):
+    touched = session.info.setdefault("typeahead_kinds", set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if obj.__tablename__ in _STALES:
+            touched.update(_STALES[obj.__tablename__])
+
+
+@event.listens_for(db.session, "do_orm_execute")
+def _collect_bulk_index_writes(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    if table is not None and table.name in _STALES:
+        orm_execute_state.session.info.setdefault("typeahead_kinds", set()).update(_STALES[table.name])
+
+
+@event.listens_for(db.session, "after_commit")
+def _drop_stale_indexes(session):
+    touched = session.info.pop("typeahead_kinds", None)
+    if touched:
+        invalidate(*touched)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _discard_index_writes(session):
+    session.info.pop("typeahead_kinds", None)
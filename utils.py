@@ -1,12 +1,9 @@
 import logging
-from logging.handlers import RotatingFileHandler
 import os
-from threading import Thread
+from threading import Lock, Thread
 from datetime import datetime
 from flask import session
 
-import time
-import getpass
 
 from config import (
     DISCOVERY_ROOT,
@@ -16,10 +13,14 @@ from config import (
     BACKUP_SHARED_DIR,
     BACKUP_LOCAL_DIR,
     DATABASE_PATH,
-    LOCK_FILE,
-
+    LOG_BUFFER_DIR,
+    LOG_FLUSH_SECONDS,
 )
+from audit import record_event
 from extensions import db
+from file_counter import new_files_counter
+from instrumentation import timed, timed_walk
+from log_pipeline import BufferedShareHandler, start_logging_pipeline
 from models import Customer, Division, DivisionDocument, FileIndex
 
 
@@ -60,6 +61,22 @@ def get_customer_attachments(customer_id):
     return root_docs, division_docs
 
 
+def split_customer_attachments(divisions):
+    """
+    Same split as get_customer_attachments(), but from divisions (and their
+    documents) that were already loaded with the customer.
+    """
+    roots = sorted((d for d in divisions if d.parent_id is None), key=lambda d: d.id)
+    if not roots:
+        return [], []
+    root = roots[0]
+
+    division_docs = [
+        doc for d in divisions if d.parent_id == root.id for doc in d.documents
+    ]
+    return list(root.documents), division_docs
+
+
 def sync_all_files_logic():
     customers = Customer.query.all()
 
@@ -74,7 +91,7 @@ def sync_all_files_logic():
         db.session.commit()
 
     general_files = []
-    for root, _, files in os.walk(general_folder):
+    for root, _, files in timed_walk(general_folder):
         for file in files:
             rel_path = os.path.relpath(os.path.join(root, file), UPLOAD_FOLDER)
             if not rel_path.endswith(".DS_Store"):
@@ -108,7 +125,7 @@ def sync_all_files_logic():
             db.session.commit()
 
         disk_files = []
-        for root, _, files in os.walk(customer_folder):
+        for root, _, files in timed_walk(customer_folder):
             for file in files:
                 rel_path = os.path.relpath(os.path.join(root, file), UPLOAD_FOLDER)
                 if not rel_path.endswith(".DS_Store"):
@@ -130,12 +147,28 @@ def sync_all_files_logic():
     db.session.commit()
 
 
-def sync_customer_files_logic(customer_id):
-    customer = Customer.query.get_or_404(customer_id)
-    folder_name = secure_folder_name(customer.name)
-    customer_folder = os.path.join(UPLOAD_FOLDER, folder_name)
-    os.makedirs(customer_folder, exist_ok=True)
+def customer_upload_folder(customer):
+    folder = os.path.join(UPLOAD_FOLDER, secure_folder_name(customer.name))
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def upload_files_in(root, files):
+    """
+    UPLOAD_FOLDER-relative paths for one os.walk() entry, minus .DS_Store.
+    """
+    return [
+        rel_path
+        for rel_path in (os.path.relpath(os.path.join(root, file), UPLOAD_FOLDER) for file in files)
+        if not rel_path.endswith(".DS_Store")
+    ]
+
 
+def apply_customer_files(customer, disk_files):
+    """
+    Make the customer's root-division documents match `disk_files`;
+    returns (added, removed) filenames.
+    """
     root_division = Division.query.filter_by(
         customer_id=customer.id, parent_id=None
     ).first()
@@ -144,35 +177,36 @@ def sync_customer_files_logic(customer_id):
         db.session.add(root_division)
         db.session.commit()
 
-    # Files on disk
-    disk_files = []
-    for root, _, files in os.walk(customer_folder):
-        for file in files:
-            full_path = os.path.join(root, file)
-            rel_path = os.path.relpath(full_path, UPLOAD_FOLDER)
-            if not rel_path.endswith(".DS_Store"):
-                disk_files.append(rel_path)
-
     # Files in DB
     db_docs = DivisionDocument.query.filter_by(division_id=root_division.id).all()
     db_filenames = {doc.filename for doc in db_docs}
+    on_disk = set(disk_files)
 
-    # ✅ Add this block back to remove DB records for deleted files:
+    # ✅ Remove DB records for deleted files
+    removed = []
     for doc in db_docs:
-        if doc.filename not in disk_files:
+        if doc.filename not in on_disk:
             db.session.delete(doc)
+            removed.append(doc.filename)
 
     # Add missing ones to DB
+    added = []
     for rel_path in disk_files:
         if rel_path not in db_filenames:
             db.session.add(
                 DivisionDocument(division_id=root_division.id, filename=rel_path)
             )
+            added.append(rel_path)
 
     db.session.commit()
+    return added, removed
 
-    # Optional: Clean up empty folders and stray .DS_Store
-    for root, dirs, _ in os.walk(customer_folder, topdown=False):
+
+def clean_empty_folders(folder):
+    """
+    Remove stray .DS_Store files and empty subfolders under `folder`.
+    """
+    for root, dirs, _ in timed_walk(folder, topdown=False):
         for d in dirs:
             folder_path = os.path.join(root, d)
             try:
@@ -185,22 +219,44 @@ def sync_customer_files_logic(customer_id):
                 logger.error(f"⚠️ Could not clean {folder_path}: {e}")
 
 
+def sync_customer_files_logic(customer_id):
+    customer = Customer.query.get_or_404(customer_id)
+    customer_folder = customer_upload_folder(customer)
+
+    # Files on disk
+    disk_files = []
+    for root, _, files in timed_walk(customer_folder):
+        disk_files.extend(upload_files_in(root, files))
+
+    apply_customer_files(customer, disk_files)
+
+    # Optional: Clean up empty folders and stray .DS_Store
+    clean_empty_folders(customer_folder)
+
+
 def scan_and_index_files():
     FileIndex.query.delete()  # optional: clean old entries
-    for root, _, files in os.walk(DISCOVERY_ROOT):
+    for root, _, files in timed_walk(DISCOVERY_ROOT):
         if any(skip in root for skip in SKIP_FOLDERS):
             continue
         for file in files:
             if file.startswith("."):
                 continue
-            rel_path = os.path.relpath(os.path.join(root, file), DISCOVERY_ROOT)
-            parent = os.path.basename(os.path.dirname(os.path.join(root, file)))
+            full_path = os.path.join(root, file)
+            rel_path = os.path.relpath(full_path, DISCOVERY_ROOT)
+            parent = os.path.basename(os.path.dirname(full_path))
+            try:
+                mtime = os.path.getmtime(full_path)
+            except FileNotFoundError:
+                continue
             db.session.add(
-                FileIndex(relative_path=rel_path, filename=file, parent_folder=parent)
+                FileIndex(relative_path=rel_path, filename=file, parent_folder=parent, mtime=mtime)
             )
     db.session.commit()
+    new_files_counter.load()  # 🔄 counter follows the fresh index
 
 
+@timed("daily_backup_check")
 def daily_backup_if_needed():
     today = datetime.now().strftime("%Y%m%d")
 
@@ -251,6 +307,7 @@ def backup_db_internal():
 # === Check last backup ===
 
 
+@timed("backup_listing")
 def get_last_backup_times():
     last_shared = None
     last_local = None
@@ -293,132 +350,71 @@ log_dir = os.path.dirname(CHANGE_LOG_FILE)
 logger = logging.getLogger("crm_logger")
 logger.setLevel(logging.INFO)
 
-if os.path.exists(log_dir):
-    # 📦 Rotating file handler: max ~1MB per file, keep last 5
-    file_handler = RotatingFileHandler(CHANGE_LOG_FILE, maxBytes=1_000_000, backupCount=5)
-    file_handler.setFormatter(logging.Formatter("%(asctime)s — %(message)s"))
-    logger.addHandler(file_handler)
-    logger.info("📝 File logging initialized.")
-else:
-    # Fallback: optionally just log to console or do nothing
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(logging.Formatter("%(asctime)s — %(message)s"))
-    logger.addHandler(console_handler)
-    logger.warning(f"🚫 Logging to file skipped — OneDrive log path missing: {log_dir}")
+log_formatter = logging.Formatter("%(asctime)s — %(message)s")
 
-# === Logging call ===
-def log_change(action: str, target: str):
-    logger.info(f"[{get_device_name()}] {action} → {target}")
+share_handler = None  # set by init_logging()
+_logging_lock = Lock()
 
 
-# 🔒 Lock file path — make sure this is inside the shared OneDrive folder
-
-def acquire_lock():
-    if os.path.exists(LOCK_FILE):
-        return False
-    with open(LOCK_FILE, "w") as f:
-        f.write(f"{getpass.getuser()} at {datetime.now()}")
-    session["owns_lock"] = True  # ✅ Store ownership
-    return True
-
-def release_lock():
-    if os.path.exists(LOCK_FILE):
-        os.remove(LOCK_FILE)
-    session.pop("owns_lock", None)  # ✅ Clear ownership
-
-
-def is_locked():
+def init_logging():
     """
-    Check if lock file exists.
+    Attach the OneDrive change-log pipeline to `logger` (once). Called by
+    create_app() rather than on import, so scripts and tests that only
+    import helpers don't start shipper threads or touch the share.
     """
-    return os.path.exists(LOCK_FILE)
+    global share_handler
+    with _logging_lock:
+        if share_handler is not None:
+            return share_handler
+
+        # 📦 Local buffer shipped to OneDrive in batches: max ~1MB per file, keep last 5
+        share_handler = BufferedShareHandler(
+            CHANGE_LOG_FILE,
+            LOG_BUFFER_DIR,
+            max_bytes=1_000_000,
+            backup_count=5,
+            interval=LOG_FLUSH_SECONDS,
+        )
+        share_handler.setFormatter(log_formatter)
+        log_handlers = [share_handler]
+
+        if not os.path.exists(log_dir):
+            # Share not mounted yet: lines wait in the local buffer; echo them to the console meanwhile
+            console_handler = logging.StreamHandler()
+            console_handler.setFormatter(log_formatter)
+            log_handlers.append(console_handler)
+
+        start_logging_pipeline(logger, log_handlers)
+
+    if os.path.exists(log_dir):
+        logger.info("📝 File logging initialized.")
+    else:
+        logger.warning(f"🚫 OneDrive log path missing: {log_dir} — buffering logs locally")
+    return share_handler
+
 
-def lock_info():
+def change_log_files():
     """
-    Return contents of the lock file, or None if not locked.
+    Newest first: this process's unshipped buffer, then the share's log and its rotations.
     """
-    if not os.path.exists(LOCK_FILE):
-        return None
-    with open(LOCK_FILE, "r") as f:
-        return f.read().strip()
+    handler = init_logging()
+    rotated = [f"{CHANGE_LOG_FILE}.{i}" for i in range(1, handler.backup_count + 1)]
+    return [handler.buffer_path, handler.pending_path, CHANGE_LOG_FILE, *rotated]
 
-def lock_expired(timeout_sec=300):
+# === Logging call ===
+def log_change(action: str, target: str, entity=None):
     """
-    Check if the lock file is older than the timeout (default: 5 minutes).
+    Text line in change_log.txt plus a structured audit row (see audit.py).
+    Pass the ORM object the action was about as `entity` to record its diff.
     """
-    if not os.path.exists(LOCK_FILE):
-        return False
-    age = time.time() - os.path.getmtime(LOCK_FILE)
-    return age > timeout_sec
-
-# ----- SCAN FILES TWICE A DAY
-file_scan_cache = {
-    "date": None,
-    "scanned_11": False,
-    "scanned_16": False,
-    "count": 0
-}
-
-def get_new_files_today_count(DISCOVERY_ROOT, SKIP_FOLDERS):
-    now = datetime.now()
-    today = now.date()
-    hour = now.hour
-
-    # Reset at midnight
-    if file_scan_cache["date"] != today:
-        logger.info("🕛 New day detected. Resetting file scan cache.")
-        file_scan_cache.update({
-            "date": today,
-            "scanned_11": False,
-            "scanned_16": False,
-            "count": 0
-        })
-
-    # Determine if we are in a scan window
-    should_scan = False
-    scan_window = None
-
-    if 11 <= hour < 16 and not file_scan_cache["scanned_11"]:
-        should_scan = True
-        scan_window = "11AM"
-    elif 16 <= hour <= 23 and not file_scan_cache["scanned_16"]:
-        should_scan = True
-        scan_window = "4PM"
-
-    if not should_scan:
-        return file_scan_cache["count"]
-
-    # ✅ Perform scan
-    try:
-        count = 0
-        for root, _, files in os.walk(DISCOVERY_ROOT):
-            if any(skip in root for skip in SKIP_FOLDERS):
-                continue
-            for file in files:
-                if file.startswith("."):
-                    continue
-                full_path = os.path.join(root, file)
-                try:
-                    mod_time = os.path.getmtime(full_path)
-                    if datetime.fromtimestamp(mod_time).date() == today:
-                        count += 1
-                except FileNotFoundError:
-                    continue
-
-        file_scan_cache["count"] = count
-
-        # ✅ Now mark the appropriate scan window as completed
-        if scan_window == "11AM":
-            file_scan_cache["scanned_11"] = True
-        elif scan_window == "4PM":
-            file_scan_cache["scanned_16"] = True
-
-        logger.info(f"📂 File scan completed at {scan_window}: {count} new files found.")
-        return count
+    actor = get_device_name()
+    logger.info(f"[{actor}] {action} → {target}")
+    record_event(actor, action, target, entity)
 
-    except Exception as e:
-        logger.warning(f"⚠️ File scan failed during {scan_window or 'unknown'} window: {e}")
-        return file_scan_cache["count"]  # fallback to last known value
+
+# ----- NEW FILES TODAY (see file_counter.py)
+def get_new_files_today_count():
+    return new_files_counter.count()
 
 def get_device_name():
     return session.get("username", "UNKNOWN_USER")
\ No newline at end of file
@@ -0,0 +1,38 @@
+"""
+Production entry point for gunicorn or waitress:
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+    waitress-serve --listen=127.0.0.1:5000 --threads=8 wsgi:application
+
+Unlike `python app.py` there is no debugger or reloader, and the caches
+worker processes must agree on (cache versions, the read-model change
+feed, the new-files count, edit-form snapshots) go through the SQLite
+shared store instead of process memory.
+"""
+
+import os
+
+# Must be set before config.py is first imported
+os.environ.setdefault("CACHE_BACKEND", "sqlite")
+
+import assets
+from app import create_app, prepare_database
+from config import SHARED_CACHE_PATH
+from shared_cache import exclusive_lock
+from utils import logger
+
+# Every worker imports this module; they take turns, so only the first
+# one to get here actually creates tables, migrates or rebuilds static assets
+_startup_lock = exclusive_lock(
+    os.path.join(os.path.dirname(SHARED_CACHE_PATH), "startup.lock"), blocking=True
+)
+try:
+    try:
+        assets.build_if_stale()  # before create_app() reads the manifest
+    except Exception as e:  # pages fall back to the source files
+        logger.warning(f"⚠️ Static asset build failed: {e}")
+    prepare_database()
+finally:
+    _startup_lock.close()
+
+application = create_app()